@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up, as it loads models.
+from RoomDesignApp.sockets import ROOM_SOCKET_PATH, room_socket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Room editing sockets are served next to Django, which has no
+    # WebSocket support of its own.
+    if scope["type"] == "websocket" and scope["path"] == ROOM_SOCKET_PATH:
+        return await room_socket(scope, receive, send)
+    if scope["type"] == "websocket":
+        await receive()
+        return await send({"type": "websocket.close", "code": 4404})
+    return await django_application(scope, receive, send)
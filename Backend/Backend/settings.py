@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "RoomDesignApp.middleware.ProfilingMiddleware",
+    "RoomDesignApp.middleware.InstrumentationMiddleware",
+    "RoomDesignApp.middleware.MetricsMiddleware",
+    "RoomDesignApp.middleware.LoadSheddingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -48,6 +54,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "RoomDesignApp.middleware.ReplicaPinningMiddleware",
+    "RoomDesignApp.middleware.RateLimitMiddleware",
 ]
 
 ROOT_URLCONF = "Backend.urls"
@@ -80,6 +88,177 @@ DATABASES = {
     }
 }
 
+# "production" turns on the tuned SQLite profile below.
+DB_PROFILE = os.environ.get("ROOMDESIGN_DB_PROFILE", "development")
+
+# Pragmas applied to every new SQLite connection in the production profile:
+# WAL lets readers run alongside the single writer, synchronous=NORMAL is
+# durable across application crashes in WAL mode, and a 64 MiB page cache plus
+# 256 MiB of mmap keep hot tables out of read() syscalls.
+SQLITE_PRODUCTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+]
+
+if DB_PROFILE == "production":
+    DATABASES["default"].update(
+        {
+            # Keep connections (and their warm page cache) across requests.
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "init_command": ";".join(SQLITE_PRODUCTION_PRAGMAS),
+                # Take the write lock at BEGIN so writers queue on busy_timeout
+                # instead of failing when upgrading from a read lock.
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+            },
+        }
+    )
+
+# Read replicas: comma separated SQLite files holding copies of the primary,
+# refreshed with manage.py sync_replicas. Each becomes a "replica_<n>" alias
+# that read-only handlers may read from (see RoomDesignApp.routers).
+DATABASE_REPLICAS = []
+for _index, _path in enumerate(
+    filter(None, os.environ.get("ROOMDESIGN_DB_REPLICAS", "").split(","))
+):
+    DATABASES[f"replica_{_index}"] = {
+        **DATABASES["default"],
+        "NAME": _path,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{_index}")
+
+# Room shards: comma separated SQLite files that rooms and their placements
+# are spread across by a hash of the owner (see RoomDesignApp.routers). Each
+# becomes a "rooms_<n>" alias; run manage.py migrate --database rooms_<n> for
+# each, and manage.py rebalance_rooms after changing the list.
+ROOM_SHARDS = []
+for _index, _path in enumerate(
+    filter(None, os.environ.get("ROOMDESIGN_ROOM_SHARDS", "").split(","))
+):
+    DATABASES[f"rooms_{_index}"] = {**DATABASES["default"], "NAME": _path}
+    ROOM_SHARDS.append(f"rooms_{_index}")
+
+DATABASE_ROUTERS = [
+    "RoomDesignApp.routers.RoomShardRouter",
+    "RoomDesignApp.routers.PrimaryReplicaRouter",
+]
+
+# Seconds a client keeps reading from the primary after it wrote
+REPLICA_PIN_SECONDS = 5
+
+# Funnel mutations from the util handlers through one writer thread per
+# database (the primary and each room shard) and process, committed in group
+# transactions of up to WRITE_QUEUE_MAX_BATCH mutations collected for at most
+# WRITE_QUEUE_MAX_WAIT seconds.
+WRITE_QUEUE_ENABLED = os.environ.get("ROOMDESIGN_WRITE_QUEUE", "0") == "1"
+WRITE_QUEUE_MAX_BATCH = 64
+WRITE_QUEUE_MAX_WAIT = 0.002
+
+# Buffer room model transform updates (size, axis, rotations) in memory and
+# save each placement once it has been idle for WRITE_BEHIND_IDLE seconds, or
+# WRITE_BEHIND_FLUSH_INTERVAL seconds after its first unsaved update.
+# Buffered transforms are saved when the process exits normally, but are lost
+# if it is killed; they are only visible to the process holding them until
+# then, so run with sticky sessions when there are several workers.
+WRITE_BEHIND_ENABLED = os.environ.get("ROOMDESIGN_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0
+WRITE_BEHIND_IDLE = 0.25
+
+# Per-request query, serializer and encoding timings, returned in a
+# Server-Timing header. Requests slower than SLOW_REQUEST_MS (ms) are logged
+# with their INSTRUMENTATION_SLOWEST_QUERIES slowest statements, including
+# their query plans when INSTRUMENTATION_EXPLAIN is set.
+INSTRUMENTATION_ENABLED = True
+SLOW_REQUEST_MS = int(os.environ.get("ROOMDESIGN_SLOW_REQUEST_MS", "500"))
+INSTRUMENTATION_SLOWEST_QUERIES = 3
+INSTRUMENTATION_EXPLAIN = os.environ.get("ROOMDESIGN_EXPLAIN_SLOW", "0") == "1"
+
+# Request, cache and query metrics served at /metrics. Every worker process
+# writes its counters to its own memory-mapped file in METRICS_DIR and the
+# endpoint sums them; clear the directory when the server is (re)deployed.
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get(
+    "ROOMDESIGN_METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), "roomdesign-metrics"),
+)
+METRICS_LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Admins profile a single request by sending PROFILE_HEADER (or the
+# PROFILE_PARAM query parameter) with their account id. The sampled stacks
+# are written to PROFILE_DIR as <request id>.collapsed flame graph input.
+PROFILING_ENABLED = True
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "_profile"
+PROFILE_DIR = os.environ.get(
+    "ROOMDESIGN_PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "roomdesign-profiles"),
+)
+PROFILE_SAMPLE_INTERVAL = 0.001
+
+# Identical concurrent GET requests to the catalog, model and room views
+# wait for the first one and share its response body.
+COALESCING_ENABLED = True
+
+# Request budgets per client and URL name, as (requests per second, burst).
+# Clients are told apart by IP address (userid parameters are not
+# authenticated); requests over budget get 429 with Retry-After. Routes not
+# listed share the "default" budget.
+RATE_LIMIT_ENABLED = os.environ.get("ROOMDESIGN_RATE_LIMIT", "1") == "1"
+RATE_LIMITS = {
+    "default": (20.0, 40),
+    "search_model": (5.0, 10),
+    "typeahead": (20.0, 30),
+    "similar_models": (5.0, 10),
+    "login": (0.1, 5),
+    "signup": (0.05, 3),
+}
+RATE_LIMIT_MAX_CLIENTS = 100_000
+
+# Behind a reverse proxy or load balancer every request comes from its
+# address, so all clients would share one budget. List the proxies
+# (comma separated addresses or networks, e.g. "10.0.0.0/8,127.0.0.1") and
+# requests from them are limited by the client address they append to
+# X-Forwarded-For instead. Only list proxies that set that header, or
+# clients could claim any address.
+RATE_LIMIT_TRUSTED_PROXIES = [
+    proxy
+    for proxy in os.environ.get("ROOMDESIGN_TRUSTED_PROXIES", "").split(",")
+    if proxy
+]
+
+# Each worker process serves at most LOAD_SHED_MAX_CONCURRENCY requests at
+# once, fewer (down to LOAD_SHED_MIN_CONCURRENCY) while the average latency
+# is above LOAD_SHED_TARGET_LATENCY_MS. Up to LOAD_SHED_MAX_QUEUE more wait
+# LOAD_SHED_QUEUE_TIMEOUT seconds for a slot; the rest get 503 with a
+# Retry-After of LOAD_SHED_RETRY_AFTER seconds.
+LOAD_SHED_ENABLED = os.environ.get("ROOMDESIGN_LOAD_SHED", "1") == "1"
+LOAD_SHED_MIN_CONCURRENCY = 4
+LOAD_SHED_MAX_CONCURRENCY = 32
+LOAD_SHED_TARGET_LATENCY_MS = 250
+LOAD_SHED_MAX_QUEUE = 64
+LOAD_SHED_QUEUE_TIMEOUT = 0.5
+LOAD_SHED_RETRY_AFTER = 1
+LOAD_SHED_EXEMPT_PATHS = ("/metrics",)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,6 +296,85 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded media (model files, model images, room files)
+
+MEDIA_URL = "/media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Served media is immutable: uploads never overwrite an existing name.
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Number of content digests kept in memory for media ETags
+MEDIA_ETAG_CACHE_SIZE = 4096
+
+# Directory under MEDIA_ROOT holding rooms baked into a single mesh
+BAKED_ROOMS_DIR = "baked/"
+
+# Deleting a model or room leaves its files in place (room files may be
+# shared by clones); manage.py collect_orphaned_media removes the files
+# nothing references, MEDIA_GC_BATCH_SIZE at a time, sparing files younger
+# than MEDIA_GC_MIN_AGE seconds whose upload may still be in flight.
+MEDIA_GC_MIN_AGE = 3600
+MEDIA_GC_BATCH_SIZE = 500
+
+
+# Model search
+
+# Ranked search results cached per process, at most SEARCH_CACHE_SIZE
+# queries for SEARCH_CACHE_TTL seconds. Entries are keyed by the catalog
+# version, which every model add, update, unlist and delete bumps.
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 300
+
+# Completions returned by models/typeahead/ by default, and at most
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+# TF-IDF vectors behind models/similar/, kept in SIMILAR_MODELS_PATH and
+# updated row by row as models change. Every row is reweighted once more than
+# SIMILAR_MODELS_REBUILD_RATIO of the catalog changed since the last rebuild.
+# The file defaults to one beside the database it indexes.
+SIMILAR_MODELS_PATH = os.environ.get(
+    "ROOMDESIGN_SIMILAR_MODELS_PATH",
+    f"{DATABASES['default']['NAME']}.similar-models.npz",
+)
+SIMILAR_MODELS_REBUILD_RATIO = 0.2
+SIMILAR_MODELS_DEFAULT_LIMIT = 10
+SIMILAR_MODELS_MAX_LIMIT = 50
+
+
+# Room geometry
+
+# Parse uploaded room files in a background thread instead of in the request
+ROOM_PARSE_IN_BACKGROUND = False
+
+# Grid cell size (room units) of the per-room spatial index
+SPATIAL_INDEX_CELL_SIZE = 1.0
+
+# Number of room spatial indexes kept in memory per process
+SPATIAL_INDEX_MAX_ROOMS = 256
+
+# Reject room model adds/updates that leave the room or overlap another item
+ROOM_VALIDATE_ON_WRITE = False
+
+# Distance (room units) within which placements may touch without overlapping
+ROOM_VALIDATION_TOLERANCE = 1e-3
+
+# Move newly added room models to the nearest free spot on the floor
+ROOM_AUTO_PLACE = True
+
+# Occupancy grid cell size (room units) and maximum cells per side
+PLACEMENT_GRID_RESOLUTION = 0.1
+PLACEMENT_GRID_MAX_CELLS = 512
+
+# Room editing sockets (ASGI only, see Backend/asgi.py): placement changes
+# are sent to a room's editors in at most ROOM_SOCKET_TICK_RATE frames per
+# second. An editor with ROOM_SOCKET_MAX_BACKLOG frames unsent gets a fresh
+# snapshot instead.
+ROOM_SOCKET_TICK_RATE = 30
+ROOM_SOCKET_MAX_BACKLOG = 64
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -15,11 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from xml.etree.ElementInclude import include
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+
+from RoomDesignApp import views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("RoomDesignApp/", include("RoomDesignApp.urls")),
+    path("metrics", views.metrics_view, name="metrics"),
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/<path:path>",
+        views.serve_media_view,
+        name="serve_media",
+    ),
 ]
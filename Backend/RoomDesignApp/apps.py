@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.apps import apps as global_apps
+from django.db import router
+from django.db.models.signals import post_migrate
+
+
+def create_catalog_version(sender, using, apps=global_apps, **kwargs):
+    # Every database gets its catalog identity when it is created, so two
+    # fresh databases are never taken for the same catalog.
+    CatalogVersion = apps.get_model("RoomDesignApp", "CatalogVersion")
+    if router.allow_migrate_model(using, CatalogVersion):
+        CatalogVersion.objects.using(using).get_or_create(pk=1)
 
 
 class RoomdesignappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'RoomDesignApp'
+
+    def ready(self):
+        post_migrate.connect(create_catalog_version, sender=self)
@@ -0,0 +1,129 @@
+"""
+Synthetic data shared by the seed_data and benchmark_routes commands.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from Backend.RoomDesignApp.util.geometry import (
+    GLB_CHUNK_BIN,
+    GLB_CHUNK_JSON,
+    GLB_MAGIC,
+)
+
+ADJECTIVES = [
+    "oak",
+    "walnut",
+    "velvet",
+    "leather",
+    "linen",
+    "rattan",
+    "marble",
+    "steel",
+    "glass",
+    "nordic",
+    "vintage",
+    "modern",
+    "compact",
+    "corner",
+    "round",
+    "folding",
+]
+
+FURNITURE = {
+    "sofa": ["seating", "living room"],
+    "armchair": ["seating", "living room"],
+    "chair": ["seating", "dining"],
+    "stool": ["seating", "kitchen"],
+    "table": ["surface", "dining"],
+    "desk": ["surface", "office"],
+    "bed": ["sleeping", "bedroom"],
+    "wardrobe": ["storage", "bedroom"],
+    "bookshelf": ["storage", "office"],
+    "dresser": ["storage", "bedroom"],
+    "lamp": ["lighting"],
+    "rug": ["decor", "textile"],
+    "mirror": ["decor", "bathroom"],
+    "plant": ["decor", "green"],
+}
+
+# Password every seeded account shares, for the login benchmark.
+SEED_PASSWORD = "benchmark-password"
+
+# Room names (and model names) starting with this are removed by the
+# benchmark after it ran.
+BENCHMARK_PREFIX = "benchmark "
+
+
+def catalog_entry(rng: np.random.Generator) -> tuple[str, list[str], np.ndarray]:
+    """
+    Returns a random (name, tags, [width, height, depth]) catalog item.
+    """
+    adjective = ADJECTIVES[rng.integers(len(ADJECTIVES))]
+    noun = list(FURNITURE)[rng.integers(len(FURNITURE))]
+    size = np.round(rng.uniform([0.3, 0.3, 0.3], [2.5, 2.2, 2.0]), 2)
+    return f"{adjective} {noun}".title(), [noun, adjective, *FURNITURE[noun]], size
+
+
+def box_glb(width: float = 1.0, height: float = 1.0, depth: float = 1.0) -> bytes:
+    """
+    Returns a binary glTF box standing on the XZ plane, centered on X and Z.
+    """
+    corners = np.array(
+        [[x, y, z] for x in (-0.5, 0.5) for y in (0.0, 1.0) for z in (-0.5, 0.5)],
+        dtype=np.float32,
+    ) * np.array([width, height, depth], dtype=np.float32)
+    # fmt: off
+    indices = np.array(
+        [0, 1, 2, 1, 3, 2, 4, 6, 5, 5, 6, 7, 0, 4, 1, 1, 4, 5,
+         2, 3, 6, 3, 7, 6, 0, 2, 4, 2, 6, 4, 1, 5, 3, 3, 5, 7],
+        dtype=np.uint32,
+    )
+    # fmt: on
+    bin_chunk = corners.tobytes() + indices.tobytes()
+    doc = {
+        "asset": {"version": "2.0", "generator": "RoomDesignApp seed"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "indices": 1}]}],
+        "buffers": [{"byteLength": len(bin_chunk)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": corners.nbytes},
+            {
+                "buffer": 0,
+                "byteOffset": corners.nbytes,
+                "byteLength": indices.nbytes,
+            },
+        ],
+        "accessors": [
+            {
+                "bufferView": 0,
+                "componentType": 5126,
+                "count": len(corners),
+                "type": "VEC3",
+                "min": corners.min(axis=0).tolist(),
+                "max": corners.max(axis=0).tolist(),
+            },
+            {
+                "bufferView": 1,
+                "componentType": 5125,
+                "count": len(indices),
+                "type": "SCALAR",
+            },
+        ],
+    }
+    json_chunk = json.dumps(doc, separators=(",", ":")).encode()
+    json_chunk += b" " * ((-len(json_chunk)) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b"".join(
+        [
+            struct.pack("<III", GLB_MAGIC, 2, total),
+            struct.pack("<II", len(json_chunk), GLB_CHUNK_JSON),
+            json_chunk,
+            struct.pack("<II", len(bin_chunk), GLB_CHUNK_BIN),
+            bin_chunk,
+        ]
+    )
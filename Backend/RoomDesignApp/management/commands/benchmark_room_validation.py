@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from Backend.RoomDesignApp.util.geometry import placement_bounds
+from Backend.RoomDesignApp.util.room_validation import (
+    find_out_of_bounds,
+    find_overlaps,
+)
+
+
+class Command(BaseCommand):
+    help = "Times the vectorized room validation pass on synthetic placements."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--placements", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--room-size",
+            type=float,
+            default=100.0,
+            help="Width and depth of the synthetic room.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        count = options["placements"]
+        room_size = options["room_size"]
+        rng = np.random.default_rng(options["seed"])
+
+        model_bounds = [{"min": [-0.5, 0.0, -0.5], "max": [0.5, 1.0, 0.5]}] * count
+        sizes = rng.integers(1, 3, count).tolist()
+        axes = (rng.random((count, 3)) * [room_size, 0.0, room_size]).tolist()
+        rotations = (rng.random((count, 3)) * [0.0, 2 * np.pi, 0.0]).tolist()
+        extent = (np.zeros(3), np.array([room_size, 3.0, room_size]))
+
+        timings = {"bounds": [], "out_of_bounds": [], "overlaps": []}
+        for _ in range(options["repeat"]):
+            start = time.perf_counter()
+            lowers, uppers = placement_bounds(model_bounds, sizes, axes, rotations)
+            timings["bounds"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            outside = find_out_of_bounds(lowers, uppers, extent)
+            timings["out_of_bounds"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            overlaps = find_overlaps(lowers, uppers)
+            timings["overlaps"].append(time.perf_counter() - start)
+
+        self.stdout.write(
+            f"{count} placements: {len(outside)} out of bounds, "
+            f"{len(overlaps)} overlapping pairs"
+        )
+        for name, values in timings.items():
+            self.stdout.write(
+                f"  {name:<14} best {min(values) * 1000:8.2f} ms  "
+                f"median {np.median(values) * 1000:8.2f} ms"
+            )
@@ -0,0 +1,471 @@
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from Backend.RoomDesignApp import urls as app_urls
+from Backend.RoomDesignApp.management.commands._synthetic import (
+    BENCHMARK_PREFIX,
+    SEED_PASSWORD,
+    box_glb,
+    catalog_entry,
+)
+from Backend.RoomDesignApp.models import Account, Model, Room, RoomModel
+from Backend.RoomDesignApp.routers import room_databases, shard_for_owner
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks", "baseline.json")
+
+_SEARCH_TOKENS = ["sofa", "oak", "lamp", "chair", "table", "velvet", "desk", "bed"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives every route in RoomDesignApp/urls.py with concurrent requests "
+        "against seeded data and reports throughput and p50/p95/p99 latency, "
+        "compared to a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per route."
+        )
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--routes",
+            nargs="+",
+            help="Only these URL names (default: every route).",
+        )
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store this run as the baseline later runs compare against.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Relative p95 / throughput change reported as a regression.",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error when a route regressed.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = np.random.default_rng(options["seed"])
+        self.host = options["host"]
+        self.run = uuid.uuid4().hex[:8]
+        # Names of the rooms and models this run creates start with this.
+        self.prefix = f"{BENCHMARK_PREFIX}{self.run} "
+
+        route_names = [pattern.name for pattern in app_urls.urlpatterns]
+        if options["routes"]:
+            unknown = set(options["routes"]) - set(route_names)
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            route_names = options["routes"]
+
+        missing = [name for name in route_names if not hasattr(self, f"_{name}")]
+        if missing:
+            raise CommandError(f"No benchmark scenario for: {', '.join(missing)}")
+
+        # Expected 4xx responses are counted as errors, not logged per request.
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        self._load_context()
+        results = {}
+        try:
+            # Every simulated request comes from the same client and process,
+            # so rate limits and load shedding would only measure themselves.
+            with override_settings(RATE_LIMIT_ENABLED=False, LOAD_SHED_ENABLED=False):
+                for name in route_names:
+                    results[name] = self._benchmark(
+                        name,
+                        options["requests"],
+                        options["concurrency"],
+                        options["warmup"],
+                    )
+                    self._report(name, results[name])
+        finally:
+            self._cleanup()
+
+        regressions = self._compare(results, options["baseline"], options["tolerance"])
+
+        if options["save_baseline"]:
+            os.makedirs(os.path.dirname(options["baseline"]), exist_ok=True)
+            with open(options["baseline"], "w") as f:
+                json.dump(
+                    {
+                        "created_at": datetime.now(timezone.utc).isoformat(),
+                        "concurrency": options["concurrency"],
+                        "requests": options["requests"],
+                        "routes": results,
+                    },
+                    f,
+                    indent=2,
+                )
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"Regressed routes: {', '.join(regressions)}")
+
+    # Running and reporting
+
+    def _benchmark(
+        self, name: str, requests: int, concurrency: int, warmup: int
+    ) -> dict:
+        scenario = getattr(self, f"_{name}")
+        prepare = getattr(self, f"_prepare_{name}", None)
+        pool = prepare(requests + warmup) if prepare else None
+        url = reverse(name)
+        counter = itertools.count()
+        lock = threading.Lock()
+        latencies, statuses = [], []
+
+        def worker():
+            client = Client(SERVER_NAME=self.host)
+            try:
+                while True:
+                    with lock:
+                        i = next(counter)
+                    if i >= requests + warmup:
+                        return
+                    method, data = scenario(i, pool)
+                    start = time.perf_counter()
+                    if method == "GET":
+                        response = client.get(url, data)
+                    else:
+                        response = client.post(url, data)
+                    elapsed = time.perf_counter() - start
+                    if i >= warmup:
+                        with lock:
+                            latencies.append(elapsed)
+                            statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        timings = np.asarray(latencies) * 1000
+        return {
+            "requests": len(timings),
+            "errors": sum(status >= 400 for status in statuses),
+            "throughput": len(timings) / wall if wall else 0.0,
+            "p50": float(np.percentile(timings, 50)),
+            "p95": float(np.percentile(timings, 95)),
+            "p99": float(np.percentile(timings, 99)),
+        }
+
+    def _report(self, name: str, result: dict):
+        errors = f"  {result['errors']} errors" if result["errors"] else ""
+        self.stdout.write(
+            f"{name:<22} {result['throughput']:8.1f} req/s  "
+            f"p50 {result['p50']:7.2f}  p95 {result['p95']:7.2f}  "
+            f"p99 {result['p99']:7.2f} ms{errors}"
+        )
+
+    def _compare(self, results: dict, path: str, tolerance: float) -> list[str]:
+        if not os.path.isfile(path):
+            return []
+        with open(path) as f:
+            baseline = json.load(f)
+
+        self.stdout.write(f"\nCompared to baseline of {baseline['created_at']}:")
+        regressions = []
+        for name, result in results.items():
+            before = baseline["routes"].get(name)
+            if not before:
+                continue
+            p95 = result["p95"] / before["p95"] - 1 if before["p95"] else 0.0
+            throughput = (
+                result["throughput"] / before["throughput"] - 1
+                if before["throughput"]
+                else 0.0
+            )
+            regressed = p95 > tolerance or throughput < -tolerance
+            if regressed:
+                regressions.append(name)
+            line = f"{name:<22} p95 {p95:+7.1%}  throughput {throughput:+7.1%}"
+            self.stdout.write(
+                self.style.ERROR(f"{line}  REGRESSION") if regressed else line
+            )
+        return regressions
+
+    # Data
+
+    def _load_context(self):
+        self.owner = None
+        admin_ids = set(
+            Account.objects.filter(is_admin=True).values_list("id", flat=True)
+        )
+        for using in room_databases():
+            owner_ids = (
+                Room.objects.using(using)
+                .exclude(name__startswith=BENCHMARK_PREFIX)
+                .exclude(owner_id__in=admin_ids)
+                .values_list("owner_id", flat=True)[:1]
+            )
+            if owner_ids:
+                self.owner = Account.objects.get(id=owner_ids[0])
+                break
+        self.admin = Account.objects.filter(is_admin=True).first()
+        if self.owner is None or self.admin is None:
+            raise CommandError(
+                "Needs at least one room and one admin account; run seed_data."
+            )
+
+        self.using = shard_for_owner(self.owner.id)
+        rooms = Room.objects.using(self.using).filter(owner_id=self.owner.id)
+        self.room_ids = [
+            str(room_id)
+            for room_id in rooms.exclude(name__startswith=BENCHMARK_PREFIX).values_list(
+                "id", flat=True
+            )[:50]
+        ]
+        self.room_model_ids = [
+            str(room_model_id)
+            for room_model_id in RoomModel.objects.using(self.using)
+            .filter(room_id__in=self.room_ids)
+            .values_list("id", flat=True)[:500]
+        ]
+        self.model_ids = [
+            str(model_id)
+            for model_id in Model.objects.filter(listed=True)
+            .exclude(name__startswith=BENCHMARK_PREFIX)
+            .values_list("id", flat=True)[:500]
+        ]
+        if not self.room_model_ids or not self.model_ids:
+            raise CommandError("The benchmark room has no placements; run seed_data.")
+
+        # Mutating routes write into their own room so seeded rooms stay intact.
+        self.room = Room.objects.using(self.using).create(
+            name=f"{self.prefix}room",
+            description="Benchmark scratch room",
+            owner=self.owner,
+            sizes=[100.0, 10.0, 100.0],
+            bounds={"min": [0.0, 0.0, 0.0], "max": [100.0, 10.0, 100.0]},
+        )
+        self.room_glb = box_glb(6.0, 3.0, 4.0)
+        self.model_glb = box_glb(1.0, 1.0, 1.0)
+
+    def _cleanup(self):
+        # Only what this run created: startswith ignores case on SQLite.
+        created = {"name__regex": f"^{re.escape(self.prefix)}"}
+        for using in room_databases():
+            Room.objects.using(using).filter(owner_id=self.owner.id, **created).delete()
+        Model.objects.filter(**created).delete()
+        Account.objects.filter(email__startswith=f"benchmark-{self.run}").delete()
+
+    def _pick(self, values: list) -> str:
+        return values[self.rng.integers(len(values))]
+
+    def _scratch_models(self, count: int) -> list[str]:
+        models = Model.objects.bulk_create(
+            [
+                Model(
+                    name=f"{self.prefix}model {i}",
+                    model_file="models/benchmark.glb",
+                    size=1,
+                    listed=True,
+                )
+                for i in range(count)
+            ]
+        )
+        return [str(model.id) for model in models]
+
+    def _scratch_placements(self, count: int) -> list[str]:
+        placements = RoomModel.objects.using(self.using).bulk_create(
+            [
+                RoomModel(
+                    room=self.room,
+                    model_id=self._pick(self.model_ids),
+                    size=1,
+                    axis=[float(i % 100), 0.0, float(i // 100)],
+                    rotations=[0.0, 0.0, 0.0],
+                )
+                for i in range(count)
+            ]
+        )
+        return [str(placement.id) for placement in placements]
+
+    # Scenarios return (method, parameters) for request i. Routes that use
+    # up rows get a _prepare_<route> method creating `count` of them first.
+
+    def _get_rooms(self, i, pool):
+        return "GET", {"userid": self.owner.id}
+
+    def _get_room(self, i, pool):
+        return "GET", {"userid": self.owner.id, "id": self._pick(self.room_ids)}
+
+    def _get_baked_room(self, i, pool):
+        return "GET", {"userid": self.owner.id, "id": self._pick(self.room_ids)}
+
+    def _get_room_model_by_id(self, i, pool):
+        return "GET", {"userid": self.owner.id, "id": self._pick(self.room_model_ids)}
+
+    def _add_room(self, i, pool):
+        return "POST", {
+            "userid": self.owner.user_id,
+            "name": f"{self.prefix}added {i}",
+            "description": "Benchmark room",
+            "room_file": SimpleUploadedFile("benchmark.glb", self.room_glb),
+        }
+
+    def _add_model_to_room(self, i, pool):
+        return "POST", {
+            "userid": self.owner.id,
+            "roomid": str(self.room.id),
+            "modelid": self._pick(self.model_ids),
+        }
+
+    def _update_room(self, i, pool):
+        return "POST", {
+            "userid": self.owner.id,
+            "id": str(self.room.id),
+            "room_data": json.dumps({"description": f"Benchmark update {i}"}),
+        }
+
+    def _prepare_delete_room(self, count):
+        rooms = Room.objects.using(self.using).bulk_create(
+            [
+                Room(
+                    name=f"{self.prefix}doomed {n}",
+                    owner_id=self.owner.id,
+                    room_file="rooms/benchmark.glb",
+                )
+                for n in range(count)
+            ]
+        )
+        return [str(room.id) for room in rooms]
+
+    def _delete_room(self, i, pool):
+        return "POST", {"userid": self.owner.id, "id": pool[i]}
+
+    def _clone_room(self, i, pool):
+        return "POST", {
+            "userid": self.owner.id,
+            "id": self._pick(self.room_ids),
+            "name": f"{self.prefix}clone {i}",
+        }
+
+    def _get_template_rooms(self, i, pool):
+        return "GET", {"fields": "id,name,room_file"}
+
+    def _validate_room(self, i, pool):
+        return "GET", {"userid": self.owner.id, "id": self._pick(self.room_ids)}
+
+    def _prepare_update_room_model(self, count):
+        return self._scratch_placements(min(count, 200))
+
+    def _update_room_model(self, i, pool):
+        return "POST", {
+            "userid": self.owner.id,
+            "id": pool[i % len(pool)],
+            "room_model_data": json.dumps(
+                {"axis": [float(i % 100), 0.0, float(i % 97)]}
+            ),
+        }
+
+    def _prepare_delete_room_model(self, count):
+        return self._scratch_placements(count)
+
+    def _delete_room_model(self, i, pool):
+        return "POST", {"userid": self.owner.id, "id": pool[i]}
+
+    def _room_spatial_query(self, i, pool):
+        point = self.rng.uniform([0, 0, 0], [6, 1, 6])
+        return "GET", {
+            "userid": self.owner.id,
+            "id": self._pick(self.room_ids),
+            "point": ",".join(f"{value:.2f}" for value in point),
+        }
+
+    def _get_models(self, i, pool):
+        return "GET", {"listed": "true"}
+
+    def _get_model(self, i, pool):
+        return "GET", {"id": self._pick(self.model_ids)}
+
+    def _add_model(self, i, pool):
+        name, tags, _ = catalog_entry(self.rng)
+        return "POST", {
+            "userid": self.admin.id,
+            "name": f"{self.prefix}{name}",
+            "description": "Benchmark model",
+            "tags": ",".join(tags),
+            "listed": "false",
+            "size": "1",
+            "model_file": SimpleUploadedFile("benchmark.glb", self.model_glb),
+        }
+
+    def _prepare_update_model(self, count):
+        return self._scratch_models(min(count, 200))
+
+    def _update_model(self, i, pool):
+        return "POST", {
+            "userid": self.admin.id,
+            "id": pool[i % len(pool)],
+            "model_data": json.dumps({"description": f"Benchmark update {i}"}),
+        }
+
+    def _prepare_delete_model(self, count):
+        return self._scratch_models(count)
+
+    def _delete_model(self, i, pool):
+        return "POST", {"userid": self.admin.id, "id": pool[i]}
+
+    def _search_model(self, i, pool):
+        return "GET", {"search_token": self._pick(_SEARCH_TOKENS)}
+
+    def _typeahead(self, i, pool):
+        token = self._pick(_SEARCH_TOKENS)
+        return "GET", {"q": token[: 1 + i % len(token)]}
+
+    def _similar_models(self, i, pool):
+        return "GET", {"id": self._pick(self.model_ids)}
+
+    def _prepare_unlist_model(self, count):
+        return self._scratch_models(count)
+
+    def _unlist_model(self, i, pool):
+        return "POST", {"userid": self.admin.id, "id": pool[i]}
+
+    def _login(self, i, pool):
+        return "POST", {
+            "username": self.owner.username,
+            "email": self.owner.email,
+            "password": SEED_PASSWORD,
+        }
+
+    def _signup(self, i, pool):
+        return "POST", {
+            "username": f"benchmark_{i}",
+            "email": f"benchmark-{self.run}-{i}@example.com",
+            "password": "benchmark-signup",
+        }
+
+    def _is_admin(self, i, pool):
+        return "POST", {"userid": self.admin.id}
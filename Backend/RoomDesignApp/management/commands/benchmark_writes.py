@@ -0,0 +1,125 @@
+import threading
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from Backend.RoomDesignApp.models import Account, Model, Room, RoomModel
+from Backend.RoomDesignApp.routers import shard_for_owner
+from Backend.RoomDesignApp.util import write_queue
+from Backend.RoomDesignApp.util.room_models import handle_update_room_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures room model update throughput from concurrent threads, "
+        "written directly and through the write queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--writes", type=int, default=100, help="Per thread.")
+        parser.add_argument(
+            "--mode",
+            choices=["direct", "queued", "both"],
+            default="both",
+        )
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        writes = options["writes"]
+        modes = ["direct", "queued"] if options["mode"] == "both" else [options["mode"]]
+
+        owner = Account.objects.create(
+            email=f"benchmark-{uuid.uuid4()}@example.com",
+            username="benchmark",
+            password="benchmark",
+        )
+        model = Model.objects.create(
+            name="Benchmark cube",
+            model_file="models/benchmark.glb",
+            size=1,
+            listed=False,
+            bounds={"min": [-0.5, 0.0, -0.5], "max": [0.5, 1.0, 0.5]},
+        )
+        using = shard_for_owner(owner.id)
+        try:
+            placements = []
+            for i in range(threads):
+                room = Room.objects.using(using).create(
+                    name=f"Benchmark room {i}", owner=owner, sizes=[1000, 10, 1000]
+                )
+                placements.append(
+                    RoomModel.objects.using(using)
+                    .create(
+                        room=room, model=model, size=1, axis=[1, 0, 1], rotations=[]
+                    )
+                    .id
+                )
+
+            enabled = write_queue.WRITE_QUEUE_ENABLED
+            try:
+                for mode in modes:
+                    write_queue.WRITE_QUEUE_ENABLED = mode == "queued"
+                    self._run(mode, owner.id, placements, writes)
+            finally:
+                write_queue.WRITE_QUEUE_ENABLED = enabled
+        finally:
+            Room.objects.using(using).filter(owner=owner).delete()
+            owner.delete()
+            model.delete()
+
+    def _run(self, mode: str, user_id: str, placements: list, writes: int):
+        latencies = [[] for _ in placements]
+        failures = [0] * len(placements)
+        batches_before = write_queue.stats()["batches"]
+        barrier = threading.Barrier(len(placements) + 1)
+
+        def worker(slot: int, room_model_id):
+            barrier.wait()
+            try:
+                for i in range(writes):
+                    start = time.perf_counter()
+                    try:
+                        success, message = handle_update_room_model(
+                            user_id, room_model_id, {"axis": [1 + i % 50, 0, 1]}
+                        )
+                    except Exception:
+                        success = False
+                    latencies[slot].append(time.perf_counter() - start)
+                    failures[slot] += not success
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=worker, args=(slot, room_model_id))
+            for slot, room_model_id in enumerate(placements)
+        ]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        timings = np.concatenate(latencies) * 1000
+        total = len(timings)
+        self.stdout.write(
+            f"{mode:<7} {total} writes from {len(placements)} threads in "
+            f"{elapsed:.2f} s: {total / elapsed:8.1f} writes/s, "
+            f"{sum(failures)} failed"
+        )
+        self.stdout.write(
+            f"        latency p50 {np.percentile(timings, 50):7.2f} ms  "
+            f"p99 {np.percentile(timings, 99):7.2f} ms  "
+            f"max {timings.max():7.2f} ms"
+        )
+        if mode == "queued":
+            batches = write_queue.stats()["batches"] - batches_before
+            self.stdout.write(
+                f"        {batches} group commits, "
+                f"{total / max(batches, 1):.1f} writes per commit"
+            )
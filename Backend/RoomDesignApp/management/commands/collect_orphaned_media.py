@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Backend.RoomDesignApp.util.media_gc import (
+    MEDIA_GC_BATCH_SIZE,
+    MEDIA_GC_MIN_AGE,
+    collect_orphaned_media,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Removes uploaded model files, model images, room files and baked "
+        "rooms that no Model or Room references any more. Reports what would "
+        "be removed with --dry-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the orphaned files without removing them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=MEDIA_GC_BATCH_SIZE,
+            help="Files re-checked against the database and removed together.",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=MEDIA_GC_MIN_AGE,
+            help="Keep files modified less than MIN_AGE seconds ago.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep collecting every INTERVAL seconds instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            report = collect_orphaned_media(
+                dry_run=options["dry_run"],
+                batch_size=options["batch_size"],
+                min_age=options["min_age"],
+            )
+
+            orphans = report["orphans"]
+            if options["dry_run"]:
+                for orphan in orphans:
+                    self.stdout.write(f"{orphan['size']:>12}  {orphan['name']}")
+                self.stdout.write(
+                    f"{len(orphans)} of {report['scanned']} files orphaned, "
+                    f"{sum(orphan['size'] for orphan in orphans)} bytes "
+                    f"(dry run, nothing removed)"
+                )
+            else:
+                self.stdout.write(
+                    f"Removed {report['removed']} of {len(orphans)} orphaned "
+                    f"files ({report['removed_bytes']} bytes) out of "
+                    f"{report['scanned']} in "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from Backend.RoomDesignApp.models import Model
+from Backend.RoomDesignApp.util.geometry import compute_mesh_geometry
+
+
+class Command(BaseCommand):
+    help = "Parses catalog model files and stores their bounds, footprint and collision hull."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every model, not only those without cached geometry.",
+        )
+
+    def handle(self, *args, **options):
+        models = Model.objects.only("id", "name", "model_file")
+        if not options["all"]:
+            models = models.filter(bounds={})
+
+        updated = failed = 0
+        for model in models.iterator():
+            with model.model_file.open("rb") as f:
+                geometry, success, message = compute_mesh_geometry(f)
+
+            if not success:
+                failed += 1
+                self.stderr.write(f"{model.id} '{model.name}': {message}")
+                continue
+
+            Model.objects.filter(id=model.id).update(**geometry)
+            updated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated {updated} models, {failed} failed")
+        )
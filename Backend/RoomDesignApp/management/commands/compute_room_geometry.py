@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from Backend.RoomDesignApp.models import Room
+from Backend.RoomDesignApp.routers import room_databases
+from Backend.RoomDesignApp.util.room import parse_room_geometry
+
+
+class Command(BaseCommand):
+    help = "Parses room files and stores their dimensions, floor polygon and walls."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every room, not only those without cached geometry.",
+        )
+
+    def handle(self, *args, **options):
+        updated = failed = 0
+        for using in room_databases():
+            rooms = Room.objects.using(using)
+            if not options["all"]:
+                rooms = rooms.filter(bounds={})
+
+            for room_id in rooms.values_list("id", flat=True).iterator():
+                success, message = parse_room_geometry(room_id, using=using)
+
+                if not success:
+                    failed += 1
+                    self.stderr.write(f"{room_id}: {message}")
+                    continue
+
+                updated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated {updated} rooms, {failed} failed")
+        )
@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from Backend.RoomDesignApp.models import Model, Room, RoomModel
+
+
+class Command(BaseCommand):
+    help = "Prints the SQLite query plan and latency of the hot read queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        room = Room.objects.only("id", "owner_id").first()
+        if room is None:
+            self.stderr.write("No rooms in the database; seed some data first.")
+            return
+
+        queries = {
+            "rooms of owner": Room.objects.filter(owner_id=room.owner_id).order_by(
+                "-created_at"
+            ),
+            "room models of room": RoomModel.objects.filter(room_id=room.id).order_by(
+                "-id"
+            ),
+            "listed catalog": Model.objects.filter(listed=True).order_by("-created_at")[
+                :100
+            ],
+        }
+
+        self.stdout.write(
+            f"journal_mode={self._pragma('journal_mode')} "
+            f"synchronous={self._pragma('synchronous')} "
+            f"cache_size={self._pragma('cache_size')} "
+            f"mmap_size={self._pragma('mmap_size')}"
+        )
+
+        for name, queryset in queries.items():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan = [row[-1] for row in cursor.fetchall()]
+
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - start)
+
+            self.stdout.write(f"\n{name}:")
+            for step in plan:
+                self.stdout.write(f"  {step}")
+            self.stdout.write(
+                f"  median {statistics.median(timings) * 1000:.2f} ms, "
+                f"best {min(timings) * 1000:.2f} ms"
+            )
+
+    def _pragma(self, name: str):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
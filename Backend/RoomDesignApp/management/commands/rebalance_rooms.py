@@ -0,0 +1,78 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Backend.RoomDesignApp.models import Room, RoomModel
+from Backend.RoomDesignApp.routers import ROOM_SHARDS, shard_for_owner
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves every room and its placements to the shard of its owner. Run "
+        "after enabling ROOM_SHARDS or changing the number of shards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rooms would move.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not ROOM_SHARDS:
+            raise CommandError(
+                "Rooms are not sharded, set ROOMDESIGN_ROOM_SHARDS to a comma "
+                "separated list of SQLite files."
+            )
+
+        moves = Counter()
+        for source in ["default", *ROOM_SHARDS]:
+            misplaced = defaultdict(list)
+            rooms = Room.objects.using(source).values_list("id", "owner_id")
+            for room_id, owner_id in rooms.iterator():
+                target = shard_for_owner(owner_id)
+                if target != source:
+                    misplaced[target].append(room_id)
+
+            for target, room_ids in misplaced.items():
+                moves[(source, target)] += len(room_ids)
+                if options["dry_run"]:
+                    continue
+                for start in range(0, len(room_ids), options["batch_size"]):
+                    self._move(
+                        source, target, room_ids[start : start + options["batch_size"]]
+                    )
+
+        for (source, target), count in sorted(moves.items()):
+            verb = "would move" if options["dry_run"] else "moved"
+            self.stdout.write(f"{source} -> {target}: {verb} {count} rooms")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sum(moves.values())} rooms misplaced across "
+                f"{len(ROOM_SHARDS)} shards"
+            )
+        )
+
+    def _move(self, source: str, target: str, room_ids: list):
+        rooms = list(Room.objects.using(source).filter(id__in=room_ids))
+        room_models = list(RoomModel.objects.using(source).filter(room_id__in=room_ids))
+        created_at = {room.id: room.created_at for room in rooms}
+
+        # The target commits first: if the source commit then fails, the rooms
+        # exist in both and the next run only deletes the stale copies.
+        with transaction.atomic(using=source), transaction.atomic(using=target):
+            Room.objects.using(target).bulk_create(rooms, ignore_conflicts=True)
+            # bulk_create stamps auto_now_add fields; keep the originals.
+            for room in rooms:
+                room.created_at = created_at[room.id]
+            Room.objects.using(target).bulk_update(rooms, ["created_at"])
+            RoomModel.objects.using(target).bulk_create(
+                room_models, ignore_conflicts=True
+            )
+
+            RoomModel.objects.using(source).filter(room_id__in=room_ids).delete()
+            Room.objects.using(source).filter(id__in=room_ids).delete()
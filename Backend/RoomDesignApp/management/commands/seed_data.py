@@ -0,0 +1,178 @@
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Backend.RoomDesignApp.management.commands._synthetic import (
+    SEED_PASSWORD,
+    box_glb,
+    catalog_entry,
+)
+from Backend.RoomDesignApp.models import Account, Model, Room, RoomModel
+from Backend.RoomDesignApp.routers import shard_for_owner
+
+# Distinct mesh files written for the catalog and for rooms; models and
+# rooms share them so seeding stays fast however many rows are created.
+_MODEL_MESHES = 32
+_ROOM_MESHES = 8
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-creates synthetic accounts, catalog models with tags, and rooms "
+        "with placements for benchmarking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=100)
+        parser.add_argument("--admins", type=int, default=1)
+        parser.add_argument("--models", type=int, default=2000)
+        parser.add_argument("--rooms", type=int, default=5, help="Rooms per account.")
+        parser.add_argument(
+            "--placements", type=int, default=40, help="Placements per room."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        batch_size = options["batch_size"]
+        run = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+
+        model_meshes = self._write_meshes(
+            "models/seed",
+            rng.uniform([0.3, 0.3, 0.3], [2.5, 2.2, 2.0], (_MODEL_MESHES, 3)),
+        )
+        room_meshes = self._write_meshes(
+            "rooms/seed",
+            rng.uniform([4.0, 2.5, 3.0], [12.0, 3.5, 10.0], (_ROOM_MESHES, 3)),
+        )
+
+        # Hash once: Account.save() would hash per row, bulk_create skips it.
+        password = make_password(SEED_PASSWORD)
+        accounts = Account.objects.bulk_create(
+            [
+                Account(
+                    email=f"seed-{run}-{i}@example.com",
+                    username=f"seed_{run}_{i}",
+                    password=password,
+                    user_id=str(uuid.uuid4()),
+                    is_admin=i < options["admins"],
+                )
+                for i in range(options["accounts"])
+            ],
+            batch_size=batch_size,
+        )
+
+        catalog = []
+        for i in range(options["models"]):
+            name, tags, _ = catalog_entry(rng)
+            file_name, size = model_meshes[rng.integers(len(model_meshes))]
+            catalog.append(
+                Model(
+                    name=name,
+                    description=f"{name} from the seeded catalog",
+                    model_file=file_name,
+                    tags=tags,
+                    size=1,
+                    axis=[0, 0, 0],
+                    rotations=[0, 0, 0],
+                    listed=bool(rng.random() < 0.9),
+                    **_box_geometry(size),
+                )
+            )
+        Model.objects.bulk_create(catalog, batch_size=batch_size)
+
+        rooms_by_shard = defaultdict(list)
+        for account in accounts:
+            for i in range(options["rooms"]):
+                file_name, size = room_meshes[rng.integers(len(room_meshes))]
+                room = Room(
+                    name=f"Room {i + 1}",
+                    description="Seeded room",
+                    owner_id=account.id,
+                    room_file=file_name,
+                    sizes=size.tolist(),
+                    bounds=_box_geometry(size)["bounds"],
+                )
+                rooms_by_shard[shard_for_owner(account.id)].append(room)
+
+        placement_count = 0
+        for using, rooms in rooms_by_shard.items():
+            with transaction.atomic(using=using):
+                Room.objects.using(using).bulk_create(rooms, batch_size=batch_size)
+                placements = []
+                for room in rooms:
+                    placements.extend(
+                        self._placements(rng, room, catalog, options["placements"])
+                    )
+                RoomModel.objects.using(using).bulk_create(
+                    placements, batch_size=batch_size
+                )
+                placement_count += len(placements)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(accounts)} accounts, {len(catalog)} models, "
+                f"{sum(map(len, rooms_by_shard.values()))} rooms and "
+                f"{placement_count} placements in {time.perf_counter() - start:.1f} s "
+                f"(password: {SEED_PASSWORD})"
+            )
+        )
+
+    def _write_meshes(self, directory: str, sizes: np.ndarray) -> list:
+        meshes = []
+        for i, size in enumerate(np.round(sizes, 2)):
+            name = f"{directory}/box_{i:02d}.glb"
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(box_glb(*size)))
+            meshes.append((name, size))
+        return meshes
+
+    def _placements(
+        self, rng: np.random.Generator, room: Room, catalog: list, count: int
+    ) -> list[RoomModel]:
+        lower = np.asarray(room.bounds["min"])
+        upper = np.asarray(room.bounds["max"])
+        chosen = rng.integers(len(catalog), size=count)
+        positions = rng.uniform(lower, upper, (count, 3))
+        positions[:, 1] = 0.0
+        angles = rng.choice([0.0, np.pi / 2, np.pi, 3 * np.pi / 2], size=count)
+        return [
+            RoomModel(
+                room=room,
+                model=catalog[index],
+                size=1,
+                axis=np.round(position, 3).tolist(),
+                rotations=[0.0, float(angle), 0.0],
+            )
+            for index, position, angle in zip(chosen, positions, angles)
+        ]
+
+
+def _box_geometry(size: np.ndarray) -> dict:
+    """
+    Returns the cached geometry fields of a box_glb mesh of the given size.
+    """
+    width, height, depth = (float(value) for value in size)
+    footprint = [
+        [-width / 2, -depth / 2],
+        [width / 2, -depth / 2],
+        [width / 2, depth / 2],
+        [-width / 2, depth / 2],
+    ]
+    return {
+        "bounds": {
+            "min": [-width / 2, 0.0, -depth / 2],
+            "max": [width / 2, height, depth / 2],
+        },
+        "footprint": footprint,
+        "collision_hull": {"points": footprint, "y_min": 0.0, "y_max": height},
+    }
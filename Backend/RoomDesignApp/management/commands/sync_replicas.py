@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database onto each replica in "
+        "DATABASE_REPLICAS. Run it periodically to emulate replication locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep syncing every INTERVAL seconds instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if not replicas:
+            raise CommandError(
+                "No replicas configured, set ROOMDESIGN_DB_REPLICAS to a comma "
+                "separated list of SQLite files."
+            )
+
+        primary = settings.DATABASES["default"]["NAME"]
+        while True:
+            for alias in replicas:
+                start = time.perf_counter()
+                connections[alias].close()
+
+                source = sqlite3.connect(primary)
+                target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+                try:
+                    # The online backup API copies a consistent snapshot
+                    # while the primary keeps taking writes.
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+
+                self.stdout.write(
+                    f"{alias}: synced in {(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,282 @@
+import json
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from Backend.RoomDesignApp import routers
+from Backend.RoomDesignApp.util import instrumentation, metrics, profiling, rate_limit
+from Backend.RoomDesignApp.util.auth import handle_admin
+from Backend.RoomDesignApp.util.general_util import errorResponse
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client keeps reading from the primary after it wrote
+REPLICA_PIN_SECONDS = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+REPLICA_PIN_COOKIE = getattr(settings, "REPLICA_PIN_COOKIE", "pin_primary")
+
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keeps a client on the primary database right after it writes.
+
+    A request is pinned when it carries the pin cookie or uses an unsafe
+    method, and becomes pinned as soon as it writes. Unsafe requests and
+    requests that wrote set the cookie, so the client's next reads also see
+    its own changes rather than a replica that has not caught up yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in _SAFE_METHODS
+        tokens = routers.begin_pinning(REPLICA_PIN_COOKIE in request.COOKIES or unsafe)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_pinning(tokens) or unsafe
+
+        if wrote and routers.DATABASE_REPLICAS:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                "1",
+                max_age=REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Records the number of queries, SQL time, slowest statements, serializer
+    and JSON encoding time and response size of every request.
+
+    They are returned in a Server-Timing header, which browser devtools show
+    per request, and requests slower than SLOW_REQUEST_MS are logged as one
+    JSON line. Queries run on the write queue's writer thread are not
+    attributed to the request that submitted them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not instrumentation.INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+
+        stats = instrumentation.RequestStats()
+        token = instrumentation.current.set(stats)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(instrumentation.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+
+        total_ms = (time.perf_counter() - stats.start) * 1000
+        size = None if response.streaming else len(response.content)
+        timings = [
+            f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.queries} queries"',
+            f"serialize;dur={stats.serialize_seconds * 1000:.2f}",
+            f"encode;dur={stats.encode_seconds * 1000:.2f}",
+            f"total;dur={total_ms:.2f}",
+        ]
+        if size is not None:
+            timings.append(f'size;desc="{size} bytes"')
+        response["Server-Timing"] = ", ".join(timings)
+
+        if total_ms >= instrumentation.SLOW_REQUEST_MS:
+            logger.warning(
+                json.dumps(
+                    self._log_record(request, response, stats, total_ms, size),
+                    default=str,
+                )
+            )
+        return response
+
+    def _log_record(self, request, response, stats, total_ms: float, size) -> dict:
+        slowest = []
+        for seconds, _, alias, sql, params in stats.slowest_queries():
+            query = {"ms": round(seconds * 1000, 2), "db": alias, "sql": sql}
+            if instrumentation.EXPLAIN_SLOW_QUERIES:
+                query["plan"] = instrumentation.explain(alias, sql, params)
+            slowest.append(query)
+
+        return {
+            "event": "slow_request",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 2),
+            "queries": stats.queries,
+            "sql_ms": round(stats.sql_seconds * 1000, 2),
+            "serialize_ms": round(stats.serialize_seconds * 1000, 2),
+            "encode_ms": round(stats.encode_seconds * 1000, 2),
+            "response_bytes": size,
+            "slowest_queries": slowest,
+        }
+
+
+class MetricsMiddleware:
+    """
+    Records the count, latency, status and database queries of every
+    request under its URL name for the /metrics endpoint.
+
+    Placed after InstrumentationMiddleware so it can read that request's
+    query count and SQL time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics.METRICS_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        stats = instrumentation.current.get()
+        metrics.record_request(
+            match.url_name if match and match.url_name else "unmatched",
+            request.method,
+            response.status_code,
+            elapsed,
+            queries=stats.queries if stats else None,
+            sql_seconds=stats.sql_seconds if stats else None,
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Runs a single request under the sampling profiler when an admin asks
+    for it, through the PROFILE_HEADER header or the PROFILE_PARAM query
+    parameter set to their account id.
+
+    The collapsed stacks are saved under PROFILE_DIR, named after the
+    request's X-Request-ID (or a new id), which is returned in the
+    X-Profile-Id header. Requests without the switch only pay for a
+    header and query string lookup, and with PROFILING_ENABLED off the
+    middleware is not loaded at all.
+    """
+
+    _REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+    def __init__(self, get_response):
+        if not profiling.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.meta_key = "HTTP_" + profiling.PROFILE_HEADER.upper().replace("-", "_")
+
+    def __call__(self, request):
+        if (
+            self.meta_key not in request.META
+            and profiling.PROFILE_PARAM not in request.META.get("QUERY_STRING", "")
+        ):
+            return self.get_response(request)
+
+        admin_id = request.META.get(self.meta_key) or request.GET.get(
+            profiling.PROFILE_PARAM
+        )
+        try:
+            is_admin, _ = handle_admin(admin_id)
+        except ValueError:
+            is_admin = False
+        if not is_admin:
+            return self.get_response(request)
+
+        request_id = request.META.get("HTTP_X_REQUEST_ID", "")
+        if not self._REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        with profiling.SamplingProfiler(threading.get_ident()) as profiler:
+            response = self.get_response(request)
+        profiler.write_collapsed(profiling.profile_path(request_id))
+
+        response["X-Profile-Id"] = request_id
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Caps the requests a worker process serves at once (see
+    rate_limit.ConcurrencyLimiter) and answers the excess right away with
+    503 and Retry-After, so the requests admitted keep their latency when
+    the process is overloaded. Paths in LOAD_SHED_EXEMPT_PATHS, such as
+    /metrics, are always served.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "LOAD_SHED_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limiter = rate_limit.ConcurrencyLimiter()
+        self.exempt_paths = tuple(
+            getattr(settings, "LOAD_SHED_EXEMPT_PATHS", ("/metrics",))
+        )
+
+    def __call__(self, request):
+        if request.path.startswith(self.exempt_paths):
+            return self.get_response(request)
+
+        if not self.limiter.acquire():
+            metrics.inc("roomdesign_requests_shed_total")
+            response = errorResponse("Server is overloaded, retry later", status=503)
+            response["Retry-After"] = str(rate_limit.LOAD_SHED_RETRY_AFTER)
+            return response
+
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            self.limiter.release(time.perf_counter() - start)
+
+
+class RateLimitMiddleware:
+    """
+    Limits how often each client may call each route, with a token bucket
+    per client and URL name sized by RATE_LIMITS. Clients are told apart by
+    IP address (see rate_limit.client_address for requests through trusted
+    proxies): the userid parameter the views take is not authenticated, so
+    a client could pick a fresh one for every request. Requests over budget
+    get 429 with Retry-After.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "RATE_LIMIT_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limiter = rate_limit.RateLimiter()
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        client = rate_limit.client_address(request.META)
+        route = request.resolver_match.url_name or request.path
+
+        retry_after = self.limiter.check(route, client)
+        if not retry_after:
+            return None
+
+        metrics.inc("roomdesign_requests_rate_limited_total", route=route)
+        response = errorResponse("Too many requests, retry later", status=429)
+        response["Retry-After"] = str(max(1, math.ceil(min(retry_after, 3600))))
+        return response
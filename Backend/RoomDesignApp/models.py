@@ -40,20 +40,75 @@ class Model(models.Model):
     tags = models.JSONField(default=list)
     listed = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Geometry parsed once from model_file, see util.geometry
+    bounds = models.JSONField(default=dict)
+    footprint = models.JSONField(default=list)
+    collision_hull = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            # Catalog listing: WHERE listed ORDER BY created_at DESC. Django
+            # renders listed=True as a bare "WHERE listed", which SQLite only
+            # matches against an index with the same partial condition.
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(listed=True),
+                name="model_listed_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    # Single row bumped on every catalog change (model add, update, unlist or
+    # delete); keys the search caches of every worker process
+    version = models.BigIntegerField(default=0)
+    # Random per database, so state kept outside it (see similar_models) is
+    # never mistaken for that of another catalog at the same version
+    identity = models.UUIDField(default=uuid.uuid4, editable=False)
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
+
 class Room(models.Model):
     id = models.UUIDField(
         primary_key=True, default=uuid.uuid4, editable=False, unique=True
     )
     name = models.CharField(max_length=100)
-    owner = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="rooms")
+    # Rooms may live in another database than accounts (see ROOM_SHARDS), so
+    # the relation is not enforced by a database constraint.
+    owner = models.ForeignKey(
+        Account, on_delete=models.CASCADE, related_name="rooms", db_constraint=False
+    )
     description = models.TextField(blank=True)
     room_file = models.FileField(upload_to="rooms/")
     sizes = models.JSONField(default=list)
+    # Geometry parsed once from room_file, see util.geometry
+    bounds = models.JSONField(default=dict)
+    floor_polygon = models.JSONField(default=list)
+    walls = models.JSONField(default=list)
+    # Bumped on every change to the room's placements; keys derived caches
+    revision = models.IntegerField(default=0)
+    # Published by an admin for every user to clone
+    is_template = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Room list: WHERE owner_id = ? ORDER BY created_at DESC
+            models.Index(
+                fields=["owner", "-created_at"], name="room_owner_created_idx"
+            ),
+            # Template list: WHERE is_template ORDER BY created_at DESC
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_template=True),
+                name="room_template_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -64,10 +119,16 @@ class RoomModel(models.Model):
         primary_key=True, default=uuid.uuid4, editable=False, unique=True
     )
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="room_models")
-    model = models.ForeignKey(Model, on_delete=models.CASCADE)
+    model = models.ForeignKey(Model, on_delete=models.CASCADE, db_constraint=False)
     size = models.IntegerField()
     rotations = models.JSONField(default=list)
     axis = models.JSONField(default=list)
 
+    class Meta:
+        indexes = [
+            # Room contents: WHERE room_id = ? ORDER BY id DESC
+            models.Index(fields=["room", "id"], name="roommodel_room_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.model.name} in room {self.room.name}"
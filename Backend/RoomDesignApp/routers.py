@@ -0,0 +1,172 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Aliases in DATABASES that hold read-only copies of "default"
+DATABASE_REPLICAS = getattr(settings, "DATABASE_REPLICAS", [])
+
+# Aliases in DATABASES that rooms and their placements are sharded across
+ROOM_SHARDS = getattr(settings, "ROOM_SHARDS", [])
+
+# Models stored in the owner's shard instead of "default"
+SHARDED_MODELS = {("RoomDesignApp", "room"), ("RoomDesignApp", "roommodel")}
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+_pinned_to_primary: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+_wrote: ContextVar[bool] = ContextVar("wrote", default=False)
+
+
+@contextmanager
+def read_from_replicas():
+    """
+    Lets the queries of a read-only handler (used as a decorator) or block
+    (used as a context manager) go to a replica.
+
+    Only use it around code that never writes what it reads: a handler
+    that loads a row from a possibly stale replica and saves it back would
+    lose concurrent updates.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def begin_pinning(pinned: bool) -> tuple:
+    """
+    Starts a request scope: when ``pinned``, every read in it goes to the
+    primary, and any write in it pins the rest of the scope.
+
+    Returns:
+        Tokens to pass to end_pinning
+    """
+    return (_pinned_to_primary.set(pinned), _wrote.set(False))
+
+
+def end_pinning(tokens: tuple) -> bool:
+    """
+    Ends a scope started by begin_pinning.
+
+    Returns:
+        True when the scope wrote to the database
+    """
+    wrote = _wrote.get()
+    _pinned_to_primary.reset(tokens[0])
+    _wrote.reset(tokens[1])
+    return wrote
+
+
+def is_pinned_to_primary() -> bool:
+    """
+    Returns True when the current request scope reads from the primary.
+    """
+    return _pinned_to_primary.get() or _wrote.get()
+
+
+def shard_for_owner(owner_id) -> str | None:
+    """
+    Returns the alias of the shard holding the rooms of an Account (by its
+    primary key), or None when rooms are not sharded.
+    """
+    if not ROOM_SHARDS:
+        return None
+    digest = hashlib.blake2b(str(owner_id).encode(), digest_size=8).digest()
+    return ROOM_SHARDS[int.from_bytes(digest, "big") % len(ROOM_SHARDS)]
+
+
+def room_databases() -> list[str | None]:
+    """
+    Returns every alias that may hold rooms. [None] when rooms are not
+    sharded, which leaves the choice of database to the routers as usual.
+    """
+    return list(ROOM_SHARDS) or [None]
+
+
+def _is_sharded(model) -> bool:
+    return (model._meta.app_label, model._meta.model_name) in SHARDED_MODELS
+
+
+class RoomShardRouter:
+    """
+    Keeps Room and RoomModel rows in the shard of the room's owner.
+
+    Rows loaded from a shard stay there (saves, deletes and related
+    lookups follow the instance), new rooms go to ``shard_for_owner``, and
+    catalog rows reached from a sharded instance are read from "default".
+    Querysets without an instance are routed explicitly by the room util
+    handlers with ``.using()``. Does nothing when ROOM_SHARDS is empty.
+    """
+
+    def _db_for_room(self, model, hints):
+        instance = hints.get("instance")
+        if instance is None:
+            return None
+        model_name = instance._meta.model_name
+        if _is_sharded(type(instance)) and instance._state.db:
+            # Stay where the row was loaded, even before it is rebalanced.
+            return instance._state.db
+        if model_name == "room":
+            return shard_for_owner(instance.owner_id)
+        if model_name == "account" and instance.pk is not None:
+            return shard_for_owner(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not ROOM_SHARDS:
+            return None
+        if _is_sharded(model):
+            return self._db_for_room(model, hints)
+
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in ROOM_SHARDS:
+            return PrimaryReplicaRouter().db_for_read(model) or "default"
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not ROOM_SHARDS or not _is_sharded(model):
+            return None
+        return self._db_for_room(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Rooms reference accounts and models in "default" by ID only.
+        return True if ROOM_SHARDS else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in ROOM_SHARDS:
+            return None
+        return (app_label, model_name) in SHARDED_MODELS
+
+
+class PrimaryReplicaRouter:
+    """
+    Routes reads inside ``read_from_replicas`` to a random replica and
+    everything else, including all writes, to "default".
+
+    Writing pins the current context to the primary, and
+    ReplicaPinningMiddleware carries that pin over to the client's next
+    requests for REPLICA_PIN_SECONDS while replicas catch up.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not DATABASE_REPLICAS or not _replica_reads.get():
+            return None
+        if _pinned_to_primary.get():
+            return "default"
+        return random.choice(DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _pinned_to_primary.set(True)
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copied from the primary, see manage.py sync_replicas.
+        return db not in DATABASE_REPLICAS
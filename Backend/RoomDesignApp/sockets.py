@@ -0,0 +1,122 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+
+import Backend.RoomDesignApp.util.room as room_utils
+from Backend.RoomDesignApp.util import room_events
+
+# Path of the room editing socket, below the app's URL prefix
+ROOM_SOCKET_PATH = "/RoomDesignApp/ws/room/"
+
+# Close codes: the application range (4000-4999) mirrors HTTP statuses
+_CLOSE_BAD_REQUEST = 4400
+_CLOSE_NOT_FOUND = 4404
+
+
+async def room_socket(scope, receive, send):
+    """
+    WebSocket for editing a room together with its other editors.
+
+    Expects query parameters:
+        - id: <str> (required, ID of the room to edit)
+        - userid: <str> (required, ID of the user editing, who must be
+            allowed to open the room)
+
+    Sends JSON messages:
+        - {"type": "snapshot", "revision", "room_models"}: every placement,
+            first on connect and again if the editor falls behind
+        - {"type": "frame", "revision", "events"}: at most one per tick,
+            with "add" (room_model), "update" (id, size, axis, rotations)
+            and "delete" (id) events
+        - {"type": "error", "id", "error"}: a rejected transform update
+        - {"type": "room_deleted"}, after which the socket is closed
+
+    Accepts JSON messages:
+        - {"type": "update", "id", "size"?, "axis"?, "rotations"?}: moves a
+            placement of this room; updates to the same placement within a
+            tick are merged and only the result is saved
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    params = parse_qs(scope.get("query_string", b"").decode())
+    user_id = params.get("userid", [None])[0]
+    room_id = params.get("id", [None])[0]
+    if not user_id or not room_id:
+        await send({"type": "websocket.close", "code": _CLOSE_BAD_REQUEST})
+        return
+
+    try:
+        room, success, _ = await sync_to_async(room_utils.handle_get_room_by_id)(
+            user_id, room_id, ["id"]
+        )
+    except (ValidationError, ValueError):
+        success = False
+    editor = room_events.Editor(user_id)
+    if not success or not await room_events.hub.join(room.id, room._state.db, editor):
+        await send({"type": "websocket.close", "code": _CLOSE_NOT_FOUND})
+        return
+
+    await send({"type": "websocket.accept"})
+    sender = asyncio.create_task(_send_outbox(editor, send))
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message["type"] == "websocket.receive":
+                _handle_message(editor, message.get("text") or message.get("bytes"))
+            if sender.done():
+                break
+    finally:
+        room_events.hub.leave(editor)
+        sender.cancel()
+
+
+def _handle_message(editor: room_events.Editor, text):
+    try:
+        message = json.loads(text)
+    except (TypeError, ValueError):
+        message = None
+
+    if (
+        not isinstance(message, dict)
+        or message.get("type") != "update"
+        or not message.get("id")
+    ):
+        editor.deliver({"type": "error", "id": None, "error": "Invalid message"})
+        return
+
+    # Only placements of this room: changes to another room's would never
+    # show up in this channel's frames.
+    room_model_id = str(message["id"])
+    if room_model_id not in editor.channel.rows:
+        editor.deliver(
+            {
+                "type": "error",
+                "id": room_model_id,
+                "error": "Room model not found in this room",
+            }
+        )
+        return
+
+    fields = {
+        field: message[field]
+        for field in room_events.TRANSFORM_FIELDS
+        if field in message
+    }
+    if fields:
+        editor.channel.submit(editor, room_model_id, fields)
+
+
+async def _send_outbox(editor: room_events.Editor, send):
+    while True:
+        message = await editor.outbox.get()
+        if message is None:
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        await send({"type": "websocket.send", "text": room_events.encode(message)})
@@ -1,3 +1,661 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+import uuid
+from ipaddress import ip_network
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import IntegrityError, OperationalError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import resolve, reverse
+
+from Backend.RoomDesignApp import routers
+from Backend.RoomDesignApp.middleware import RateLimitMiddleware
+from Backend.RoomDesignApp.models import Account, Model, Room, RoomModel
+from Backend.RoomDesignApp.util import rate_limit, room_events, write_behind
+from Backend.RoomDesignApp.util import write_queue
+from Backend.RoomDesignApp.util.coalescing import SingleFlight, coalesce_view
+from Backend.RoomDesignApp.util.rate_limit import (
+    RateLimiter,
+    TokenBucket,
+    client_address,
+)
+from Backend.RoomDesignApp.util.room_models import room_model_to_json_serializer
+from Backend.RoomDesignApp.util.write_behind import WriteBehindBuffer
+from Backend.RoomDesignApp.util.write_queue import WriteQueue, serialized_write
+
+
+def create_account(email: str, is_admin: bool = False) -> Account:
+    # A stored hash, so the password is not hashed again.
+    return Account.objects.create(
+        email=email, password="pbkdf2_test", username=email, is_admin=is_admin
+    )
+
+
+def create_room(owner: Account, name: str = "Room") -> Room:
+    return Room.objects.create(name=name, owner=owner, room_file="rooms/room.glb")
+
+
+def place(room: Room, model: Model, **transform) -> RoomModel:
+    return RoomModel.objects.create(
+        room=room,
+        model=model,
+        size=transform.get("size", 1),
+        axis=transform.get("axis", [0, 0, 0]),
+        rotations=transform.get("rotations", [0, 0, 0]),
+    )
+
+
+@serialized_write
+def _thread_name(using: str | None = None) -> str:
+    return threading.current_thread().name
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "result"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.do("key", compute)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({result for result, _ in results}, {"result"})
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 3)
+
+    def test_error_reaches_every_caller_and_is_not_kept(self):
+        flights = SingleFlight()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flights.do("key", fail)
+        self.assertEqual(flights.do("key", lambda: "again"), ("again", False))
+
+
+class CoalesceViewTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.calls = 0
+
+        @coalesce_view
+        def view(request):
+            self.calls += 1
+            time.sleep(0.2)
+            response = JsonResponse({"call": self.calls})
+            response["Cache-Control"] = "max-age=5"
+            response.set_cookie("leader", "1")
+            return response
+
+        self.view = view
+
+    def _concurrently(self, requests: list) -> list:
+        responses = [None] * len(requests)
+
+        def serve(index):
+            responses[index] = self.view(requests[index])
+
+        threads = [
+            threading.Thread(target=serve, args=(index,))
+            for index in range(len(requests))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_identical_requests_share_the_response(self):
+        responses = self._concurrently(
+            [self.factory.get("/models/", {"listed": "true"}) for _ in range(4)]
+        )
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({response.content for response in responses}, {b'{"call": 1}'})
+        for response in responses:
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertEqual(response["Cache-Control"], "max-age=5")
+        # Only the leader's own response carries its cookies.
+        self.assertEqual(sum("leader" in response.cookies for response in responses), 1)
+
+    def test_different_query_strings_are_not_shared(self):
+        self._concurrently(
+            [
+                self.factory.get("/models/", {"listed": flag})
+                for flag in ("true", "false")
+            ]
+        )
+        self.assertEqual(self.calls, 2)
+
+    def test_writes_are_not_coalesced(self):
+        self._concurrently([self.factory.post("/models/") for _ in range(2)])
+        self.assertEqual(self.calls, 2)
+
+    def test_sync_view_is_shared_under_asgi(self):
+        async def serve():
+            # What ASGIHandler does for every request: sync code runs on a
+            # thread of the request's own.
+            async with ThreadSensitiveContext():
+                return await sync_to_async(self.view)(
+                    self.factory.get("/models/", {"listed": "true"})
+                )
+
+        async def serve_all():
+            return await asyncio.gather(*(serve() for _ in range(4)))
+
+        responses = asyncio.run(serve_all())
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({response.content for response in responses}, {b'{"call": 1}'})
+
+
+class WriteQueueTests(TransactionTestCase):
+    def _submit_concurrently(self, writer: WriteQueue, jobs: list) -> list:
+        results = [None] * len(jobs)
+
+        def submit(index):
+            try:
+                results[index] = writer.submit(*jobs[index])
+            except Exception as e:
+                results[index] = e
+
+        threads = [
+            threading.Thread(target=submit, args=(index,)) for index in range(len(jobs))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_mutations_commit_in_one_group(self):
+        writer = WriteQueue("default", max_wait=0.5)
+
+        results = self._submit_concurrently(
+            writer, [(create_account, f"user{i}@example.com") for i in range(4)]
+        )
+
+        self.assertTrue(all(isinstance(result, Account) for result in results))
+        self.assertEqual(Account.objects.count(), 4)
+        self.assertEqual(writer.stats()["batches"], 1)
+        self.assertEqual(writer.stats()["mutations"], 4)
+
+    def test_failing_mutation_is_rolled_back_alone(self):
+        create_account("taken@example.com")
+        writer = WriteQueue("default", max_wait=0.5)
+
+        results = self._submit_concurrently(
+            writer,
+            [
+                (create_account, "first@example.com"),
+                (create_account, "taken@example.com"),
+                (create_account, "second@example.com"),
+            ],
+        )
+
+        self.assertEqual(
+            sum(isinstance(result, IntegrityError) for result in results), 1
+        )
+        self.assertEqual(
+            set(Account.objects.values_list("email", flat=True)),
+            {"taken@example.com", "first@example.com", "second@example.com"},
+        )
+        self.assertEqual(writer.stats()["replayed_batches"], 0)
+
+    def test_failed_group_commit_is_replayed_one_by_one(self):
+        writer = WriteQueue("default")
+
+        with mock.patch.object(
+            writer, "_commit_group", side_effect=OperationalError("disk I/O error")
+        ):
+            account = writer.submit(create_account, "replayed@example.com")
+
+        self.assertEqual(Account.objects.get().email, account.email)
+        self.assertEqual(writer.stats()["replayed_batches"], 1)
+
+    def test_each_database_has_its_own_writer(self):
+        self.assertIs(write_queue.write_queue(), write_queue.write_queue("default"))
+        self.assertIsNot(
+            write_queue.write_queue("default"), write_queue.write_queue("rooms_0")
+        )
+
+    @mock.patch.object(write_queue, "WRITE_QUEUE_ENABLED", True)
+    def test_serialized_write_runs_on_the_writer_of_its_database(self):
+        self.assertEqual(_thread_name(), "room-design-writer-default")
+        self.assertEqual(_thread_name(using="default"), "room-design-writer-default")
+
+        # The writer could not see the caller's uncommitted transaction.
+        with transaction.atomic():
+            self.assertEqual(_thread_name(), threading.current_thread().name)
+
+
+@mock.patch.object(routers, "ROOM_SHARDS", ["rooms_0", "rooms_1"])
+class RoomShardRouterTests(SimpleTestCase):
+    def test_owners_are_spread_over_the_shards(self):
+        shards = {routers.shard_for_owner(owner_id) for owner_id in range(200)}
+
+        self.assertEqual(shards, {"rooms_0", "rooms_1"})
+        self.assertEqual(routers.shard_for_owner(7), routers.shard_for_owner("7"))
+
+    def test_unsharded(self):
+        with mock.patch.object(routers, "ROOM_SHARDS", []):
+            self.assertIsNone(routers.shard_for_owner(7))
+            self.assertEqual(routers.room_databases(), [None])
+            self.assertIsNone(
+                routers.RoomShardRouter().db_for_write(Room, instance=Room(owner_id=7))
+            )
+
+    def test_new_rooms_go_to_the_owners_shard(self):
+        router = routers.RoomShardRouter()
+
+        self.assertEqual(
+            router.db_for_write(Room, instance=Room(owner_id=7)),
+            routers.shard_for_owner(7),
+        )
+
+    def test_loaded_rows_stay_in_their_shard(self):
+        router = routers.RoomShardRouter()
+        room = Room(owner_id=7)
+        other = {"rooms_0": "rooms_1", "rooms_1": "rooms_0"}[routers.shard_for_owner(7)]
+        room._state.db = other
+
+        self.assertEqual(router.db_for_write(Room, instance=room), other)
+        self.assertEqual(router.db_for_read(RoomModel, instance=room), other)
+
+    def test_catalog_rows_reached_from_a_shard_are_read_from_default(self):
+        room = Room(owner_id=7)
+        room._state.db = "rooms_0"
+
+        self.assertEqual(
+            routers.RoomShardRouter().db_for_read(Model, instance=room), "default"
+        )
+
+    def test_shards_only_hold_rooms_and_placements(self):
+        router = routers.RoomShardRouter()
+
+        self.assertTrue(router.allow_migrate("rooms_0", "RoomDesignApp", "room"))
+        self.assertTrue(router.allow_migrate("rooms_0", "RoomDesignApp", "roommodel"))
+        self.assertFalse(router.allow_migrate("rooms_0", "RoomDesignApp", "model"))
+        self.assertIsNone(router.allow_migrate("default", "RoomDesignApp", "model"))
+
+
+@mock.patch.object(routers, "DATABASE_REPLICAS", ["replica_0"])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.tokens = routers.begin_pinning(False)
+        self.addCleanup(routers.end_pinning, self.tokens)
+
+    def test_only_marked_reads_go_to_replicas(self):
+        self.assertIsNone(self.router.db_for_read(Model))
+        with routers.read_from_replicas():
+            self.assertEqual(self.router.db_for_read(Model), "replica_0")
+
+    def test_pinned_requests_read_from_the_primary(self):
+        tokens = routers.begin_pinning(True)
+        try:
+            with routers.read_from_replicas():
+                self.assertEqual(self.router.db_for_read(Model), "default")
+        finally:
+            routers.end_pinning(tokens)
+
+    def test_writing_pins_the_rest_of_the_request(self):
+        self.assertEqual(self.router.db_for_write(Model), "default")
+
+        self.assertTrue(routers.is_pinned_to_primary())
+        with routers.read_from_replicas():
+            self.assertEqual(self.router.db_for_read(Model), "default")
+
+
+class WriteBehindTests(TestCase):
+    def setUp(self):
+        self.owner = create_account("owner@example.com")
+        self.model = Model.objects.create(
+            name="Chair", model_file="models/chair.glb", size=1
+        )
+        self.room = create_room(self.owner)
+        self.room_model = place(self.room, self.model)
+        # Never due, so only explicit flushes save.
+        self.buffer = WriteBehindBuffer(flush_interval=3600, idle=3600)
+
+    def _moved(self, room_model: RoomModel, size: int) -> RoomModel:
+        moved = RoomModel.objects.get(id=room_model.id)
+        moved.size = size
+        moved.axis = [size, 0, 0]
+        return moved
+
+    def test_buffered_transform_is_overlaid_until_saved(self):
+        self.buffer.put(self._moved(self.room_model, 3))
+
+        loaded = RoomModel.objects.get(id=self.room_model.id)
+        self.assertEqual(loaded.size, 1)
+        self.assertEqual(self.buffer.overlay(loaded).size, 3)
+        self.assertEqual(self.buffer.overlay(loaded).axis, [3, 0, 0])
+
+    def test_flush_saves_transforms_and_bumps_the_revision(self):
+        revision = self.room.revision
+        self.buffer.put(self._moved(self.room_model, 2))
+        self.buffer.put(self._moved(self.room_model, 3))
+
+        self.assertEqual(self.buffer.flush(), 1)
+
+        self.assertEqual(RoomModel.objects.get(id=self.room_model.id).size, 3)
+        self.assertEqual(Room.objects.get(id=self.room.id).revision, revision + 1)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_flush_of_one_room_keeps_the_others_buffered(self):
+        other_room = create_room(self.owner, "Other")
+        other = place(other_room, self.model)
+        self.buffer.put(self._moved(self.room_model, 2))
+        self.buffer.put(self._moved(other, 2))
+
+        self.assertEqual(self.buffer.flush(room_id=self.room.id), 1)
+
+        self.assertEqual(RoomModel.objects.get(id=other.id).size, 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(RoomModel.objects.get(id=other.id).size, 2)
+
+    def test_placements_deleted_meanwhile_are_skipped(self):
+        self.buffer.put(self._moved(self.room_model, 2))
+        self.room_model.delete()
+
+        self.buffer.flush()
+
+        self.assertFalse(RoomModel.objects.exists())
+
+    def test_listeners_hear_of_every_buffered_transform(self):
+        heard = []
+        self.buffer.subscribe(heard.append)
+        moved = self._moved(self.room_model, 2)
+
+        self.buffer.put(moved)
+
+        self.assertEqual(heard, [moved])
+
+    def test_hub_sends_buffered_transforms_with_the_next_frame(self):
+        hub = room_events.RoomEventHub()
+        channel = room_events.RoomChannel(
+            self.room.id,
+            None,
+            self.room.revision,
+            {str(self.room_model.id): room_model_to_json_serializer(self.room_model)},
+        )
+        editor = room_events.Editor(str(self.owner.id))
+        editor.channel = channel
+        channel.editors.add(editor)
+        hub.channels[self.room.id] = channel
+
+        hub.buffered(self._moved(self.room_model, 3))
+        with mock.patch.object(room_events, "_poll_rooms", return_value={}):
+            asyncio.run(hub.tick())
+
+        frame = editor.outbox.get_nowait()
+        self.assertEqual(frame["type"], "frame")
+        self.assertEqual(
+            frame["events"],
+            [
+                {
+                    "type": "update",
+                    "id": str(self.room_model.id),
+                    "size": 3,
+                    "axis": [3, 0, 0],
+                    "rotations": [0, 0, 0],
+                }
+            ],
+        )
+
+
+class RateLimitTests(SimpleTestCase):
+    def test_token_bucket_refills_at_its_rate(self):
+        bucket = TokenBucket(rate=1.0, burst=2, now=0.0)
+
+        self.assertEqual(bucket.take(0.0), 0.0)
+        self.assertEqual(bucket.take(0.0), 0.0)
+        self.assertAlmostEqual(bucket.take(0.0), 1.0)
+        self.assertAlmostEqual(bucket.take(0.5), 0.5)
+        self.assertEqual(bucket.take(1.0), 0.0)
+
+    def test_budgets_are_per_client_and_route(self):
+        limiter = RateLimiter({"default": (1.0, 1), "login": (1.0, 2)})
+
+        self.assertEqual(limiter.check("get_models", "198.51.100.1"), 0.0)
+        self.assertGreater(limiter.check("get_models", "198.51.100.1"), 0.0)
+        self.assertEqual(limiter.check("get_models", "198.51.100.2"), 0.0)
+        self.assertEqual(limiter.check("login", "198.51.100.1"), 0.0)
+        self.assertEqual(limiter.check("login", "198.51.100.1"), 0.0)
+        self.assertGreater(limiter.check("login", "198.51.100.1"), 0.0)
+
+    def test_routes_without_a_budget_are_not_limited(self):
+        limiter = RateLimiter({"login": (1.0, 1)})
+
+        for _ in range(5):
+            self.assertEqual(limiter.check("get_models", "198.51.100.1"), 0.0)
+
+    def test_least_recent_clients_are_forgotten(self):
+        limiter = RateLimiter({"default": (1.0, 1)}, max_clients=1)
+
+        limiter.check("get_models", "198.51.100.1")
+        limiter.check("get_models", "198.51.100.2")
+
+        self.assertEqual(limiter.check("get_models", "198.51.100.1"), 0.0)
+
+    @mock.patch.object(
+        rate_limit, "RATE_LIMIT_TRUSTED_PROXIES", [ip_network("10.0.0.0/8")]
+    )
+    def test_client_address(self):
+        # Forwarded addresses from untrusted peers are ignored.
+        self.assertEqual(
+            client_address(
+                {"REMOTE_ADDR": "203.0.113.5", "HTTP_X_FORWARDED_FOR": "198.51.100.7"}
+            ),
+            "203.0.113.5",
+        )
+        # Behind trusted proxies, the nearest untrusted hop is the client,
+        # whatever it put in front of its own address.
+        self.assertEqual(
+            client_address(
+                {
+                    "REMOTE_ADDR": "10.0.0.1",
+                    "HTTP_X_FORWARDED_FOR": "192.0.2.1, 198.51.100.7, 10.0.0.2",
+                }
+            ),
+            "198.51.100.7",
+        )
+        self.assertEqual(client_address({"REMOTE_ADDR": "10.0.0.1"}), "10.0.0.1")
+
+    @override_settings(RATE_LIMIT_ENABLED=True)
+    def test_middleware_answers_requests_over_budget_with_429(self):
+        middleware = RateLimitMiddleware(lambda request: HttpResponse())
+        middleware.limiter = RateLimiter({"default": (1.0, 1)})
+        request = RequestFactory().get(reverse("get_models"))
+        request.resolver_match = resolve(request.path)
+
+        self.assertIsNone(middleware.process_view(request, None, (), {}))
+        response = middleware.process_view(request, None, (), {})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+class EndpointErrorTests(TestCase):
+    def setUp(self):
+        self.owner = create_account("owner@example.com")
+        self.other = create_account("other@example.com")
+        self.admin = create_account("admin@example.com", is_admin=True)
+        self.model = Model.objects.create(
+            name="Chair", model_file="models/chair.glb", size=1
+        )
+        self.room = create_room(self.owner)
+        self.room_model = place(self.room, self.model)
+
+    def assertError(self, response, status: int, message: str | None = None):
+        self.assertEqual(response.status_code, status)
+        if message is not None:
+            self.assertEqual(response.json()["error"], message)
+
+    def _update_room(self, room_data: str, user: Account | None = None):
+        return self.client.post(
+            reverse("update_room"),
+            {
+                "id": self.room.id,
+                "userid": (user or self.owner).id,
+                "room_data": room_data,
+            },
+        )
+
+    def _update_room_model(self, data: str, user: Account | None = None, id=None):
+        return self.client.post(
+            reverse("update_room_model"),
+            {
+                "id": id or self.room_model.id,
+                "userid": (user or self.owner).id,
+                "room_model_data": data,
+            },
+        )
+
+    def test_update_room(self):
+        self.assertError(
+            self.client.get(reverse("update_room")), 405, "Only POST method allowed"
+        )
+        for room_data in ("{", "[1]", "1", '"name"', "null"):
+            self.assertError(self._update_room(room_data), 400, "Invalid room data")
+        self.assertError(
+            self._update_room(json.dumps({"room_file": "rooms/other.glb"})),
+            400,
+            "room_file must be an uploaded file",
+        )
+        self.assertError(self._update_room(json.dumps({"name": "x"}), self.other), 400)
+
+        response = self._update_room(json.dumps({"name": "Renamed"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Room.objects.get(id=self.room.id).name, "Renamed")
+
+    @mock.patch.object(write_behind, "WRITE_BEHIND_ENABLED", False)
+    def test_update_room_model(self):
+        for data in ("{", "[1]", "1", "null"):
+            self.assertError(
+                self._update_room_model(data), 400, "Invalid room model data"
+            )
+        self.assertError(
+            self._update_room_model('{"size": 2}', id=uuid.uuid4()),
+            400,
+            "Room model not found with the given ID",
+        )
+        self.assertError(
+            self._update_room_model('{"size": 2}', self.other),
+            400,
+            "You do not have permission to access this model",
+        )
+        self.assertEqual(RoomModel.objects.get(id=self.room_model.id).size, 1)
+
+        response = self._update_room_model('{"size": 2}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RoomModel.objects.get(id=self.room_model.id).size, 2)
+        self.assertEqual(
+            Room.objects.get(id=self.room.id).revision, self.room.revision + 1
+        )
+
+    def test_update_room_model_write_behind(self):
+        buffer = WriteBehindBuffer(flush_interval=3600, idle=3600)
+        with mock.patch.object(
+            write_behind, "WRITE_BEHIND_ENABLED", True
+        ), mock.patch.object(write_behind, "buffer", buffer):
+            self.assertError(
+                self._update_room_model('{"size": "big"}'),
+                400,
+            )
+            self.assertEqual(self._update_room_model('{"size": 2}').status_code, 200)
+
+        self.assertEqual(RoomModel.objects.get(id=self.room_model.id).size, 1)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(RoomModel.objects.get(id=self.room_model.id).size, 2)
+
+    def test_update_model(self):
+        def update(model_data: str, user: Account):
+            return self.client.post(
+                reverse("update_model"),
+                {"id": self.model.id, "userid": user.id, "model_data": model_data},
+            )
+
+        self.assertError(update("[1]", self.admin), 400, "Invalid model ID or data")
+        self.assertError(
+            update('{"name": "x"}', self.owner),
+            403,
+            "Unauthorized: Admin access required",
+        )
+        self.assertError(
+            update(json.dumps({"model_file": "models/other.glb"}), self.admin),
+            400,
+            "model_file must be an uploaded file",
+        )
+        self.assertEqual(update('{"name": "Stool"}', self.admin).status_code, 200)
+        self.assertEqual(Model.objects.get(id=self.model.id).name, "Stool")
+
+    def test_clone_room(self):
+        def clone(room_id, user: Account):
+            return self.client.post(
+                reverse("clone_room"), {"id": room_id, "userid": user.id}
+            )
+
+        self.assertError(self.client.get(reverse("clone_room")), 405)
+        self.assertError(
+            self.client.post(reverse("clone_room"), {"id": self.room.id}),
+            400,
+            "Missing required fields",
+        )
+        self.assertError(clone(uuid.uuid4(), self.owner), 404)
+        self.assertError(clone(self.room.id, self.other), 404)
+
+        response = clone(self.room.id, self.owner)
+        self.assertEqual(response.status_code, 201)
+        copy = Room.objects.get(id=response.json()["id"])
+        self.assertEqual(copy.owner_id, self.owner.id)
+        self.assertEqual(RoomModel.objects.filter(room=copy).count(), 1)
+
+    def test_spatial_query(self):
+        def query(user: Account | None = None, **params):
+            return self.client.get(
+                reverse("room_spatial_query"),
+                {"id": self.room.id, "userid": (user or self.owner).id, **params},
+            )
+
+        self.assertError(
+            self.client.get(reverse("room_spatial_query")),
+            400,
+            "Missing required fields",
+        )
+        self.assertError(
+            query(), 400, "A point, box, inside or overlaps query is required"
+        )
+        self.assertError(
+            query(overlaps=uuid.uuid4()), 400, "Room model not found in this room"
+        )
+        self.assertError(
+            query(self.other, point="0,0.5,0"), 400, "Room not found with the given ID"
+        )
+
+        response = query(point="0,0.5,0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["room_models"], [str(self.room_model.id)])
@@ -5,6 +5,7 @@ urlpatterns = [
     # Room URLs
     path("rooms/", views.get_rooms_view, name="get_rooms"),
     path("room/get/", views.get_room_view, name="get_room"),
+    path("room/baked/", views.get_baked_room_view, name="get_baked_room"),
     path(
         "room_model/get/", views.get_room_model_by_id_view, name="get_room_model_by_id"
     ),  # <-- added
@@ -14,9 +15,15 @@ urlpatterns = [
     ),
     path("rooms/update/", views.update_room_view, name="update_room"),
     path("rooms/delete/", views.delete_room_view, name="delete_room"),
+    path("rooms/clone/", views.clone_room_view, name="clone_room"),
+    path("rooms/templates/", views.get_template_rooms_view, name="get_template_rooms"),
+    path("rooms/validate/", views.validate_room_view, name="validate_room"),
     # RoomModel URLs
     path("room_models/update/", views.update_room_model_view, name="update_room_model"),
     path("room_models/delete/", views.delete_room_model_view, name="delete_room_model"),
+    path(
+        "room_models/query/", views.room_spatial_query_view, name="room_spatial_query"
+    ),
     # Model URLs
     path("models/", views.get_models_view, name="get_models"),
     path("model/get/", views.get_model_view, name="get_model"),
@@ -24,6 +31,8 @@ urlpatterns = [
     path("models/update/", views.update_model_view, name="update_model"),
     path("models/delete/", views.delete_model_view, name="delete_model"),
     path("models/search/", views.search_model_view, name="search_model"),
+    path("models/typeahead/", views.typeahead_view, name="typeahead"),
+    path("models/similar/", views.similar_models_view, name="similar_models"),
     path("models/unlist/", views.unlist_model_view, name="unlist_model"),
     # Auth URLs
     path("auth/login/", views.login, name="login"),
@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import OrderedDict
+
+from Backend.RoomDesignApp.util import metrics
+
+# Returned by TTLCache.get on a miss, as None may be a cached value
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache holding at most ``max_size`` entries, each
+    for at most ``ttl`` seconds, evicting the least recently used first.
+    Every lookup is counted as a hit or miss of ``name`` in the metrics.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache(self.name, entry is not None)
+        return entry[1] if entry is not None else MISSING
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from Backend.RoomDesignApp import routers
+from Backend.RoomDesignApp.util import metrics
+
+# Let identical concurrent GET requests to coalesced views share one response
+COALESCING_ENABLED = getattr(settings, "COALESCING_ENABLED", True)
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time. Callers that ask for a
+    key while its computation is in flight wait for it and get the same
+    result (or exception) instead of computing it again.
+
+    The in-flight result is a concurrent.futures.Future, which threads wait
+    on directly and coroutines await through asyncio.wrap_future, so sync
+    and async callers, on any thread or event loop, share one flight.
+    """
+
+    def __init__(self):
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return future, False
+            future = self._flights[key] = Future()
+            return future, True
+
+    def _land(self, key, future: Future, result=None, error=None):
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, func) -> tuple[object, bool]:
+        """
+        Returns (func(), shared), where shared is True when the result came
+        from a computation another caller started.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, result)
+        return result, False
+
+    async def ado(self, key, func) -> tuple[object, bool]:
+        """
+        Async counterpart of do for a coroutine function ``func``.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future), True
+
+        try:
+            result = await func()
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, result)
+        return result, False
+
+
+_flights = SingleFlight()
+
+
+def _request_key(view, request) -> tuple:
+    # Pinned and unpinned requests may read different databases.
+    return (
+        view.__module__,
+        view.__qualname__,
+        routers.is_pinned_to_primary(),
+        tuple(sorted((name, tuple(values)) for name, values in request.GET.lists())),
+    )
+
+
+def _shared_copy(response: HttpResponse) -> HttpResponse:
+    # Cookies are left out: they belong to the client that set them off.
+    return HttpResponse(
+        response.content,
+        status=response.status_code,
+        reason=response.reason_phrase,
+        headers=response.headers,
+    )
+
+
+def coalesce_view(view):
+    """
+    Decorator for read-only views. Concurrent GET requests with the same
+    query string wait for the one already being answered and each get a
+    copy of its serialized body and headers, instead of running the same
+    queries and serialization again. Works on sync views and async views
+    alike. Under ASGI, Django runs the sync code of each request on a thread
+    of its own (see asgiref's ThreadSensitiveContext), so concurrent requests
+    to a sync view share flights there just as WSGI worker threads do.
+    """
+
+    def record(request, shared: bool):
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else view.__name__
+        metrics.inc(
+            "roomdesign_coalesced_requests_total",
+            route=route,
+            result="shared" if shared else "computed",
+        )
+
+    if iscoroutinefunction(view):
+
+        async def async_wrapper(request, *args, **kwargs):
+            if not COALESCING_ENABLED or request.method != "GET":
+                return await view(request, *args, **kwargs)
+
+            response, shared = await _flights.ado(
+                _request_key(view, request), lambda: view(request, *args, **kwargs)
+            )
+            record(request, shared)
+            return _shared_copy(response) if shared else response
+
+        return markcoroutinefunction(functools.wraps(view)(async_wrapper))
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not COALESCING_ENABLED or request.method != "GET":
+            return view(request, *args, **kwargs)
+
+        response, shared = _flights.do(
+            _request_key(view, request), lambda: view(request, *args, **kwargs)
+        )
+        record(request, shared)
+        return _shared_copy(response) if shared else response
+
+    return wrapper
@@ -1,5 +1,37 @@
-from django.http import JsonResponse
+from Backend.RoomDesignApp.util.instrumentation import JsonResponse
 
 
 def errorResponse(message: str, status: int = 400) -> JsonResponse:
     return JsonResponse({"error": message}, status=status)
+
+
+def parse_vector(value: str | None, length: int = 3) -> list[float] | None:
+    """
+    Parses a comma-separated query parameter such as "1.5,0,2" into floats.
+    Returns None when the value is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        vector = [float(part) for part in value.split(",")]
+    except ValueError:
+        return None
+    return vector if len(vector) == length else None
+
+
+def parse_fields(value: str | None, allowed: tuple[str, ...]) -> list[str] | None:
+    """
+    Parses a comma-separated fields= query parameter such as "id,name,img".
+    Returns the requested fields in the order of ``allowed``, or None when
+    the value is missing so callers fall back to every field.
+
+    Raises:
+        ValueError: A requested field is not in ``allowed``
+    """
+    if not value:
+        return None
+    requested = {part.strip() for part in value.split(",") if part.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in allowed if field in requested] or None
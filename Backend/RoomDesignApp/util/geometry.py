@@ -0,0 +1,625 @@
+import base64
+import json
+import math
+import struct
+
+import numpy as np
+
+# Meshes are read in the glTF convention: Y is up and the floor is the XZ
+# plane, so footprints are 2D polygons of (x, z) points.
+
+GLB_MAGIC = 0x46546C67
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+
+COLLISION_HULL_MAX_POINTS = 16
+
+_COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+_TYPE_SIZES = {
+    "SCALAR": 1,
+    "VEC2": 2,
+    "VEC3": 3,
+    "VEC4": 4,
+    "MAT2": 4,
+    "MAT3": 9,
+    "MAT4": 16,
+}
+
+
+def load_gltf(data: bytes) -> tuple[dict, bytes]:
+    """
+    Parses a binary (.glb) or embedded JSON (.gltf) glTF asset.
+
+    Args:
+        data: Raw file contents
+
+    Returns:
+        Tuple of (glTF JSON document, binary chunk or b"")
+    """
+    if len(data) >= 12 and struct.unpack_from("<I", data, 0)[0] == GLB_MAGIC:
+        _, _, length = struct.unpack_from("<III", data, 0)
+        offset = 12
+        doc, bin_chunk = None, b""
+        while offset + 8 <= min(length, len(data)):
+            chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+            chunk = data[offset + 8 : offset + 8 + chunk_length]
+            if chunk_type == GLB_CHUNK_JSON:
+                doc = json.loads(chunk)
+            elif chunk_type == GLB_CHUNK_BIN and not bin_chunk:
+                bin_chunk = chunk
+            offset += 8 + chunk_length
+        if doc is None:
+            raise ValueError("GLB file has no JSON chunk")
+        return doc, bin_chunk
+
+    return json.loads(data), b""
+
+
+def _buffer_bytes(doc: dict, bin_chunk: bytes, buffer_index: int) -> bytes:
+    buffer = doc["buffers"][buffer_index]
+    uri = buffer.get("uri")
+    if uri is None:
+        return bin_chunk
+    if uri.startswith("data:"):
+        return base64.b64decode(uri.split(",", 1)[1])
+    raise ValueError(f"External glTF buffer '{uri}' is not supported")
+
+
+def read_accessor(doc: dict, bin_chunk: bytes, accessor_index: int) -> np.ndarray:
+    """
+    Reads a glTF accessor into an array of shape (count, components).
+    """
+    accessor = doc["accessors"][accessor_index]
+    dtype = np.dtype(_COMPONENT_DTYPES[accessor["componentType"]])
+    components = _TYPE_SIZES[accessor["type"]]
+    count = accessor["count"]
+
+    if "bufferView" not in accessor:
+        return np.zeros((count, components), dtype=dtype)
+
+    view = doc["bufferViews"][accessor["bufferView"]]
+    buffer = _buffer_bytes(doc, bin_chunk, view["buffer"])
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    element_size = dtype.itemsize * components
+    stride = view.get("byteStride") or element_size
+
+    if stride == element_size:
+        values = np.frombuffer(
+            buffer, dtype=dtype, count=count * components, offset=offset
+        )
+        return values.reshape(count, components)
+
+    values = np.ndarray(
+        shape=(count, components),
+        dtype=dtype,
+        buffer=buffer,
+        offset=offset,
+        strides=(stride, dtype.itemsize),
+    )
+    return np.array(values)
+
+
+def _node_matrix(node: dict) -> np.ndarray:
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+
+    x, y, z, w = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    rotation = np.array(
+        [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ]
+    )
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.array(node.get("scale", [1.0, 1.0, 1.0]))
+    matrix[:3, 3] = node.get("translation", [0.0, 0.0, 0.0])
+    return matrix
+
+
+def iter_mesh_instances(doc: dict):
+    """
+    Yields (mesh_index, world_matrix) for every mesh in the default scene.
+    """
+    nodes = doc.get("nodes", [])
+    scenes = doc.get("scenes")
+
+    if scenes:
+        roots = scenes[doc.get("scene", 0)].get("nodes", [])
+    else:
+        children = {child for node in nodes for child in node.get("children", [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+
+    stack = [(index, np.eye(4)) for index in roots]
+    while stack:
+        index, parent_matrix = stack.pop()
+        node = nodes[index]
+        matrix = parent_matrix @ _node_matrix(node)
+        if "mesh" in node:
+            yield node["mesh"], matrix
+        stack.extend((child, matrix) for child in node.get("children", []))
+
+
+def transform_points(points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def _gltf_vertices(data: bytes) -> np.ndarray:
+    doc, bin_chunk = load_gltf(data)
+    chunks = []
+    for mesh_index, matrix in iter_mesh_instances(doc):
+        for primitive in doc["meshes"][mesh_index].get("primitives", []):
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None:
+                continue
+            points = read_accessor(doc, bin_chunk, position).astype(np.float64)
+            chunks.append(transform_points(points, matrix))
+    return np.concatenate(chunks) if chunks else np.empty((0, 3))
+
+
+def _obj_vertices(data: bytes) -> np.ndarray:
+    lines = [
+        line[2:]
+        for line in data.decode("utf-8", errors="ignore").splitlines()
+        if line.startswith("v ")
+    ]
+    if not lines:
+        return np.empty((0, 3))
+    return np.loadtxt(lines, usecols=(0, 1, 2), dtype=np.float64, ndmin=2)
+
+
+def read_obj(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parses the vertices and faces of a Wavefront .obj file.
+    Polygons are fan-triangulated.
+
+    Returns:
+        Tuple of (vertices (N, 3), flat triangle indices)
+    """
+    vertices, faces = [], []
+    for line in data.decode("utf-8", errors="ignore").splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "v":
+            vertices.append([float(value) for value in parts[1:4]])
+        elif parts[0] == "f":
+            corners = [int(part.split("/")[0]) for part in parts[1:]]
+            corners = [c - 1 if c > 0 else len(vertices) + c for c in corners]
+            faces.extend(
+                [corners[0], corners[i], corners[i + 1]]
+                for i in range(1, len(corners) - 1)
+            )
+    return np.array(vertices, dtype=np.float64).reshape(-1, 3), np.array(
+        faces, dtype=np.int64
+    ).reshape(-1)
+
+
+def _read_mesh_file(file) -> tuple[str, bytes]:
+    name = (getattr(file, "name", "") or "").lower()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    data = file.read()
+    if hasattr(file, "seek"):
+        file.seek(0)
+
+    if not name.endswith((".obj", ".glb", ".gltf")):
+        raise ValueError(f"Unsupported mesh format: '{name}'")
+    return name, data
+
+
+def load_mesh_vertices(file) -> np.ndarray:
+    """
+    Loads every vertex of a .glb, .gltf or .obj file in scene space.
+
+    Args:
+        file: A Django File / UploadedFile (or any object with name and read())
+
+    Returns:
+        Array of shape (N, 3)
+    """
+    name, data = _read_mesh_file(file)
+
+    if name.endswith(".obj"):
+        return _obj_vertices(data)
+    return _gltf_vertices(data)
+
+
+def load_mesh_triangles(file) -> np.ndarray:
+    """
+    Loads every triangle of a .glb, .gltf or .obj file in scene space.
+
+    Args:
+        file: A Django File / UploadedFile (or any object with name and read())
+
+    Returns:
+        Array of shape (T, 3, 3): T triangles of three [x, y, z] corners
+    """
+    name, data = _read_mesh_file(file)
+
+    if name.endswith(".obj"):
+        vertices, indices = read_obj(data)
+        return vertices[indices].reshape(-1, 3, 3)
+
+    doc, bin_chunk = load_gltf(data)
+    chunks = []
+    for mesh_index, matrix in iter_mesh_instances(doc):
+        for primitive in doc["meshes"][mesh_index].get("primitives", []):
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None or primitive.get("mode", 4) != 4:
+                continue
+            points = read_accessor(doc, bin_chunk, position).astype(np.float64)
+            if "indices" in primitive:
+                indices = read_accessor(doc, bin_chunk, primitive["indices"])
+                indices = indices.reshape(-1).astype(np.int64)
+            else:
+                indices = np.arange(len(points))
+            indices = indices[: len(indices) // 3 * 3]
+            chunks.append(transform_points(points, matrix)[indices].reshape(-1, 3, 3))
+    return np.concatenate(chunks) if chunks else np.empty((0, 3, 3))
+
+
+def convex_hull_2d(points: np.ndarray) -> np.ndarray:
+    """
+    Returns the convex hull of 2D points in counter-clockwise order
+    (Andrew's monotone chain).
+
+    Points inside the quadrilateral of the axis extremes are discarded first,
+    so the Python loop only sees the few candidates near the boundary.
+    """
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    if len(points) < 3:
+        return points
+
+    extremes = points[
+        [
+            np.argmin(points[:, 0]),
+            np.argmin(points[:, 1]),
+            np.argmax(points[:, 0]),
+            np.argmax(points[:, 1]),
+        ]
+    ]
+    inside = np.ones(len(points), dtype=bool)
+    for a, b in zip(extremes, np.roll(extremes, -1, axis=0)):
+        cross = (b[0] - a[0]) * (points[:, 1] - a[1]) - (b[1] - a[1]) * (
+            points[:, 0] - a[0]
+        )
+        inside &= cross > 0
+    points = points[~inside]
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    for point in points[::-1]:
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def simplify_hull(hull: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Reduces a convex polygon to at most ``max_points`` vertices by keeping
+    its support points along evenly spaced directions.
+    """
+    if len(hull) <= max_points:
+        return hull
+
+    angles = np.linspace(0.0, 2.0 * math.pi, max_points, endpoint=False)
+    directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    support = np.unique(np.argmax(hull @ directions.T, axis=0))
+    return hull[support]
+
+
+def compute_mesh_geometry(file) -> tuple[dict | None, bool, str]:
+    """
+    Computes the cached geometry stored on a catalog Model.
+
+    Args:
+        file: The uploaded model file
+
+    Returns:
+        Tuple of (geometry dict or None, success_bool, message). The dict
+        holds:
+
+            - bounds: {"min": [x, y, z], "max": [x, y, z]}
+            - footprint: convex hull of the mesh projected on the floor,
+              as a list of [x, z] points
+            - collision_hull: {"points": [[x, z], ...], "y_min", "y_max"},
+              a prism of at most COLLISION_HULL_MAX_POINTS sides
+    """
+    try:
+        vertices = load_mesh_vertices(file)
+    except (ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+        return (None, False, f"Could not read model geometry: {str(e)}")
+
+    vertices = vertices[np.isfinite(vertices).all(axis=1)]
+    if not len(vertices):
+        return (None, False, "Model file contains no vertices")
+
+    lower = vertices.min(axis=0)
+    upper = vertices.max(axis=0)
+    footprint = convex_hull_2d(vertices[:, [0, 2]])
+    proxy = simplify_hull(footprint, COLLISION_HULL_MAX_POINTS)
+
+    return (
+        {
+            "bounds": {"min": lower.tolist(), "max": upper.tolist()},
+            "footprint": footprint.round(6).tolist(),
+            "collision_hull": {
+                "points": proxy.round(6).tolist(),
+                "y_min": float(lower[1]),
+                "y_max": float(upper[1]),
+            },
+        },
+        True,
+        "Geometry computed",
+    )
+
+
+# Placements (RoomModel) are positioned by ``axis`` = [x, y, z], rotated by
+# ``rotations`` = [rx, ry, rz] Euler angles in radians applied in XYZ order
+# (the three.js default) and uniformly scaled by ``size``.
+
+DEFAULT_MODEL_BOUNDS = {"min": [-0.5, 0.0, -0.5], "max": [0.5, 1.0, 0.5]}
+
+
+def _as_vectors(values: list, length: int = 3) -> np.ndarray:
+    try:
+        vectors = np.asarray(values, dtype=np.float64)
+        if vectors.shape == (len(values), length):
+            return vectors
+    except (TypeError, ValueError):
+        pass
+
+    # Ragged input: missing components (e.g. an empty axis) default to 0.
+    vectors = np.zeros((len(values), length), dtype=np.float64)
+    for row, value in enumerate(values):
+        value = [float(v) for v in (value or [])[:length]]
+        vectors[row, : len(value)] = value
+    return vectors
+
+
+def euler_to_matrices(rotations: np.ndarray) -> np.ndarray:
+    """
+    Converts (N, 3) XYZ Euler angles to (N, 3, 3) rotation matrices.
+    """
+    cx, cy, cz = np.cos(rotations).T
+    sx, sy, sz = np.sin(rotations).T
+    matrices = np.empty((len(rotations), 3, 3))
+    matrices[:, 0, 0] = cy * cz
+    matrices[:, 0, 1] = -cy * sz
+    matrices[:, 0, 2] = sy
+    matrices[:, 1, 0] = cx * sz + sx * sy * cz
+    matrices[:, 1, 1] = cx * cz - sx * sy * sz
+    matrices[:, 1, 2] = -sx * cy
+    matrices[:, 2, 0] = sx * sz - cx * sy * cz
+    matrices[:, 2, 1] = sx * cz + cx * sy * sz
+    matrices[:, 2, 2] = cx * cy
+    return matrices
+
+
+def placement_matrices(sizes: list, axes: list, rotations: list) -> np.ndarray:
+    """
+    Returns (N, 4, 4) model-to-room matrices for a batch of placements.
+    """
+    scale = np.asarray([float(size or 1) for size in sizes], dtype=np.float64)
+    matrices = np.zeros((len(scale), 4, 4))
+    matrices[:, :3, :3] = (
+        euler_to_matrices(_as_vectors(rotations)) * scale[:, None, None]
+    )
+    matrices[:, :3, 3] = _as_vectors(axes)
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def placement_bounds(
+    model_bounds: list, sizes: list, axes: list, rotations: list
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes room-space axis-aligned bounds for a batch of placements.
+
+    Args:
+        model_bounds: Model.bounds of each placed model ({} when unknown)
+        sizes: RoomModel.size of each placement
+        axes: RoomModel.axis of each placement
+        rotations: RoomModel.rotations of each placement
+
+    Returns:
+        Tuple of (mins, maxs), each an array of shape (N, 3)
+    """
+    if not len(sizes):
+        return np.empty((0, 3)), np.empty((0, 3))
+
+    lower = _as_vectors([(b or DEFAULT_MODEL_BOUNDS)["min"] for b in model_bounds])
+    upper = _as_vectors([(b or DEFAULT_MODEL_BOUNDS)["max"] for b in model_bounds])
+    matrices = placement_matrices(sizes, axes, rotations)
+
+    linear = matrices[:, :3, :3]
+    centers = np.einsum("nij,nj->ni", linear, (lower + upper) / 2) + matrices[:, :3, 3]
+    extents = np.einsum("nij,nj->ni", np.abs(linear), (upper - lower) / 2)
+    return centers - extents, centers + extents
+
+
+# Room shells: floor triangles face up (|normal.y| close to 1) at the lowest
+# level of the mesh, wall triangles are vertical (normal.y close to 0).
+
+_FLOOR_NORMAL_MIN_Y = 0.9
+_WALL_NORMAL_MAX_Y = 0.1
+_SNAP_DECIMALS = 4
+
+
+def _unit_normals(triangles: np.ndarray) -> np.ndarray:
+    normals = np.cross(
+        triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+    )
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(lengths > 0, lengths, 1.0)
+
+
+def _polygon_area(polygon: np.ndarray) -> float:
+    x, z = polygon[:, 0], polygon[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(z, -1)) - np.dot(z, np.roll(x, -1)))
+
+
+def floor_outline(triangles: np.ndarray, floor_level: float) -> np.ndarray:
+    """
+    Returns the outline of the floor as a counter-clockwise [x, z] polygon.
+
+    The outline is traced along the edges used by exactly one floor
+    triangle, so L-shaped and other concave rooms keep their shape. Falls
+    back to the convex hull when the edges do not form a simple loop.
+    """
+    normals = _unit_normals(triangles)
+    tolerance = 1e-3 + 0.01 * float(np.ptp(triangles[:, :, 1]))
+    is_floor = (np.abs(normals[:, 1]) >= _FLOOR_NORMAL_MIN_Y) & (
+        triangles[:, :, 1].max(axis=1) <= floor_level + tolerance
+    )
+    floor = triangles[is_floor][:, :, [0, 2]].round(_SNAP_DECIMALS)
+    if not len(floor):
+        return convex_hull_2d(triangles.reshape(-1, 3)[:, [0, 2]])
+
+    points, ids = np.unique(floor.reshape(-1, 2), axis=0, return_inverse=True)
+    ids = ids.reshape(-1, 3)
+    edges = np.sort(
+        np.concatenate([ids[:, [0, 1]], ids[:, [1, 2]], ids[:, [2, 0]]]), axis=1
+    )
+    edges, counts = np.unique(edges, axis=0, return_counts=True)
+    boundary = edges[counts == 1]
+
+    neighbours: dict[int, list[int]] = {}
+    for a, b in boundary.tolist():
+        neighbours.setdefault(a, []).append(b)
+        neighbours.setdefault(b, []).append(a)
+
+    if not neighbours or any(len(n) != 2 for n in neighbours.values()):
+        return convex_hull_2d(points)
+
+    loops, visited = [], set()
+    for start in neighbours:
+        if start in visited:
+            continue
+        loop, previous, current = [start], None, start
+        visited.add(start)
+        while True:
+            a, b = neighbours[current]
+            following = b if a == previous else a
+            if following == start:
+                break
+            loop.append(following)
+            visited.add(following)
+            previous, current = current, following
+        loops.append(points[loop])
+
+    outline = max(loops, key=lambda loop: abs(_polygon_area(loop)))
+    return outline if _polygon_area(outline) > 0 else outline[::-1]
+
+
+def wall_segments(triangles: np.ndarray) -> list[list[list[float]]]:
+    """
+    Returns the walls of a room as [[x1, z1], [x2, z2]] floor segments.
+
+    Vertical triangles are projected onto their wall line and collinear,
+    overlapping pieces are merged into one segment per wall face.
+    """
+    normals = _unit_normals(triangles)
+    vertical = np.abs(normals[:, 1]) <= _WALL_NORMAL_MAX_Y
+    triangles, normals = triangles[vertical], normals[vertical][:, [0, 2]]
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    keep = lengths[:, 0] > 0
+    triangles, normals = triangles[keep], normals[keep] / lengths[keep]
+    if not len(triangles):
+        return []
+
+    # Both faces of a wall share a line; fold normals to one half-plane.
+    flip = (normals[:, 0] < 0) | ((normals[:, 0] == 0) & (normals[:, 1] < 0))
+    normals[flip] *= -1
+    directions = np.stack([-normals[:, 1], normals[:, 0]], axis=1)
+
+    corners = triangles[:, :, [0, 2]]
+    offsets = np.einsum("tj,tkj->tk", normals, corners).mean(axis=1)
+    along = np.einsum("tj,tkj->tk", directions, corners)
+
+    groups: dict[tuple, list[list[float]]] = {}
+    for normal, offset, start, end in zip(
+        normals.round(2).tolist(),
+        offsets.round(_SNAP_DECIMALS - 1).tolist(),
+        along.min(axis=1).tolist(),
+        along.max(axis=1).tolist(),
+    ):
+        if end - start > 10**-_SNAP_DECIMALS:
+            groups.setdefault((*normal, offset), []).append([start, end])
+
+    segments = []
+    for (nx, nz, offset), intervals in groups.items():
+        normal = np.array([nx, nz]) / np.hypot(nx, nz)
+        direction = np.array([-normal[1], normal[0]])
+        intervals.sort()
+        merged = [intervals[0]]
+        for start, end in intervals[1:]:
+            if start <= merged[-1][1] + 10**-_SNAP_DECIMALS:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        for start, end in merged:
+            endpoints = normal * offset + np.outer([start, end], direction)
+            # Adding 0.0 turns -0.0 into 0.0 in the stored JSON.
+            segments.append((endpoints.round(_SNAP_DECIMALS) + 0.0).tolist())
+    return segments
+
+
+def compute_room_geometry(file) -> tuple[dict | None, bool, str]:
+    """
+    Computes the cached geometry stored on a Room from its room file.
+
+    Args:
+        file: The uploaded room file
+
+    Returns:
+        Tuple of (geometry dict or None, success_bool, message). The dict
+        holds:
+
+            - bounds: {"min": [x, y, z], "max": [x, y, z]}
+            - sizes: [width, height, depth] of the bounds
+            - floor_polygon: the floor outline as a list of [x, z] points
+            - walls: list of [[x1, z1], [x2, z2]] wall segments
+    """
+    try:
+        triangles = load_mesh_triangles(file)
+    except (ValueError, KeyError, IndexError, TypeError, struct.error, OSError) as e:
+        return (None, False, f"Could not read room geometry: {str(e)}")
+
+    triangles = triangles[np.isfinite(triangles).all(axis=(1, 2))]
+    if not len(triangles):
+        return (None, False, "Room file contains no triangles")
+
+    vertices = triangles.reshape(-1, 3)
+    lower = vertices.min(axis=0)
+    upper = vertices.max(axis=0)
+
+    return (
+        {
+            "bounds": {"min": lower.tolist(), "max": upper.tolist()},
+            "sizes": (upper - lower).tolist(),
+            "floor_polygon": floor_outline(triangles, float(lower[1]))
+            .round(_SNAP_DECIMALS)
+            .tolist(),
+            "walls": wall_segments(triangles),
+        },
+        True,
+        "Geometry computed",
+    )
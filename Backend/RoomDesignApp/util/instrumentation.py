@@ -0,0 +1,145 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+
+from django import http
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+# Record queries, serializer and JSON encoding time for every request
+INSTRUMENTATION_ENABLED = getattr(settings, "INSTRUMENTATION_ENABLED", True)
+
+# Requests slower than this (ms) are logged with their slowest statements
+SLOW_REQUEST_MS = getattr(settings, "SLOW_REQUEST_MS", 500)
+
+# Slowest statements kept per request
+SLOWEST_QUERIES = getattr(settings, "INSTRUMENTATION_SLOWEST_QUERIES", 3)
+
+# Attach EXPLAIN QUERY PLAN output to the slowest statements of slow requests
+EXPLAIN_SLOW_QUERIES = getattr(settings, "INSTRUMENTATION_EXPLAIN", False)
+
+current: contextvars.ContextVar["RequestStats | None"] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+class RequestStats:
+    """
+    Timings collected while one request is handled.
+
+    The phases do not overlap: queries run by a serializer count towards
+    ``sql_seconds`` and not towards ``serialize_seconds``.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.encode_seconds = 0.0
+        # Min-heap of (seconds, order, alias, sql, params)
+        self.slowest = []
+        self._order = itertools.count()
+        self._depth = {"serialize": 0, "encode": 0}
+
+    def record_query(self, seconds: float, alias: str, sql: str, params):
+        self.queries += 1
+        self.sql_seconds += seconds
+        entry = (seconds, next(self._order), alias, sql, params)
+        if len(self.slowest) < SLOWEST_QUERIES:
+            heapq.heappush(self.slowest, entry)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    @contextmanager
+    def phase(self, name: str):
+        # Only the outermost block of a phase counts, nested serializers
+        # are already inside its time.
+        self._depth[name] += 1
+        start, sql_before = time.perf_counter(), self.sql_seconds
+        try:
+            yield
+        finally:
+            self._depth[name] -= 1
+            if not self._depth[name]:
+                elapsed = time.perf_counter() - start
+                elapsed -= self.sql_seconds - sql_before
+                setattr(
+                    self, f"{name}_seconds", getattr(self, f"{name}_seconds") + elapsed
+                )
+
+    def slowest_queries(self) -> list[tuple]:
+        return sorted(self.slowest, reverse=True)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing every statement of the current request.
+    """
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(
+            time.perf_counter() - start, context["connection"].alias, sql, params
+        )
+
+
+def timed(phase: str):
+    """
+    Decorator adding a function's run time to the current request's
+    ``phase`` ("serialize" or "encode"). Free when no request is recorded.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = current.get()
+            if stats is None:
+                return func(*args, **kwargs)
+            with stats.phase(phase):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedJSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder that records its encoding time on the current request.
+    """
+
+    @timed("encode")
+    def encode(self, o):
+        return super().encode(o)
+
+
+class JsonResponse(http.JsonResponse):
+    """
+    JsonResponse whose encoding time shows up in the request's timings.
+    """
+
+    def __init__(self, data, encoder=TimedJSONEncoder, **kwargs):
+        super().__init__(data, encoder=encoder, **kwargs)
+
+
+def explain(alias: str, sql: str, params) -> str | None:
+    """
+    Returns SQLite's EXPLAIN QUERY PLAN for a recorded SELECT statement.
+    """
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return "; ".join(row[-1] for row in cursor.fetchall())
+    except Exception as e:
+        return f"unavailable: {e}"
@@ -0,0 +1,255 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+from Backend.RoomDesignApp.models import Model, Room
+from Backend.RoomDesignApp.util import metrics
+from Backend.RoomDesignApp.util.room_bake import BAKED_ROOMS_DIR
+
+# Only the upload targets of Model.model_file, Model.img and Room.room_file,
+# and baked rooms, are served; anything else under MEDIA_ROOT stays private.
+SERVED_MEDIA_PREFIXES = (
+    Model._meta.get_field("model_file").upload_to,
+    Model._meta.get_field("img").upload_to,
+    Room._meta.get_field("room_file").upload_to,
+    BAKED_ROOMS_DIR,
+)
+
+MEDIA_CACHE_CONTROL = getattr(
+    settings, "MEDIA_CACHE_CONTROL", "public, max-age=31536000, immutable"
+)
+MEDIA_ETAG_CACHE_SIZE = getattr(settings, "MEDIA_ETAG_CACHE_SIZE", 4096)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_etag_cache: OrderedDict[tuple, str] = OrderedDict()
+_etag_cache_lock = threading.Lock()
+
+
+class FileRange:
+    """
+    File-like view over the byte range [start, start + length) of an open file.
+
+    The underlying file is positioned at ``start`` and ``fileno()`` is
+    exposed, so WSGI servers with a ``wsgi.file_wrapper`` (gunicorn, uWSGI)
+    can hand the range to ``sendfile`` using the response Content-Length.
+    Servers without one fall back to the bounded ``read``.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self._file = file
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def resolve_media_path(path: str) -> tuple[str | None, bool, str]:
+    """
+    Resolves a media-relative path to an absolute path inside MEDIA_ROOT.
+
+    Args:
+        path: Path relative to MEDIA_ROOT, as stored in a FileField name
+
+    Returns:
+        Tuple of (absolute path or None, success_bool, message)
+    """
+    # Resolve ".." before checking the prefix, so "models/../x" cannot reach
+    # files outside the served directories.
+    normalized = posixpath.normpath(path.replace("\\", "/").lstrip("/"))
+
+    if not normalized.startswith(SERVED_MEDIA_PREFIXES):
+        return (None, False, "File not found")
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, normalized)
+    except SuspiciousFileOperation:
+        return (None, False, "File not found")
+
+    if not os.path.isfile(full_path):
+        return (None, False, "File not found")
+
+    return (full_path, True, "File found")
+
+
+def compute_strong_etag(full_path: str, stat: os.stat_result) -> str:
+    """
+    Returns a strong ETag derived from the file contents.
+
+    The digest is computed once per (path, size, mtime) and kept in a
+    bounded LRU, so repeated requests only cost a ``stat``.
+    """
+    key = (full_path, stat.st_size, stat.st_mtime_ns)
+
+    with _etag_cache_lock:
+        etag = _etag_cache.get(key)
+        if etag is not None:
+            _etag_cache.move_to_end(key)
+    metrics.record_cache("media_etag", etag is not None)
+    if etag is not None:
+        return etag
+
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+
+    with _etag_cache_lock:
+        _etag_cache[key] = etag
+        _etag_cache.move_to_end(key)
+        while len(_etag_cache) > MEDIA_ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+
+    return etag
+
+
+def parse_range_header(header: str, file_size: int) -> tuple[int, int] | None | bool:
+    """
+    Parses a single-range ``Range: bytes=...`` header.
+
+    Args:
+        header: Raw value of the Range header
+        file_size: Size of the file in bytes
+
+    Returns:
+        (start, end) inclusive byte positions for a satisfiable range,
+        None when the header should be ignored and the full file served,
+        False when the range is not satisfiable.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # Multi-range requests are allowed to be answered with the full body.
+        return None
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if not start_str:
+            suffix_length = int(end_str)
+            if suffix_length <= 0:
+                return False
+            start = max(file_size - suffix_length, 0)
+            end = file_size - 1
+        else:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size:
+        return False
+
+    if end < start:
+        return None
+
+    return (start, min(end, file_size - 1))
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def build_media_response(request, full_path: str) -> HttpResponse:
+    """
+    Builds a cacheable response for a media file, honouring conditional
+    and Range requests.
+
+    Args:
+        request: Incoming GET or HEAD request
+        full_path: Absolute path of the file to serve
+
+    Returns:
+        FileResponse (200/206), or an empty 304/416 response.
+    """
+    stat = os.stat(full_path)
+    etag = compute_strong_etag(full_path, stat)
+    last_modified = http_date(stat.st_mtime)
+
+    def with_cache_headers(response: HttpResponse) -> HttpResponse:
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        response["Cache-Control"] = MEDIA_CACHE_CONTROL
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return with_cache_headers(HttpResponseNotModified())
+    else:
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        if if_modified_since is not None and int(stat.st_mtime) <= if_modified_since:
+            return with_cache_headers(HttpResponseNotModified())
+
+    file_size = stat.st_size
+    byte_range = None
+
+    range_header = request.headers.get("Range")
+    if range_header:
+        # If-Range only allows a partial response while the client's copy
+        # is still current; otherwise the whole file is sent.
+        if_range = request.headers.get("If-Range")
+        if if_range is None or if_range.strip() == etag:
+            byte_range = parse_range_header(range_header, file_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{file_size}"
+        return with_cache_headers(response)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    if full_path.lower().endswith(".glb"):
+        content_type = "model/gltf-binary"
+    content_type = content_type or "application/octet-stream"
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = str(file_size)
+        return with_cache_headers(response)
+
+    f = open(full_path, "rb")
+
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+        response["Content-Length"] = str(file_size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileRange(f, start, length), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+
+    return with_cache_headers(response)
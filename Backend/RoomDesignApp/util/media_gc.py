@@ -0,0 +1,149 @@
+import os
+import time
+import uuid
+
+from django.conf import settings
+
+from Backend.RoomDesignApp.models import Model, Room
+from Backend.RoomDesignApp.routers import room_databases
+from Backend.RoomDesignApp.util import metrics
+from Backend.RoomDesignApp.util.media import SERVED_MEDIA_PREFIXES
+from Backend.RoomDesignApp.util.room_bake import BAKED_ROOMS_DIR, baked_room_name
+
+# Files younger than this many seconds are never collected: an upload is
+# stored before the row that references it is committed.
+MEDIA_GC_MIN_AGE = getattr(settings, "MEDIA_GC_MIN_AGE", 3600)
+
+# Orphans re-checked against the database and removed together
+MEDIA_GC_BATCH_SIZE = getattr(settings, "MEDIA_GC_BATCH_SIZE", 500)
+
+
+def _referenced_media(names: list[str] | None = None) -> set[str]:
+    """
+    Returns the media-relative names of every file a Model or Room (in any
+    shard) references, including each room's current baked asset. With
+    ``names``, only those of the given names that are referenced.
+
+    Always reads the primary: a file a replica does not know about yet is
+    still in use.
+    """
+    referenced = set()
+    for column in ("model_file", "img"):
+        models = Model.objects.exclude(**{f"{column}__isnull": True})
+        if names is not None:
+            models = models.filter(**{f"{column}__in": names})
+        referenced.update(models.values_list(column, flat=True).iterator())
+
+    for using in room_databases():
+        rooms = Room.objects.using(using)
+        if names is not None:
+            referenced.update(
+                rooms.filter(room_file__in=names)
+                .values_list("room_file", flat=True)
+                .iterator()
+            )
+            rooms = rooms.filter(id__in=_baked_room_ids(names))
+        else:
+            referenced.update(rooms.values_list("room_file", flat=True).iterator())
+        referenced.update(
+            baked_room_name(room) for room in rooms.only("id", "revision").iterator()
+        )
+
+    referenced.discard("")
+    return referenced
+
+
+def _baked_room_ids(names: list[str]) -> set[uuid.UUID]:
+    room_ids = set()
+    for name in names:
+        directory, _, room_id = os.path.dirname(name).rpartition("/")
+        if f"{directory}/" == BAKED_ROOMS_DIR:
+            try:
+                room_ids.add(uuid.UUID(room_id))
+            except ValueError:
+                pass
+    return room_ids
+
+
+def _stored_media(min_age: float):
+    """
+    Yields (name, size) of the files under the served media directories
+    last modified more than ``min_age`` seconds ago.
+    """
+    cutoff = time.time() - min_age
+    for prefix in SERVED_MEDIA_PREFIXES:
+        top = os.path.join(settings.MEDIA_ROOT, prefix)
+        for directory, _, files in os.walk(top):
+            for file_name in files:
+                full_path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(full_path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime < cutoff:
+                    name = os.path.relpath(full_path, settings.MEDIA_ROOT)
+                    yield name.replace(os.sep, "/"), stat.st_size
+
+
+def collect_orphaned_media(
+    dry_run: bool = True,
+    batch_size: int = MEDIA_GC_BATCH_SIZE,
+    min_age: float = MEDIA_GC_MIN_AGE,
+) -> dict:
+    """
+    Finds stored media no Model or Room references any more (files of
+    deleted models and rooms, replaced uploads, baked assets of old room
+    revisions) and removes them in batches. Each batch is checked against
+    the database again right before its files are removed, so a file that
+    became referenced during the scan is kept.
+
+    Args:
+        dry_run: Only report what would be removed
+        batch_size: Files re-checked and removed together
+        min_age: Skip files modified less than this many seconds ago
+
+    Returns:
+        Report dictionary with the number of files scanned, the orphans
+        found (name and size), and the files and bytes removed
+    """
+    referenced = _referenced_media()
+    report = {"scanned": 0, "orphans": [], "removed": 0, "removed_bytes": 0}
+
+    for name, size in _stored_media(min_age):
+        report["scanned"] += 1
+        if name not in referenced:
+            report["orphans"].append({"name": name, "size": size})
+
+    if dry_run:
+        return report
+
+    orphans = report["orphans"]
+    for start in range(0, len(orphans), batch_size):
+        batch = orphans[start : start + batch_size]
+        in_use = _referenced_media([orphan["name"] for orphan in batch])
+        for orphan in batch:
+            if orphan["name"] in in_use:
+                continue
+            full_path = os.path.join(settings.MEDIA_ROOT, orphan["name"])
+            try:
+                os.remove(full_path)
+            except FileNotFoundError:
+                continue
+            report["removed"] += 1
+            report["removed_bytes"] += orphan["size"]
+            _remove_empty_parents(os.path.dirname(full_path))
+
+    metrics.inc("roomdesign_media_gc_removed_files_total", report["removed"])
+    metrics.inc("roomdesign_media_gc_removed_bytes_total", report["removed_bytes"])
+    return report
+
+
+def _remove_empty_parents(directory: str):
+    # Baked rooms get a directory each; drop it with its last revision.
+    baked_root = os.path.join(settings.MEDIA_ROOT, BAKED_ROOMS_DIR.rstrip("/"))
+    while directory.startswith(baked_root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
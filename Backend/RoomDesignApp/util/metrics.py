@@ -0,0 +1,290 @@
+import glob
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+
+# Record request, cache and database metrics for the /metrics endpoint
+METRICS_ENABLED = getattr(settings, "METRICS_ENABLED", True)
+
+# Directory holding one metrics file per worker process
+METRICS_DIR = getattr(
+    settings,
+    "METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), "roomdesign-metrics"),
+)
+
+# Upper bounds (seconds) of the request latency histogram buckets
+METRICS_LATENCY_BUCKETS = getattr(
+    settings,
+    "METRICS_LATENCY_BUCKETS",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+# Metric name -> (type, help) of everything this module exports
+FAMILIES = {
+    "roomdesign_requests_total": (
+        "counter",
+        "Requests handled, by URL name, method and status.",
+    ),
+    "roomdesign_request_errors_total": (
+        "counter",
+        "Requests answered with a 4xx or 5xx status, by URL name and status.",
+    ),
+    "roomdesign_request_duration_seconds": (
+        "histogram",
+        "Time spent handling a request, by URL name.",
+    ),
+    "roomdesign_db_queries_total": (
+        "counter",
+        "Database queries run while handling requests, by URL name.",
+    ),
+    "roomdesign_db_query_seconds_total": (
+        "counter",
+        "Time spent in database queries while handling requests, by URL name.",
+    ),
+    "roomdesign_cache_requests_total": (
+        "counter",
+        "In-process cache lookups, by cache and result (hit or miss).",
+    ),
+    "roomdesign_similar_models_rebuilds_total": (
+        "counter",
+        "Full reweightings of the similar models TF-IDF matrix.",
+    ),
+    "roomdesign_media_gc_removed_files_total": (
+        "counter",
+        "Orphaned media files removed by collect_orphaned_media.",
+    ),
+    "roomdesign_media_gc_removed_bytes_total": (
+        "counter",
+        "Bytes of orphaned media removed by collect_orphaned_media.",
+    ),
+    "roomdesign_requests_rate_limited_total": (
+        "counter",
+        "Requests answered with 429 for exceeding a client budget, by URL name.",
+    ),
+    "roomdesign_requests_shed_total": (
+        "counter",
+        "Requests answered with 503 because the process was overloaded.",
+    ),
+    "roomdesign_coalesced_requests_total": (
+        "counter",
+        "Coalesced GET requests, by URL name and result (computed or shared).",
+    ),
+    "roomdesign_room_socket_frames_total": (
+        "counter",
+        "Frames of placement changes broadcast to room editing sockets.",
+    ),
+    "roomdesign_write_behind_updates_total": (
+        "counter",
+        "Room model transform updates buffered instead of saved.",
+    ),
+    "roomdesign_write_behind_flushed_total": (
+        "counter",
+        "Buffered room model transforms written to the database.",
+    ),
+}
+
+_HEADER = struct.Struct("<I4x")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_SIZE = 64 * 1024
+
+
+class MmapCounters:
+    """
+    Float counters of one process, kept in a memory-mapped file so any
+    process can read and sum the files of all workers.
+
+    The file starts with the number of bytes in use, followed by entries of
+    (key length, UTF-8 key padded to 8 bytes, float64 value). Entries are
+    only ever appended and the used size is written after the entry, so a
+    reader in another process always sees complete entries.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = {}
+        fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        self._file = os.fdopen(fd, "r+b")
+        size = os.fstat(fd).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._map = mmap.mmap(fd, size)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        for key, offset, _ in _entries(self._map, self._used):
+            self._offsets[key] = offset
+
+    def inc(self, key: str, amount: float = 1.0):
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            value = _VALUE.unpack_from(self._map, offset)[0]
+            _VALUE.pack_into(self._map, offset, value + amount)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode()
+        padded = _KEY_LENGTH.size + len(encoded)
+        padded += -padded % 8
+        end = self._used + padded + _VALUE.size
+        if end > len(self._map):
+            size = len(self._map)
+            while size < end:
+                size *= 2
+            self._file.truncate(size)
+            self._map.resize(size)
+
+        _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+        start = self._used + _KEY_LENGTH.size
+        self._map[start : start + len(encoded)] = encoded
+        offset = self._used + padded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, end)
+        self._offsets[key] = offset
+        return offset
+
+
+def _entries(data, used: int):
+    position = _HEADER.size
+    while position < used:
+        length = _KEY_LENGTH.unpack_from(data, position)[0]
+        start = position + _KEY_LENGTH.size
+        key = bytes(data[start : start + length]).decode()
+        padded = _KEY_LENGTH.size + length
+        padded += -padded % 8
+        offset = position + padded
+        yield key, offset, _VALUE.unpack_from(data, offset)[0]
+        position = offset + _VALUE.size
+
+
+_counters = None
+_counters_pid = None
+_counters_lock = threading.Lock()
+
+
+def _process_counters() -> MmapCounters:
+    # Opened lazily and again after a fork, so preloading workers each write
+    # their own file.
+    global _counters, _counters_pid
+    pid = os.getpid()
+    if _counters_pid != pid:
+        with _counters_lock:
+            if _counters_pid != pid:
+                os.makedirs(METRICS_DIR, exist_ok=True)
+                _counters = MmapCounters(os.path.join(METRICS_DIR, f"metrics_{pid}.db"))
+                _counters_pid = pid
+    return _counters
+
+
+def _key(name: str, **labels) -> str:
+    rendered = ",".join(
+        f'{label}="{_escape(str(value))}"' for label, value in labels.items()
+    )
+    return f"{name}{{{rendered}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def inc(name: str, amount: float = 1.0, **labels):
+    """
+    Adds ``amount`` to the counter ``name`` with the given labels.
+    """
+    if METRICS_ENABLED:
+        _process_counters().inc(_key(name, **labels), amount)
+
+
+def observe(name: str, value: float, **labels):
+    """
+    Records ``value`` in the histogram ``name`` with the given labels.
+    """
+    if not METRICS_ENABLED:
+        return
+    counters = _process_counters()
+    for bound in METRICS_LATENCY_BUCKETS:
+        # Buckets are cumulative; creating all of them up front also keeps
+        # them in order in the file.
+        counters.inc(
+            _key(f"{name}_bucket", **labels, le=bound), 1.0 if value <= bound else 0.0
+        )
+    counters.inc(_key(f"{name}_bucket", **labels, le="+Inf"))
+    counters.inc(_key(f"{name}_sum", **labels), value)
+    counters.inc(_key(f"{name}_count", **labels))
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    Counts one lookup in the named in-process cache.
+    """
+    inc("roomdesign_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_request(
+    route: str,
+    method: str,
+    status: int,
+    seconds: float,
+    queries: int | None = None,
+    sql_seconds: float | None = None,
+):
+    """
+    Records one handled request under its URL name.
+    """
+    if not METRICS_ENABLED:
+        return
+    inc("roomdesign_requests_total", route=route, method=method, status=status)
+    if status >= 400:
+        inc("roomdesign_request_errors_total", route=route, status=status)
+    observe("roomdesign_request_duration_seconds", seconds, route=route)
+    if queries is not None:
+        inc("roomdesign_db_queries_total", queries, route=route)
+        inc("roomdesign_db_query_seconds_total", sql_seconds, route=route)
+
+
+def collect() -> dict[str, float]:
+    """
+    Returns every sample summed over the metrics files of all processes,
+    including processes that have exited since.
+    """
+    totals = {}
+    for path in sorted(glob.glob(os.path.join(METRICS_DIR, "metrics_*.db"))):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if len(data) < _HEADER.size:
+            continue
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        for key, _, value in _entries(data, used):
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def render() -> str:
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    samples = {name: [] for name in FAMILIES}
+    for key, value in collect().items():
+        name = key.split("{", 1)[0]
+        family = name
+        if family not in FAMILIES:
+            family = name.rsplit("_", 1)[0]
+        if family in samples:
+            samples[family].append((key, value))
+
+    lines = []
+    for family, (kind, description) in FAMILIES.items():
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(f"{key} {value!r}" for key, value in samples[family])
+    return "\n".join(lines) + "\n"
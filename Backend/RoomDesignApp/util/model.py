@@ -1,56 +1,104 @@
 from difflib import SequenceMatcher
 import uuid
-from Backend.RoomDesignApp.models import Model
-from django.db.models import QuerySet
-
-
-def model_to_json_serializer(model: Model):
+from django.conf import settings
+from django.core.files import File
+from Backend.RoomDesignApp.models import CatalogVersion, Model, Room, RoomModel
+from Backend.RoomDesignApp.routers import read_from_replicas, room_databases
+from Backend.RoomDesignApp.util.caching import MISSING, TTLCache
+from Backend.RoomDesignApp.util.geometry import compute_mesh_geometry
+from Backend.RoomDesignApp.util.instrumentation import timed
+from Backend.RoomDesignApp.util.write_queue import serialized_write
+from django.db.models import F, QuerySet
+
+# Ranked search results kept per process, keyed by catalog version
+SEARCH_CACHE_SIZE = getattr(settings, "SEARCH_CACHE_SIZE", 1024)
+SEARCH_CACHE_TTL = getattr(settings, "SEARCH_CACHE_TTL", 300)
+
+_search_cache = TTLCache("model_search", SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+# Keys model_to_json_serializer can return, each backed by the Model column
+# of the same name
+MODEL_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "tags",
+    "listed",
+    "img",
+    "model_file",
+    "axis",
+    "rotations",
+    "size",
+    "bounds",
+    "footprint",
+)
+
+
+@timed("serialize")
+def model_to_json_serializer(model: Model, fields: list[str] | None = None):
     """
     Converts a model object to a JSON serializable dictionary.
 
     Args:
         model: Model instance to serialize
+        fields: Keys to include (default: all of MODEL_FIELDS). Only these
+            attributes are read, so the model may be loaded with .only(*fields)
     Returns:
         Dictionary containing model attributes in a JSON serializable format.
     """
 
-    return {
-        "id": str(model.id),
-        "name": model.name,
-        "description": model.description,
-        "tags": model.tags,
-        "listed": model.listed,
-        "img": model.img.url if model.img else None,
-        "model_file": model.model_file.url if model.model_file else None,
-        "axis": model.axis,
-        "rotations": model.rotations,
-        "size": model.size,
-    }
-
-
-def handle_get_models_list() -> list[Model]:
+    serialized = {}
+    for field in fields or MODEL_FIELDS:
+        value = getattr(model, field)
+        if field == "id":
+            value = str(value)
+        elif field in ("img", "model_file"):
+            value = value.url if value else None
+        serialized[field] = value
+    return serialized
+
+
+@read_from_replicas()
+def handle_get_models_list(
+    listed_only: bool = False, fields: list[str] | None = None
+) -> list[Model]:
     """
     Returns a list of all models in JSON serializable format.
     This function retrieves all models from the database and orders them by creation date.
 
+    Args:
+        listed_only: Only return models that are listed in the catalog
+        fields: Only load these columns (see MODEL_FIELDS)
+
     Returns:
         List of Model instances ordered by creation date in descending order.
     """
 
-    return list(Model.objects.all().order_by("-created_at"))
+    models = Model.objects.all()
 
+    if listed_only:
+        models = models.filter(listed=True)
 
-def handle_get_model_by_id(model_id: uuid.UUID) -> tuple[Model | None, bool, str]:
+    if fields:
+        models = models.only(*fields)
+
+    return list(models.order_by("-created_at"))
+
+
+def handle_get_model_by_id(
+    model_id: uuid.UUID, fields: list[str] | None = None
+) -> tuple[Model | None, bool, str]:
     """
     Returns a model instance by its ID.
 
     Args:
         model_id: UUID of the model to retrieve
+        fields: Only load these columns (see MODEL_FIELDS)
     Returns:
         Tuple of (Model instance, success_bool, message)
     """
+    models = Model.objects.only(*fields) if fields else Model.objects.all()
     try:
-        return (Model.objects.get(id=model_id), True, "Model found")
+        return (models.get(id=model_id), True, "Model found")
 
     except Model.DoesNotExist:
 
@@ -85,6 +133,16 @@ def handle_add_model(
     ):
         return (False, "Model name, file, and description are required")
 
+    # Parsed before queueing so the writer only spends time on the insert.
+    geometry, has_geometry, geometry_message = compute_mesh_geometry(
+        modelData["model_file"]
+    )
+
+    return _create_model(modelData, geometry if has_geometry else {})
+
+
+@serialized_write
+def _create_model(modelData: dict, geometry: dict) -> tuple[bool, str]:
     model = Model.objects.create(
         name=modelData["name"],
         description=modelData["description"],
@@ -94,10 +152,59 @@ def handle_add_model(
         size=modelData["size"] if modelData.get("size") else 1,
         img=modelData.get("img") if modelData.get("img") else None,
         tags=modelData["tags"] if modelData.get("tags") else [],
+        **geometry,
     )
+    bump_catalog_version()
     return (True, f"Model '{model.name}' added successfully with ID {model.id}")
 
 
+def get_catalog_version() -> int:
+    """
+    Returns the current catalog version, see bump_catalog_version.
+    """
+    return (
+        CatalogVersion.objects.filter(pk=1).values_list("version", flat=True).first()
+        or 0
+    )
+
+
+def get_catalog_identity(using: str | None = None) -> tuple[str | None, int]:
+    """
+    Returns the identity of the catalog's database and its current version,
+    read together from ``using`` (the routers' choice when None).
+    """
+    identity, version = (
+        CatalogVersion.objects.using(using)
+        .filter(pk=1)
+        .values_list("identity", "version")
+        .first()
+    ) or (None, 0)
+    return (str(identity) if identity else None, version)
+
+
+def bump_catalog_version():
+    """
+    Marks the catalog as changed, so results cached for the previous version
+    (in any process) are no longer used. Call after the change, inside its
+    transaction.
+    """
+    updated = CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1)
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=1, defaults={"version": 1})
+
+
+def _bump_rooms_using_model(model_id: uuid.UUID):
+    """
+    Invalidates the caches of every room, in every shard, that places the
+    given model.
+    """
+    for using in room_databases():
+        Room.objects.using(using).filter(room_models__model_id=model_id).update(
+            revision=F("revision") + 1
+        )
+
+
+@serialized_write
 def handle_delete_model(model_id: uuid.UUID) -> tuple[bool, str]:
     """
     Deletes a model from the database.
@@ -114,7 +221,16 @@ def handle_delete_model(model_id: uuid.UUID) -> tuple[bool, str]:
     if not success:
         return (False, message)
 
-    model.delete()
+    _bump_rooms_using_model(model.id)
+
+    # Placements first, as one DELETE per database, so the model row goes
+    # without Django collecting its cascade in Python. Its files are left to
+    # manage.py collect_orphaned_media.
+    for using in room_databases():
+        RoomModel.objects.using(using).filter(model_id=model.id).delete()
+
+    Model.objects.filter(id=model.id).delete()
+    bump_catalog_version()
     return (True, f"Model '{model.name}' deleted successfully")
 
 
@@ -130,6 +246,29 @@ def handle_update_model(model_id: uuid.UUID, update_data: dict) -> tuple[bool, s
         Tuple of (success_bool, message)
     """
 
+    geometry = None
+    if "model_file" in update_data:
+        # update_model_view decodes model_data from JSON, which cannot carry
+        # a file; only an uploaded File has geometry to compute.
+        if not isinstance(update_data["model_file"], File):
+            return (False, "model_file must be an uploaded file")
+
+        geometry, has_geometry, geometry_message = compute_mesh_geometry(
+            update_data["model_file"]
+        )
+        geometry = (
+            geometry
+            if has_geometry
+            else {"bounds": {}, "footprint": [], "collision_hull": {}}
+        )
+
+    return _apply_model_update(model_id, update_data, geometry)
+
+
+@serialized_write
+def _apply_model_update(
+    model_id: uuid.UUID, update_data: dict, geometry: dict | None
+) -> tuple[bool, str]:
     model, success, message = handle_get_model_by_id(model_id)
 
     if not success:
@@ -139,10 +278,20 @@ def handle_update_model(model_id: uuid.UUID, update_data: dict) -> tuple[bool, s
         if hasattr(model, attr):
             setattr(model, attr, value)
 
+    for attr, value in (geometry or {}).items():
+        setattr(model, attr, value)
+
     model.save()
+    bump_catalog_version()
+
+    if "model_file" in update_data:
+        # Rooms using this model now have different geometry.
+        _bump_rooms_using_model(model.id)
+
     return (True, f"Model '{model.name}' updated successfully")
 
 
+@serialized_write
 def handle_unlist_model(model_id: uuid.UUID) -> tuple[bool, str]:
     """
     Unlists a model by setting its 'listed' attribute to False.
@@ -161,30 +310,71 @@ def handle_unlist_model(model_id: uuid.UUID) -> tuple[bool, str]:
 
     model.listed = False
     model.save()
+    bump_catalog_version()
     return (True, f"Model '{model.name}' has been unlisted successfully")
 
 
+@read_from_replicas()
 def handle_search_product_by_token(
-    token: str, min_similarity: float = 0.6
+    token: str, min_similarity: float = 0.6, fields: list[str] | None = None
 ) -> tuple[QuerySet | None, bool, str]:
     """
     Search for products by token with improved similarity matching.
+    The ranked ids are cached per normalized token, min_similarity and
+    catalog version, so repeated searches only load the matching rows.
 
     Args:
         token: Search term
         min_similarity: Minimum similarity score to consider a match (0.0 to 1.0)
+        fields: Only load these columns of the matches (see MODEL_FIELDS)
 
     Returns:
         Tuple of (QuerySet, success_bool, message)
     """
 
+    token = token.strip().lower() if token else ""
+
+    if len(token) < 2:
+        return (
+            Model.objects.none(),
+            False,
+            "Search term must be at least 2 characters long.",
+        )
+
+    key = (token, min_similarity, get_catalog_version())
+    matched_model_ids = _search_cache.get(key)
+    if matched_model_ids is MISSING:
+        matched_model_ids = _rank_models(token, min_similarity)
+        _search_cache.set(key, matched_model_ids)
+
+    if not matched_model_ids:
+        return (Model.objects.none(), False, "No models matched the search term.")
+
+    final_queryset = Model.objects.filter(id__in=matched_model_ids)
+    if fields:
+        final_queryset = final_queryset.only(*fields)
+
+    preserved_order = {id: index for index, id in enumerate(matched_model_ids)}
+    final_queryset = sorted(final_queryset, key=lambda x: preserved_order[x.id])
+
+    return (
+        final_queryset,
+        True,
+        f"Found {len(matched_model_ids)} models matching the search term.",
+    )
+
+
+def _rank_models(token: str, min_similarity: float) -> list[uuid.UUID]:
+    """
+    Returns the ids of the models matching a search token, best match first.
+    """
+
     def calculate_similarity_score(product_name: str, search_token: str) -> float:
         """
         Calculate similarity score between product name and search token.
         Returns a score between 0 and 1, where 1 is a perfect match.
         """
         product_lower = product_name.lower().strip()
-        print(f"Product Lower: {product_lower}")
         token_lower = search_token.lower().strip()
 
         if token_lower == product_lower:
@@ -197,19 +387,11 @@ def handle_search_product_by_token(
 
         return similarity if similarity >= 0.6 else 0.0
 
-    token = token.strip() if token else ""
-
-    if len(token) < 2:
-        return (
-            Model.objects.none(),
-            False,
-            "Search term must be at least 2 characters long.",
-        )
-
-    candidates = Model.objects.filter(name__icontains=token)
+    # Scoring only needs the names; the matches are loaded again afterwards.
+    candidates = Model.objects.only("id", "name").filter(name__icontains=token)
 
     if not candidates.exists():
-        candidates = Model.objects.all()[:1000]
+        candidates = Model.objects.only("id", "name")[:1000]
 
     matched_models = []
     for model in candidates:
@@ -217,19 +399,5 @@ def handle_search_product_by_token(
         if similarity_score >= min_similarity:
             matched_models.append((model, similarity_score))
 
-    if not matched_models:
-        return (Model.objects.none(), False, "No models matched the search term.")
-
     matched_models.sort(key=lambda x: x[1], reverse=True)
-    matched_model_ids = [model.id for model, _ in matched_models]
-
-    final_queryset = Model.objects.filter(id__in=matched_model_ids)
-
-    preserved_order = {id: index for index, id in enumerate(matched_model_ids)}
-    final_queryset = sorted(final_queryset, key=lambda x: preserved_order[x.id])
-
-    return (
-        final_queryset,
-        True,
-        f"Found {len(matched_models)} models matching the search term.",
-    )
+    return [model.id for model, _ in matched_models]
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+from django.conf import settings
+
+from Backend.RoomDesignApp.models import Model, Room
+from Backend.RoomDesignApp.util.geometry import placement_bounds
+from Backend.RoomDesignApp.util.room_validation import room_extent
+
+ROOM_AUTO_PLACE = getattr(settings, "ROOM_AUTO_PLACE", True)
+
+# Cell size (room units) of the occupancy grid
+PLACEMENT_GRID_RESOLUTION = getattr(settings, "PLACEMENT_GRID_RESOLUTION", 0.1)
+
+# Upper bound on grid cells per side; coarser cells are used for huge rooms
+PLACEMENT_GRID_MAX_CELLS = getattr(settings, "PLACEMENT_GRID_MAX_CELLS", 512)
+
+
+def rasterize_footprints(
+    lowers: np.ndarray,
+    uppers: np.ndarray,
+    origin: np.ndarray,
+    resolution: float,
+    shape: tuple[int, int],
+) -> np.ndarray:
+    """
+    Marks every grid cell touched by the XZ footprint of the given boxes.
+
+    Each box adds +1/-1 at its corners of a difference array; two cumulative
+    sums turn that into per-cell coverage counts without a loop per box.
+
+    Returns:
+        Boolean occupancy grid of the given shape, indexed [x, z]
+    """
+    occupancy = np.zeros((shape[0] + 1, shape[1] + 1), dtype=np.int32)
+    if len(lowers):
+        x0 = np.floor((lowers[:, 0] - origin[0]) / resolution).astype(np.int64)
+        z0 = np.floor((lowers[:, 2] - origin[1]) / resolution).astype(np.int64)
+        x1 = np.ceil((uppers[:, 0] - origin[0]) / resolution).astype(np.int64)
+        z1 = np.ceil((uppers[:, 2] - origin[1]) / resolution).astype(np.int64)
+
+        x0, x1 = np.clip(x0, 0, shape[0]), np.clip(x1, 0, shape[0])
+        z0, z1 = np.clip(z0, 0, shape[1]), np.clip(z1, 0, shape[1])
+        visible = (x0 < x1) & (z0 < z1)
+        x0, x1, z0, z1 = x0[visible], x1[visible], z0[visible], z1[visible]
+
+        np.add.at(occupancy, (x0, z0), 1)
+        np.add.at(occupancy, (x1, z0), -1)
+        np.add.at(occupancy, (x0, z1), -1)
+        np.add.at(occupancy, (x1, z1), 1)
+
+    return occupancy.cumsum(axis=0).cumsum(axis=1)[: shape[0], : shape[1]] > 0
+
+
+def free_anchor_cells(occupancy: np.ndarray, kernel: tuple[int, int]) -> np.ndarray:
+    """
+    Convolves the occupancy grid with a ones kernel of the item's footprint
+    (as a summed-area table) and returns where the window is empty.
+
+    Returns:
+        Boolean grid of shape (W - kw + 1, D - kd + 1); True at [i, j] means
+        the footprint fits with its lower corner in cell (i, j)
+    """
+    kw, kd = kernel
+    width, depth = occupancy.shape
+    if kw > width or kd > depth:
+        return np.zeros((0, 0), dtype=bool)
+
+    table = np.zeros((width + 1, depth + 1), dtype=np.int32)
+    table[1:, 1:] = occupancy.cumsum(axis=0).cumsum(axis=1)
+    window = table[kw:, kd:] - table[:-kw, kd:] - table[kw:, :-kd] + table[:-kw, :-kd]
+    return window == 0
+
+
+def find_free_axis(
+    room: Room,
+    model: Model,
+    size: int,
+    axis: list,
+    rotations: list,
+    lowers: np.ndarray,
+    uppers: np.ndarray,
+) -> list[float] | None:
+    """
+    Finds the free spot nearest to ``axis`` where the model fits without
+    overlapping the room's existing placements.
+
+    Args:
+        room: Room the model is being added to
+        model: Catalog model being placed
+        size, axis, rotations: The requested placement transform
+        lowers, uppers: Room-space bounds of the existing placements
+
+    Returns:
+        The axis to place the model at, or None when the room has no
+        known extent or no free spot is large enough.
+    """
+    extent = room_extent(room)
+    if extent is None:
+        return None
+    room_lower, room_upper = extent
+
+    axis = [float(value) for value in (axis or [])[:3]]
+    axis += [0.0] * (3 - len(axis))
+
+    item_lowers, item_uppers = placement_bounds(
+        [model.bounds], [size], [[0.0, axis[1], 0.0]], [rotations]
+    )
+    item_lower, item_upper = item_lowers[0], item_uppers[0]
+
+    # Only placements sharing the item's vertical span can collide with it.
+    if len(lowers):
+        stacked = (lowers[:, 1] < item_upper[1]) & (item_lower[1] < uppers[:, 1])
+        lowers, uppers = lowers[stacked], uppers[stacked]
+
+    origin = room_lower[[0, 2]]
+    span = room_upper[[0, 2]] - origin
+    resolution = max(
+        PLACEMENT_GRID_RESOLUTION, float(span.max()) / PLACEMENT_GRID_MAX_CELLS
+    )
+    # Whole cells only, so an anchored footprint never crosses the walls.
+    shape = tuple(max(1, math.floor(s / resolution + 1e-9)) for s in span)
+
+    occupancy = rasterize_footprints(lowers, uppers, origin, resolution, shape)
+    kernel = tuple(
+        max(1, math.ceil(extent_size / resolution - 1e-9))
+        for extent_size in (item_upper - item_lower)[[0, 2]]
+    )
+    free = free_anchor_cells(occupancy, kernel)
+    if not free.any():
+        return None
+
+    # Aim for the cell where the requested axis would put the footprint.
+    target = (
+        np.array([axis[0] + item_lower[0], axis[2] + item_lower[2]]) - origin
+    ) / resolution
+    cells = np.argwhere(free)
+    best = cells[np.argmin(((cells - target) ** 2).sum(axis=1))]
+
+    anchor = origin + best * resolution
+    return [
+        float(anchor[0] - item_lower[0]),
+        axis[1],
+        float(anchor[1] - item_lower[2]),
+    ]
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+# Let admins profile single requests with the header or query flag below
+PROFILING_ENABLED = getattr(settings, "PROFILING_ENABLED", True)
+
+# Request header / query parameter holding the id of the admin account
+PROFILE_HEADER = getattr(settings, "PROFILE_HEADER", "X-Profile")
+PROFILE_PARAM = getattr(settings, "PROFILE_PARAM", "_profile")
+
+# Directory the collapsed stacks are written to, one file per request id
+PROFILE_DIR = getattr(
+    settings,
+    "PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "roomdesign-profiles"),
+)
+
+# Seconds between two stack samples
+PROFILE_SAMPLE_INTERVAL = getattr(settings, "PROFILE_SAMPLE_INTERVAL", 0.001)
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread from a background thread.
+
+    The samples are written in the collapsed stack format ("outer;inner
+    count" per line) read by flamegraph.pl, speedscope and most other
+    flame graph viewers. The sampler needs the GIL to take a sample, so a
+    thread that holds it for long stretches is sampled at the interpreter's
+    switch interval rather than at ``interval``.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _frame_name(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    name = f"{module}:{frame.f_code.co_qualname}"
+    return name.replace(";", ":").replace(" ", "_")
+
+
+def profile_path(request_id: str) -> str:
+    """
+    Returns the path of the collapsed stacks saved for a request id.
+    """
+    return os.path.join(PROFILE_DIR, f"{request_id}.collapsed")
@@ -0,0 +1,194 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from ipaddress import ip_address, ip_network
+
+from django.conf import settings
+
+# (tokens per second, burst) each client gets per URL name; routes not
+# listed share the "default" budget
+RATE_LIMITS = getattr(settings, "RATE_LIMITS", {"default": (20.0, 40)})
+
+# Most client buckets kept per process; the least recently used go first
+RATE_LIMIT_MAX_CLIENTS = getattr(settings, "RATE_LIMIT_MAX_CLIENTS", 100_000)
+
+# Addresses or networks of the reverse proxies in front of the app, whose
+# requests are limited by the client address they add to X-Forwarded-For
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ip_network(proxy, strict=False)
+    for proxy in getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", [])
+]
+
+# Requests served at once per process: the limit moves between the minimum
+# and maximum, shrinking while the average latency is above the target
+LOAD_SHED_MIN_CONCURRENCY = getattr(settings, "LOAD_SHED_MIN_CONCURRENCY", 4)
+LOAD_SHED_MAX_CONCURRENCY = getattr(settings, "LOAD_SHED_MAX_CONCURRENCY", 32)
+LOAD_SHED_TARGET_LATENCY_MS = getattr(settings, "LOAD_SHED_TARGET_LATENCY_MS", 250)
+
+# Requests that may wait for a free slot, and for how long (seconds)
+LOAD_SHED_MAX_QUEUE = getattr(settings, "LOAD_SHED_MAX_QUEUE", 64)
+LOAD_SHED_QUEUE_TIMEOUT = getattr(settings, "LOAD_SHED_QUEUE_TIMEOUT", 0.5)
+
+# Retry-After (seconds) of shed requests
+LOAD_SHED_RETRY_AFTER = getattr(settings, "LOAD_SHED_RETRY_AFTER", 1)
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        address = ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def client_address(meta: dict) -> str | None:
+    """
+    Returns the address a request is limited by: REMOTE_ADDR, or when that
+    is a trusted proxy, the nearest address in X-Forwarded-For that is not
+    one. Entries before it were sent by the client and are ignored.
+    """
+    address = meta.get("REMOTE_ADDR")
+    if not address or not _is_trusted_proxy(address):
+        return address
+
+    forwarded = meta.get("HTTP_X_FORWARDED_FOR", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",")]):
+        if not hop:
+            continue
+        address = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return address
+
+
+class TokenBucket:
+    """
+    Holds up to ``burst`` tokens, refilled at ``rate`` tokens per second.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Takes a token. Returns 0 when one was available, otherwise the
+        seconds until the next one is.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate else math.inf
+
+
+class RateLimiter:
+    """
+    Token buckets per (route, client), with the budgets in RATE_LIMITS.
+    """
+
+    def __init__(
+        self, limits: dict = RATE_LIMITS, max_clients: int = RATE_LIMIT_MAX_CLIENTS
+    ):
+        self.limits = limits
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[tuple, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, route: str, client: str) -> float:
+        """
+        Spends one request of the client's budget for the route. Returns 0
+        when allowed, otherwise the seconds to wait before retrying.
+        """
+        budget = route if route in self.limits else "default"
+        limit = self.limits.get(budget)
+        if limit is None:
+            return 0.0
+
+        now = time.monotonic()
+        key = (budget, client)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(*limit, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the requests a process serves at once and sheds the rest.
+
+    A request beyond the current limit waits up to LOAD_SHED_QUEUE_TIMEOUT
+    for a slot, behind at most LOAD_SHED_MAX_QUEUE others, and is shed
+    otherwise. The limit adapts to latency: every completed request moves an
+    exponential average of latencies, and while that is above the target the
+    limit shrinks by 10% per request, towards LOAD_SHED_MIN_CONCURRENCY;
+    below it, the limit grows back by one slot per limit's worth of
+    requests. Fewer requests in flight then keep their latency (and that of
+    the ones admitted next) near the target instead of everyone queueing.
+    """
+
+    def __init__(
+        self,
+        min_concurrency: int = LOAD_SHED_MIN_CONCURRENCY,
+        max_concurrency: int = LOAD_SHED_MAX_CONCURRENCY,
+        target_latency: float = LOAD_SHED_TARGET_LATENCY_MS / 1000,
+        max_queue: int = LOAD_SHED_MAX_QUEUE,
+        queue_timeout: float = LOAD_SHED_QUEUE_TIMEOUT,
+    ):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.limit = float(max_concurrency)
+        self.latency = 0.0
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> bool:
+        """
+        Takes a slot, waiting for one if needed. Returns False when the
+        request should be shed.
+        """
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self.in_flight < int(self.limit), self.queue_timeout
+                )
+            finally:
+                self.waiting -= 1
+            if admitted:
+                self.in_flight += 1
+            return admitted
+
+    def release(self, latency: float):
+        """
+        Frees a slot taken by acquire, for a request that took ``latency``
+        seconds.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self.latency = 0.9 * self.latency + 0.1 * latency
+            if self.latency > self.target_latency:
+                self.limit = max(self.min_concurrency, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify()
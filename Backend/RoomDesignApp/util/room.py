@@ -1,45 +1,166 @@
+import threading
 import uuid
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models import F
 from Backend.RoomDesignApp.models import Account, Room, RoomModel
+from Backend.RoomDesignApp.routers import (
+    read_from_replicas,
+    room_databases,
+    shard_for_owner,
+)
+# Imported as a module: room and room_models import each other.
+from Backend.RoomDesignApp.util import room_models as room_model_utils
+from Backend.RoomDesignApp.util import write_behind
 from Backend.RoomDesignApp.util.auth import handle_admin
-from Backend.RoomDesignApp.util.room_models import (
-    handle_get_all_room_models_for_room,
-    room_model_to_json_serializer,
+from Backend.RoomDesignApp.util.geometry import compute_room_geometry
+from Backend.RoomDesignApp.util.instrumentation import timed
+from Backend.RoomDesignApp.util.room_bake import get_baked_room_path
+from Backend.RoomDesignApp.util.write_queue import serialized_write
+
+ROOM_PARSE_IN_BACKGROUND = getattr(settings, "ROOM_PARSE_IN_BACKGROUND", False)
+
+# Keys room_to_json_serializer can return. All but room_models are backed by
+# the Room column of the same name.
+ROOM_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "room_file",
+    "sizes",
+    "bounds",
+    "floor_polygon",
+    "walls",
+    "is_template",
+    "room_models",
 )
 
 
-def room_to_json_serializer(room: Room):
+def room_columns(fields: list[str] | None) -> list[str] | None:
+    """
+    Returns the Room columns needed to serialize the given fields, for
+    .only(), or None to load every column.
+    """
+    if not fields:
+        return None
+    return [field for field in fields if field != "room_models"] or ["id"]
+
+
+@timed("serialize")
+def room_to_json_serializer(room: Room, fields: list[str] | None = None):
     """
     Converts a room object to a JSON serializable dictionary.
+    Only the requested fields (default: all of ROOM_FIELDS) are read, and the
+    placements are only queried when room_models is one of them.
+    """
+    serialized = {}
+    for field in fields or ROOM_FIELDS:
+        if field == "room_models":
+            serialized[field] = [
+                room_model_utils.room_model_to_json_serializer(room_model)
+                for room_model in room_model_utils.handle_get_all_room_models_for_room(
+                    room.id, using=room._state.db
+                )
+            ]
+        elif field == "room_file":
+            serialized[field] = room.room_file.url if room.room_file else None
+        else:
+            serialized[field] = getattr(room, field)
+    return serialized
+
+
+def bump_room_revision(room_id: str, using: str | None = None) -> int:
+    """
+    Increments a room's revision and returns the new value.
+    Call inside the transaction that changes the room so the value read back
+    is the one written by this change.
+
+    Args:
+        room_id: ID of the room that changed
+        using: Database alias holding the room
+
+    Returns:
+        The room's new revision
     """
-    return {
-        "id": room.id,
-        "name": room.name,
-        "description": room.description,
-        "room_file": room.room_file.url if room.room_file else None,
-        "room_models": [
-            room_model_to_json_serializer(room_model)
-            for room_model in handle_get_all_room_models_for_room(room.id)
-        ],
-    }
+    rooms = Room.objects.using(using)
+    rooms.filter(id=room_id).update(revision=F("revision") + 1)
+    return rooms.values_list("revision", flat=True).get(id=room_id)
 
 
-def handle_get_rooms_list(user_id) -> list[Room]:
+def parse_room_geometry(room_id: str, using: str | None = None) -> tuple[bool, str]:
+    """
+    Parses a stored room file and caches its dimensions, floor polygon and
+    wall segments on the Room.
+
+    Args:
+        room_id: ID of the room to parse
+        using: Database alias holding the room
+
+    Returns:
+        Tuple of (success_bool, message)
+    """
+    rooms = Room.objects.using(using)
+    room = rooms.filter(id=room_id).only("room_file").first()
+
+    if not room or not room.room_file:
+        return (False, "Room not found with the given ID")
+
+    with room.room_file.open("rb") as f:
+        geometry, success, message = compute_room_geometry(f)
+
+    if not success:
+        return (False, message)
+
+    # Only apply the result if the room file was not replaced meanwhile.
+    rooms.filter(id=room_id, room_file=room.room_file.name).update(**geometry)
+    return (True, message)
+
+
+def _parse_room_geometry_in_background(room_id: str, using: str | None):
+    try:
+        parse_room_geometry(room_id, using)
+    finally:
+        # Connections belong to the thread that opened them; close this
+        # thread's before it exits instead of leaving them open.
+        connections.close_all()
+
+
+def _schedule_room_geometry(room: Room):
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_parse_room_geometry_in_background,
+            args=(room.id, room._state.db),
+            daemon=True,
+        ).start(),
+        using=room._state.db,
+    )
+
+
+@read_from_replicas()
+def handle_get_rooms_list(user_id, fields: list[str] | None = None) -> list[Room]:
     """
     Returns a list of all rooms in JSON serializable format.
     This function retrieves all rooms from the database and orders them by creation date.
 
     Args:
         user_id: ID of the user whose rooms are to be retrieved
+        fields: Only load the columns these fields need (see ROOM_FIELDS)
 
     Returns:
         List of Room instances ordered by creation date in descending order.
     """
 
-    return list(Room.objects.filter(owner_id=user_id).order_by("-created_at"))
+    rooms = Room.objects.using(shard_for_owner(user_id)).filter(owner_id=user_id)
+    columns = room_columns(fields)
+    if columns is not None:
+        rooms = rooms.only(*columns)
+
+    return list(rooms.order_by("-created_at"))
 
 
 def handle_get_room_by_id(
-    user_id: str, room_id: uuid.UUID
+    user_id: str, room_id: uuid.UUID, fields: list[str] | None = None
 ) -> tuple[Room | None, bool, str]:
     """
     Returns a room instance by its ID.
@@ -47,20 +168,58 @@ def handle_get_room_by_id(
     Args:
         room_id: ID of the room to retrieve
         user_id: ID of the user who owns the room
+        fields: Only load the columns these fields need (see ROOM_FIELDS)
 
     Returns:
         Tuple of (Room instance, success_bool, message)
     """
     is_admin, message = handle_admin(user_id)
+    columns = room_columns(fields)
+
+    def rooms(using):
+        queryset = Room.objects.using(using)
+        return queryset.only(*columns) if columns is not None else queryset
+
+    if is_admin:
+        # Admins may open any room, so look through every shard.
+        for using in room_databases():
+            room = rooms(using).filter(id=room_id).first()
+            if room:
+                return (room, True, "Room found")
+        return (None, False, "Room not found with the given ID")
 
     try:
-        if is_admin:
-            return (Room.objects.get(id=room_id), True, "Room found")
-        return (Room.objects.get(id=room_id, owner_id=user_id), True, "Room found")
+        return (
+            rooms(shard_for_owner(user_id)).get(id=room_id, owner_id=user_id),
+            True,
+            "Room found",
+        )
     except Room.DoesNotExist:
         return (None, False, "Room not found with the given ID")
 
 
+@read_from_replicas()
+def handle_get_template_rooms(fields: list[str] | None = None) -> list[Room]:
+    """
+    Returns the rooms published as templates, from every shard, newest first.
+
+    Args:
+        fields: Only load the columns these fields need (see ROOM_FIELDS)
+
+    Returns:
+        List of Room instances
+    """
+    columns = room_columns(fields)
+    templates = []
+    for using in room_databases():
+        rooms = Room.objects.using(using).filter(is_template=True)
+        if columns is not None:
+            rooms = rooms.only(*columns, "created_at")
+        templates.extend(rooms)
+
+    return sorted(templates, key=lambda room: room.created_at, reverse=True)
+
+
 def handle_add_room(roomData: dict) -> tuple[bool, str]:
     """
     Adds a new room to the database.
@@ -82,13 +241,22 @@ def handle_add_room(roomData: dict) -> tuple[bool, str]:
 
     owner = Account.objects.get(user_id=roomData.get("owner_id"))
 
-    room = Room.objects.create(
+    geometry = {}
+    if not ROOM_PARSE_IN_BACKGROUND:
+        geometry, success, message = compute_room_geometry(roomData["room_file"])
+        geometry = geometry if success else {}
+
+    room = Room.objects.using(shard_for_owner(owner.id)).create(
         name=roomData["name"],
         description=roomData.get("description", ""),
         room_file=roomData["room_file"],
         owner=owner,
+        **geometry,
     )
 
+    if ROOM_PARSE_IN_BACKGROUND:
+        _schedule_room_geometry(room)
+
     return (True, f"Room '{room.name}' has been added successfully")
 
 
@@ -110,14 +278,67 @@ def handle_update_room(user_id: str, room_id: str, roomData: dict) -> tuple[bool
     if not success:
         return (False, message)
 
+    if "is_template" in roomData and not handle_admin(user_id)[0]:
+        return (False, "Only admins can publish room templates")
+
+    # update_room_view decodes room_data from JSON, which cannot carry a
+    # file; a path would point the room at any stored file.
+    if "room_file" in roomData and not isinstance(roomData["room_file"], File):
+        return (False, "room_file must be an uploaded file")
+
     for attr, value in roomData.items():
         if hasattr(room, attr):
             setattr(room, attr, value)
 
-    room.save()
+    if "room_file" in roomData:
+        room.bounds, room.sizes, room.floor_polygon, room.walls = {}, [], [], []
+
+        if not ROOM_PARSE_IN_BACKGROUND:
+            geometry, success, message = compute_room_geometry(room.room_file)
+            for attr, value in (geometry if success else {}).items():
+                setattr(room, attr, value)
+
+    # The revision is only ever incremented in SQL (bump_room_revision), so
+    # saving the value loaded above could undo a concurrent placement change.
+    using = room._state.db
+    with transaction.atomic(using=using):
+        room.save(
+            update_fields=[
+                field.name
+                for field in Room._meta.concrete_fields
+                if not field.primary_key and field.name != "revision"
+            ]
+        )
+        if "room_file" in roomData:
+            room.revision = bump_room_revision(room.id, using=using)
+
+    if "room_file" in roomData and ROOM_PARSE_IN_BACKGROUND:
+        _schedule_room_geometry(room)
+
     return (True, f"Room '{room.name}' has been updated successfully")
 
 
+def handle_get_baked_room(user_id: str, room_id: str) -> tuple[str | None, bool, str]:
+    """
+    Returns the room and all its models merged into a single .glb file.
+    The file is baked on first request and cached per room revision.
+
+    Args:
+        user_id: ID of the user who owns the room
+        room_id: ID of the room to bake
+
+    Returns:
+        Tuple of (absolute file path or None, success_bool, message)
+    """
+
+    room, success, message = handle_get_room_by_id(user_id, room_id)
+
+    if not success:
+        return (None, False, message)
+
+    return get_baked_room_path(room)
+
+
 def handle_delete_room(user_id: str, room_id: str) -> tuple[bool, str]:
     """
     Deletes a room from the database.
@@ -135,5 +356,93 @@ def handle_delete_room(user_id: str, room_id: str) -> tuple[bool, str]:
     if not success:
         return (False, message)
 
-    room.delete()
+    # Placements first, as one DELETE, so the room row goes without Django
+    # collecting its cascade in Python. The room file may be shared with
+    # clones; manage.py collect_orphaned_media removes it once unused.
+    using = room._state.db
+    with transaction.atomic(using=using):
+        RoomModel.objects.using(using).filter(room_id=room.id).delete()
+        Room.objects.using(using).filter(id=room.id).delete()
+
     return (True, f"Room '{room.name}' has been deleted successfully")
+
+
+def handle_clone_room(
+    user_id: str, room_id: str, name: str | None = None
+) -> tuple[Room | None, bool, str]:
+    """
+    Copies a room and all its placed models into a new room owned by the
+    user. The copy shares the stored room file and the parsed geometry, so
+    nothing is uploaded or parsed again, and its placements are inserted
+    with one bulk insert in the same transaction as the room.
+
+    Args:
+        user_id: ID of the user the copy is for
+        room_id: ID of a room the user may open, or of a template room
+        name: Name of the copy (default: the source room's name)
+
+    Returns:
+        Tuple of (new Room instance, success_bool, message)
+    """
+
+    # The copy starts from the transforms editors of the source last saw.
+    # Flushed before queueing the clone: inside it, the writer would wait for
+    # a flush that is itself waiting for the writer.
+    write_behind.buffer.flush(room_id=room_id)
+
+    return _clone_room(user_id, room_id, name, shard_for_owner(user_id))
+
+
+@serialized_write
+def _clone_room(
+    user_id: str, room_id: str, name: str | None, using: str | None
+) -> tuple[Room | None, bool, str]:
+    owner = Account.objects.filter(id=user_id).first()
+
+    if not owner:
+        return (None, False, "User not found")
+
+    source, success, message = handle_get_room_by_id(user_id, room_id)
+
+    if not success:
+        # Anyone may start from a template.
+        for database in room_databases():
+            source = Room.objects.using(database).filter(id=room_id, is_template=True)
+            source = source.first()
+            if source:
+                break
+        else:
+            return (None, False, message)
+
+    placements = RoomModel.objects.using(source._state.db).filter(room_id=source.id)
+
+    clone = Room(
+        name=name or source.name,
+        owner=owner,
+        description=source.description,
+        room_file=source.room_file.name,
+        sizes=source.sizes,
+        bounds=source.bounds,
+        floor_polygon=source.floor_polygon,
+        walls=source.walls,
+    )
+
+    with transaction.atomic(using=using):
+        clone.save(force_insert=True, using=using)
+        if ROOM_PARSE_IN_BACKGROUND and not clone.bounds:
+            # The source was still being parsed; parse the copy too.
+            _schedule_room_geometry(clone)
+        RoomModel.objects.using(using).bulk_create(
+            RoomModel(
+                room_id=clone.id,
+                model_id=model_id,
+                size=size,
+                rotations=rotations,
+                axis=axis,
+            )
+            for model_id, size, rotations, axis in placements.values_list(
+                "model_id", "size", "rotations", "axis"
+            )
+        )
+
+    return (clone, True, f"Room '{source.name}' has been cloned successfully")
@@ -0,0 +1,436 @@
+import copy
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Prefetch
+
+from Backend.RoomDesignApp.models import Model, Room, RoomModel
+from Backend.RoomDesignApp.util import metrics
+from Backend.RoomDesignApp.util.geometry import (
+    GLB_CHUNK_BIN,
+    GLB_CHUNK_JSON,
+    GLB_MAGIC,
+    iter_mesh_instances,
+    load_gltf,
+    placement_matrices,
+    read_accessor,
+    read_obj,
+)
+
+BAKED_ROOMS_DIR = getattr(settings, "BAKED_ROOMS_DIR", "baked/")
+
+_TRIANGLES = 4
+_FLOAT = 5126
+_UNSIGNED_INT = 5125
+_ARRAY_BUFFER = 34962
+_ELEMENT_ARRAY_BUFFER = 34963
+
+
+class _Batch:
+    """
+    Geometry of every primitive that shares one source material, already
+    transformed into room space.
+    """
+
+    def __init__(self, material: int | None, has_normals: bool, has_uvs: bool):
+        self.material = material
+        self.has_normals = has_normals
+        self.has_uvs = has_uvs
+        self.positions = []
+        self.normals = []
+        self.uvs = []
+        self.indices = []
+        self.vertex_count = 0
+
+    def add(self, positions, normals, uvs, indices):
+        self.positions.append(positions)
+        if self.has_normals:
+            self.normals.append(normals)
+        if self.has_uvs:
+            self.uvs.append(uvs)
+        self.indices.append(indices + self.vertex_count)
+        self.vertex_count += len(positions)
+
+
+class _GlbWriter:
+    """
+    Accumulates buffer views, accessors and materials of the baked asset.
+    """
+
+    def __init__(self):
+        self.doc = {
+            "asset": {"version": "2.0", "generator": "RoomDesignApp room bake"},
+            "buffers": [],
+            "bufferViews": [],
+            "accessors": [],
+            "materials": [],
+            "textures": [],
+            "images": [],
+            "samplers": [],
+            "meshes": [],
+            "nodes": [],
+            "scenes": [{"nodes": []}],
+            "scene": 0,
+        }
+        self.chunks = []
+        self.length = 0
+
+    def add_view(self, data: bytes, target: int | None = None) -> int:
+        padding = (-self.length) % 4
+        if padding:
+            self.chunks.append(b"\0" * padding)
+            self.length += padding
+        view = {"buffer": 0, "byteOffset": self.length, "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        self.chunks.append(data)
+        self.length += len(data)
+        self.doc["bufferViews"].append(view)
+        return len(self.doc["bufferViews"]) - 1
+
+    def add_accessor(self, array: np.ndarray, kind: str, target: int) -> int:
+        is_index = kind == "SCALAR"
+        array = np.ascontiguousarray(array, dtype=np.uint32 if is_index else np.float32)
+        accessor = {
+            "bufferView": self.add_view(array.tobytes(), target),
+            "componentType": _UNSIGNED_INT if is_index else _FLOAT,
+            "count": len(array),
+            "type": kind,
+        }
+        if kind == "VEC3" and len(array):
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        self.doc["accessors"].append(accessor)
+        return len(self.doc["accessors"]) - 1
+
+    def to_bytes(self) -> bytes:
+        doc = {key: value for key, value in self.doc.items() if value != []}
+        doc["buffers"] = [{"byteLength": self.length}]
+        json_chunk = json.dumps(doc, separators=(",", ":")).encode()
+        json_chunk += b" " * ((-len(json_chunk)) % 4)
+        bin_chunk = b"".join(self.chunks)
+        bin_chunk += b"\0" * ((-len(bin_chunk)) % 4)
+        total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+        return b"".join(
+            [
+                struct.pack("<III", GLB_MAGIC, 2, total),
+                struct.pack("<II", len(json_chunk), GLB_CHUNK_JSON),
+                json_chunk,
+                struct.pack("<II", len(bin_chunk), GLB_CHUNK_BIN),
+                bin_chunk,
+            ]
+        )
+
+
+class _MaterialCopier:
+    """
+    Copies materials of one source asset into the baked asset, together with
+    the textures, samplers and embedded images they reference.
+    """
+
+    def __init__(self, writer: _GlbWriter, doc: dict, bin_chunk: bytes):
+        self.writer = writer
+        self.doc = doc
+        self.bin_chunk = bin_chunk
+        self.materials = {}
+        self.textures = {}
+        self.images = {}
+        self.samplers = {}
+
+    def material(self, index: int | None) -> int | None:
+        if index is None:
+            return None
+        if index not in self.materials:
+            material = copy.deepcopy(self.doc["materials"][index])
+            self._remap_textures(material)
+            self.writer.doc["materials"].append(material)
+            self.materials[index] = len(self.writer.doc["materials"]) - 1
+        return self.materials[index]
+
+    def _remap_textures(self, value):
+        if isinstance(value, dict):
+            for key, item in list(value.items()):
+                if key.endswith("Texture") and isinstance(item, dict):
+                    texture = self._texture(item.get("index"))
+                    if texture is None:
+                        del value[key]
+                        continue
+                    item["index"] = texture
+                self._remap_textures(item)
+        elif isinstance(value, list):
+            for item in value:
+                self._remap_textures(item)
+
+    def _texture(self, index: int | None) -> int | None:
+        if index is None or index >= len(self.doc.get("textures", [])):
+            return None
+        if index not in self.textures:
+            texture = dict(self.doc["textures"][index])
+            texture.pop("extensions", None)
+            source = self._image(texture.get("source"))
+            if source is None:
+                self.textures[index] = None
+                return None
+            texture["source"] = source
+            if "sampler" in texture:
+                texture["sampler"] = self._sampler(texture["sampler"])
+            self.writer.doc["textures"].append(texture)
+            self.textures[index] = len(self.writer.doc["textures"]) - 1
+        return self.textures[index]
+
+    def _image(self, index: int | None) -> int | None:
+        if index is None:
+            return None
+        if index not in self.images:
+            image = dict(self.doc["images"][index])
+            if "bufferView" in image:
+                view = self.doc["bufferViews"][image["bufferView"]]
+                start = view.get("byteOffset", 0)
+                data = self.bin_chunk[start : start + view["byteLength"]]
+                image["bufferView"] = self.writer.add_view(data)
+            elif not image.get("uri", "").startswith("data:"):
+                # External image files are not part of the uploaded asset.
+                self.images[index] = None
+                return None
+            self.writer.doc["images"].append(image)
+            self.images[index] = len(self.writer.doc["images"]) - 1
+        return self.images[index]
+
+    def _sampler(self, index: int) -> int:
+        if index not in self.samplers:
+            self.writer.doc["samplers"].append(self.doc["samplers"][index])
+            self.samplers[index] = len(self.writer.doc["samplers"]) - 1
+        return self.samplers[index]
+
+
+def _read_float_attribute(doc, bin_chunk, index) -> np.ndarray:
+    accessor = doc["accessors"][index]
+    values = read_accessor(doc, bin_chunk, index)
+    if accessor.get("normalized") and values.dtype.kind in "iu":
+        return values.astype(np.float64) / np.iinfo(values.dtype).max
+    return values.astype(np.float64)
+
+
+class RoomBaker:
+    """
+    Merges the room shell and every placed model into one glTF asset.
+
+    Primitives are batched per (source file, material), so N copies of the
+    same chair become one draw call per chair material.
+    """
+
+    def __init__(self):
+        self.writer = _GlbWriter()
+        self.batches: dict[tuple, _Batch] = {}
+        self.sources = {}
+
+    def _load(self, field_file):
+        name = field_file.name
+        if name not in self.sources:
+            with field_file.open("rb") as f:
+                data = f.read()
+            if name.lower().endswith(".obj"):
+                self.sources[name] = ("obj", read_obj(data), None)
+            else:
+                doc, bin_chunk = load_gltf(data)
+                self.sources[name] = (
+                    "gltf",
+                    (doc, bin_chunk),
+                    _MaterialCopier(self.writer, doc, bin_chunk),
+                )
+        return self.sources[name]
+
+    def _batch(self, key, material, has_normals, has_uvs) -> _Batch:
+        if key not in self.batches:
+            self.batches[key] = _Batch(material, has_normals, has_uvs)
+        return self.batches[key]
+
+    def add(self, field_file, matrix: np.ndarray):
+        """
+        Adds a mesh file to the bake with the given model-to-room matrix.
+        """
+        kind, source, materials = self._load(field_file)
+
+        if kind == "obj":
+            positions, indices = source
+            if len(indices):
+                batch = self._batch(
+                    (field_file.name, None, False, False), None, False, False
+                )
+                batch.add(
+                    _transform(positions, matrix), None, None, _wind(indices, matrix)
+                )
+            return
+
+        doc, bin_chunk = source
+        for mesh_index, node_matrix in iter_mesh_instances(doc):
+            world = matrix @ node_matrix
+            for primitive in doc["meshes"][mesh_index].get("primitives", []):
+                attributes = primitive.get("attributes", {})
+                if (
+                    primitive.get("mode", _TRIANGLES) != _TRIANGLES
+                    or "POSITION" not in attributes
+                ):
+                    continue
+
+                positions = _read_float_attribute(
+                    doc, bin_chunk, attributes["POSITION"]
+                )
+                if "indices" in primitive:
+                    indices = read_accessor(doc, bin_chunk, primitive["indices"])
+                    indices = indices.reshape(-1).astype(np.int64)
+                else:
+                    indices = np.arange(len(positions), dtype=np.int64)
+
+                has_normals = "NORMAL" in attributes
+                has_uvs = "TEXCOORD_0" in attributes
+                material = primitive.get("material")
+                batch = self._batch(
+                    (field_file.name, material, has_normals, has_uvs),
+                    materials.material(material),
+                    has_normals,
+                    has_uvs,
+                )
+                batch.add(
+                    _transform(positions, world),
+                    (
+                        _transform_normals(
+                            _read_float_attribute(doc, bin_chunk, attributes["NORMAL"]),
+                            world,
+                        )
+                        if has_normals
+                        else None
+                    ),
+                    (
+                        _read_float_attribute(doc, bin_chunk, attributes["TEXCOORD_0"])
+                        if has_uvs
+                        else None
+                    ),
+                    _wind(indices, world),
+                )
+
+    def to_glb(self) -> bytes:
+        primitives = []
+        for batch in self.batches.values():
+            attributes = {
+                "POSITION": self.writer.add_accessor(
+                    np.concatenate(batch.positions), "VEC3", _ARRAY_BUFFER
+                )
+            }
+            if batch.has_normals:
+                attributes["NORMAL"] = self.writer.add_accessor(
+                    np.concatenate(batch.normals), "VEC3", _ARRAY_BUFFER
+                )
+            if batch.has_uvs:
+                attributes["TEXCOORD_0"] = self.writer.add_accessor(
+                    np.concatenate(batch.uvs), "VEC2", _ARRAY_BUFFER
+                )
+            primitive = {
+                "attributes": attributes,
+                "indices": self.writer.add_accessor(
+                    np.concatenate(batch.indices), "SCALAR", _ELEMENT_ARRAY_BUFFER
+                ),
+            }
+            if batch.material is not None:
+                primitive["material"] = batch.material
+            primitives.append(primitive)
+
+        if primitives:
+            self.writer.doc["meshes"].append({"primitives": primitives})
+            self.writer.doc["nodes"].append({"mesh": 0, "name": "room"})
+            self.writer.doc["scenes"][0]["nodes"].append(0)
+
+        return self.writer.to_bytes()
+
+
+def _transform(points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    return points[:, :3] @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def _transform_normals(normals: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    normals = normals[:, :3] @ np.linalg.inv(matrix[:3, :3])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(lengths > 0, lengths, 1.0)
+
+
+def _wind(indices: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    # Mirroring transforms flip triangle orientation; restore it.
+    if np.linalg.det(matrix[:3, :3]) < 0:
+        return indices.reshape(-1, 3)[:, ::-1].reshape(-1)
+    return indices
+
+
+def baked_room_name(room: Room) -> str:
+    """
+    Returns the media-relative path of the room's baked asset for its
+    current revision.
+    """
+    return f"{BAKED_ROOMS_DIR.rstrip('/')}/{room.id}/{room.revision}.glb"
+
+
+def get_baked_room_path(room: Room) -> tuple[str | None, bool, str]:
+    """
+    Returns the path of the room baked into a single .glb file, baking it
+    first when this revision has not been baked yet.
+
+    Args:
+        room: Room to bake
+
+    Returns:
+        Tuple of (absolute file path or None, success_bool, message)
+    """
+    full_path = os.path.join(settings.MEDIA_ROOT, baked_room_name(room))
+    baked = os.path.isfile(full_path)
+    metrics.record_cache("baked_room", baked)
+    if baked:
+        return (full_path, True, "Baked room found")
+
+    room_models = list(
+        RoomModel.objects.using(room._state.db)
+        .filter(room_id=room.id)
+        .only("size", "axis", "rotations", "model_id")
+        .prefetch_related(
+            Prefetch("model", queryset=Model.objects.only("id", "model_file"))
+        )
+        .order_by("id")
+    )
+
+    baker = RoomBaker()
+    try:
+        if room.room_file:
+            baker.add(room.room_file, np.eye(4))
+
+        matrices = placement_matrices(
+            [room_model.size for room_model in room_models],
+            [room_model.axis for room_model in room_models],
+            [room_model.rotations for room_model in room_models],
+        )
+        for room_model, matrix in zip(room_models, matrices):
+            if room_model.model.model_file:
+                baker.add(room_model.model.model_file, matrix)
+
+        data = baker.to_glb()
+    except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+        return (None, False, f"Could not bake room: {str(e)}")
+
+    # Write to a temporary name first so concurrent bakes never expose a
+    # partial file, then drop the files of older revisions.
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+        f.write(data)
+    os.replace(f.name, full_path)
+
+    for name in os.listdir(directory):
+        revision, _, extension = name.partition(".")
+        if extension == "glb" and revision.isdigit() and int(revision) < room.revision:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    return (full_path, True, "Room baked")
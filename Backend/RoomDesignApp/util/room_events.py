@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from Backend.RoomDesignApp.models import Model, Room, RoomModel
+from Backend.RoomDesignApp.util import metrics, write_behind
+from Backend.RoomDesignApp.util.room_models import (
+    handle_update_room_model,
+    room_model_to_json_serializer,
+)
+
+logger = logging.getLogger(__name__)
+
+# Frames sent to the editors of a room per second
+ROOM_SOCKET_TICK_RATE = getattr(settings, "ROOM_SOCKET_TICK_RATE", 30)
+
+# Frames queued for one editor before it is resynchronised with a snapshot
+ROOM_SOCKET_MAX_BACKLOG = getattr(settings, "ROOM_SOCKET_MAX_BACKLOG", 64)
+
+# RoomModel fields a transform update may change
+TRANSFORM_FIELDS = write_behind.TRANSFORM_FIELDS
+
+
+def encode(message: dict) -> str:
+    return json.dumps(message, cls=DjangoJSONEncoder)
+
+
+class Editor:
+    """
+    One connected editor: the frames waiting to be sent to it and the user
+    its transform updates are applied as.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.channel = None
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=ROOM_SOCKET_MAX_BACKLOG)
+
+    def deliver(self, message: dict | None):
+        """
+        Queues a message (None closes the socket). An editor too slow to
+        keep up loses its backlog and gets a fresh snapshot instead.
+        """
+        try:
+            self.outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.outbox.empty():
+                self.outbox.get_nowait()
+            self.outbox.put_nowait(
+                self.channel.snapshot() if message is not None else None
+            )
+
+
+class RoomChannel:
+    """
+    The editors of one room, the placements they were last sent and the
+    transform updates they submitted since the last tick.
+    """
+
+    def __init__(self, room_id, using: str | None, revision: int, rows: dict):
+        self.room_id = room_id
+        self.using = using
+        self.revision = revision
+        self.rows = rows
+        self.editors: set[Editor] = set()
+        # room_model_id -> (editor, fields); later updates overwrite earlier
+        # fields, so the last write in a tick wins.
+        self.pending: dict[str, tuple[Editor, dict]] = {}
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "snapshot",
+            "revision": self.revision,
+            "room_models": list(self.rows.values()),
+        }
+
+    def submit(self, editor: Editor, room_model_id: str, fields: dict):
+        previous = self.pending.get(room_model_id)
+        merged = {**previous[1], **fields} if previous else fields
+        self.pending[room_model_id] = (editor, merged)
+
+    def broadcast(self, message: dict | None):
+        for editor in list(self.editors):
+            editor.deliver(message)
+
+    def publish(self, revision: int, rows: dict):
+        """
+        Replaces the placements the editors were last sent and sends them
+        the differences as one frame.
+        """
+        events = diff_placements(self.rows, rows)
+        self.revision, self.rows = revision, rows
+        if events:
+            self.broadcast({"type": "frame", "revision": revision, "events": events})
+            metrics.inc("roomdesign_room_socket_frames_total")
+
+
+def _load_room(room_id, using: str | None) -> tuple[int | None, dict]:
+    """
+    Returns a room's revision and its serialized placements by id, or
+    (None, {}) when the room no longer exists. The revision is read first,
+    so the placements are never older than it.
+    """
+    revision = (
+        Room.objects.using(using)
+        .filter(id=room_id)
+        .values_list("revision", flat=True)
+        .first()
+    )
+    if revision is None:
+        return (None, {})
+
+    room_models = (
+        RoomModel.objects.using(using)
+        .filter(room_id=room_id)
+        .prefetch_related(Prefetch("model", queryset=Model.objects.all()))
+        .order_by("-id")
+    )
+    return (
+        revision,
+        {
+            str(room_model.id): room_model_to_json_serializer(
+                write_behind.buffer.overlay(room_model)
+            )
+            for room_model in room_models
+        },
+    )
+
+
+def _poll_rooms(watched: dict) -> dict:
+    """
+    Returns {room_id: (revision, placements)} for the watched rooms whose
+    revision moved since {room_id: (using, revision)} was taken.
+    """
+    by_database = {}
+    for room_id, (using, revision) in watched.items():
+        by_database.setdefault(using, {})[room_id] = revision
+
+    changed = {}
+    for using, revisions in by_database.items():
+        current = dict(
+            Room.objects.using(using)
+            .filter(id__in=revisions)
+            .values_list("id", "revision")
+        )
+        for room_id, revision in revisions.items():
+            if current.get(room_id) != revision:
+                changed[room_id] = _load_room(room_id, using)
+    return changed
+
+
+def _apply_updates(updates: list[tuple[Editor, str, dict]]) -> list:
+    """
+    Saves submitted transform updates through handle_update_room_model,
+    which checks ownership and placement. Returns (editor, error message)
+    for the ones rejected.
+    """
+    rejected = []
+    for editor, room_model_id, fields in updates:
+        success, message = handle_update_room_model(
+            editor.user_id, room_model_id, fields
+        )
+        if not success:
+            rejected.append(
+                (editor, {"type": "error", "id": room_model_id, "error": message})
+            )
+    return rejected
+
+
+def diff_placements(before: dict, after: dict) -> list[dict]:
+    """
+    Returns the add, update and delete events turning one set of
+    serialized placements into another.
+    """
+    events = []
+    for room_model_id, row in after.items():
+        previous = before.get(room_model_id)
+        if previous is None:
+            events.append({"type": "add", "room_model": row})
+        elif any(previous[field] != row[field] for field in TRANSFORM_FIELDS):
+            events.append(
+                {
+                    "type": "update",
+                    "id": room_model_id,
+                    **{field: row[field] for field in TRANSFORM_FIELDS},
+                }
+            )
+    for room_model_id in before.keys() - after.keys():
+        events.append({"type": "delete", "id": room_model_id})
+    return events
+
+
+class RoomEventHub:
+    """
+    Relays placement changes to the editors connected to each room.
+
+    Every 1/ROOM_SOCKET_TICK_RATE seconds, while anyone is connected, the
+    hub saves the transform updates editors sent since the previous tick
+    (the last one per placement wins), then reads the revision of every
+    watched room. Rooms whose revision moved, whichever process or route
+    changed them, are reloaded and diffed against what their editors were
+    last sent. The differences go out as one frame per room and tick, so a
+    placement dragged at any rate costs its editors at most one update per
+    frame.
+
+    Transforms that write_behind buffered instead of saving do not move the
+    revision until they are saved, so the buffer tells the hub about each
+    one and it goes out with the next frame of its room.
+
+    One hub runs per process, on the event loop of the ASGI server.
+    """
+
+    def __init__(self, tick_rate: float = ROOM_SOCKET_TICK_RATE):
+        self.interval = 1 / tick_rate
+        self.channels: dict = {}
+        self._loading = asyncio.Lock()
+        self._ticker = None
+        # room_id -> {room_model_id: room_model} buffered since the last tick
+        self._buffered: dict = {}
+        self._buffered_lock = threading.Lock()
+
+    def buffered(self, room_model: RoomModel):
+        """
+        Notes a transform write_behind buffered, to be sent to the editors
+        of its room on the next tick. Called from any thread.
+        """
+        if room_model.room_id not in self.channels:
+            return
+        with self._buffered_lock:
+            room_models = self._buffered.setdefault(room_model.room_id, {})
+            room_models[str(room_model.id)] = room_model
+
+    async def join(self, room_id, using: str | None, editor: Editor) -> bool:
+        """
+        Subscribes an editor to a room and queues the room's snapshot for
+        it. Returns False when the room does not exist.
+        """
+        async with self._loading:
+            channel = self.channels.get(room_id)
+            if channel is None:
+                revision, rows = await sync_to_async(_load_room)(room_id, using)
+                if revision is None:
+                    return False
+                channel = self.channels[room_id] = RoomChannel(
+                    room_id, using, revision, rows
+                )
+
+        editor.channel = channel
+        channel.editors.add(editor)
+        editor.deliver(channel.snapshot())
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    def leave(self, editor: Editor):
+        if editor.channel is not None:
+            editor.channel.editors.discard(editor)
+
+    async def _run(self):
+        while self.channels:
+            started = time.monotonic()
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Room event tick failed")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    async def tick(self):
+        updates = []
+        for channel in self.channels.values():
+            updates.extend(
+                (editor, room_model_id, fields)
+                for room_model_id, (editor, fields) in channel.pending.items()
+            )
+            channel.pending = {}
+        if updates:
+            for editor, error in await sync_to_async(_apply_updates)(updates):
+                editor.deliver(error)
+
+        watched = {
+            room_id: (channel.using, channel.revision)
+            for room_id, channel in self.channels.items()
+        }
+        with self._buffered_lock:
+            buffered, self._buffered = self._buffered, {}
+        changed = await sync_to_async(_poll_rooms)(watched)
+
+        for room_id, (revision, rows) in changed.items():
+            channel = self.channels.get(room_id)
+            if channel is None:
+                continue
+            if revision is None:
+                channel.broadcast({"type": "room_deleted"})
+                channel.broadcast(None)
+                channel.editors.clear()
+                continue
+            # Reloaded with the buffered transforms already overlaid.
+            buffered.pop(room_id, None)
+            channel.publish(revision, rows)
+
+        for room_id, room_models in buffered.items():
+            channel = self.channels.get(room_id)
+            if channel is None or not channel.editors:
+                continue
+            rows = dict(channel.rows)
+            for room_model_id, room_model in room_models.items():
+                if room_model_id in rows:
+                    rows[room_model_id] = {
+                        **rows[room_model_id],
+                        **{
+                            field: getattr(room_model, field)
+                            for field in TRANSFORM_FIELDS
+                        },
+                    }
+            channel.publish(channel.revision, rows)
+
+        for room_id, channel in list(self.channels.items()):
+            if not channel.editors and not channel.pending:
+                del self.channels[room_id]
+
+
+hub = RoomEventHub()
+write_behind.buffer.subscribe(hub.buffered)
@@ -1,13 +1,38 @@
+import threading
 import uuid
-from Backend.RoomDesignApp.models import Room, RoomModel
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from Backend.RoomDesignApp.models import Model, Room, RoomModel
+from Backend.RoomDesignApp.routers import (
+    read_from_replicas,
+    room_databases,
+    shard_for_owner,
+)
+from Backend.RoomDesignApp.util import (
+    placement,
+    room_validation,
+    spatial_index,
+    write_behind,
+    write_queue,
+)
+# Imported as a module: room and room_models import each other.
+from Backend.RoomDesignApp.util import room as room_utils
 from Backend.RoomDesignApp.util.auth import handle_admin
+from Backend.RoomDesignApp.util.geometry import placement_bounds
+from Backend.RoomDesignApp.util.instrumentation import timed
 from Backend.RoomDesignApp.util.model import (
     handle_get_model_by_id,
     model_to_json_serializer,
 )
-from Backend.RoomDesignApp.util.room import handle_get_room_by_id
+from Backend.RoomDesignApp.util.write_queue import serialized_write
 
+# Adds to the same room are placed one at a time, each against the room the
+# previous one left; rooms share a fixed set of locks by hash.
+_ADD_LOCKS = [threading.Lock() for _ in range(64)]
 
+
+@timed("serialize")
 def room_model_to_json_serializer(room_model: RoomModel):
     """
     Converts a room_model object to a JSON serializable dictionary.
@@ -22,18 +47,48 @@ def room_model_to_json_serializer(room_model: RoomModel):
     }
 
 
-def handle_get_all_room_models_for_room(room_id: str) -> list[dict]:
+@read_from_replicas()
+def handle_get_all_room_models_for_room(
+    room_id: str, using: str | None = None
+) -> list[dict]:
     """
     Returns all RoomModel objects belonging to rooms owned by the given user,
     in JSON serializable format.
 
     Args:
         room_id: ID of the user whose room models are to be retrieved
+        using: Database alias holding the room
 
     Returns:
         List of serialized RoomModel dictionaries
     """
-    return list(RoomModel.objects.filter(room_id=room_id).order_by("-id"))
+    return [
+        write_behind.buffer.overlay(room_model)
+        for room_model in RoomModel.objects.using(using)
+        .filter(room_id=room_id)
+        .order_by("-id")
+    ]
+
+
+def _find_room_model(user_id: str, room_model_id, is_admin: bool) -> RoomModel:
+    """
+    Loads a RoomModel and its room from the user's shard, or from any shard
+    for admins.
+
+    Raises:
+        RoomModel.DoesNotExist: when no shard holds the room model
+    """
+    databases = room_databases() if is_admin else [shard_for_owner(user_id)]
+    for using in databases:
+        room_model = (
+            RoomModel.objects.using(using)
+            .select_related("room")
+            .filter(id=room_model_id)
+            .first()
+        )
+        if room_model:
+            return room_model
+    raise RoomModel.DoesNotExist
 
 
 def handle_get_room_model_by_id(
@@ -53,19 +108,60 @@ def handle_get_room_model_by_id(
     is_admin, message = handle_admin(user_id)
 
     try:
-        room_model = RoomModel.objects.get(id=room_model_id)
-        if str(room_model.room.owner.id) != str(user_id) and not is_admin:
+        room_model = _find_room_model(user_id, room_model_id, is_admin)
+        if str(room_model.room.owner_id) != str(user_id) and not is_admin:
             return (None, False, "You do not have permission to access this model")
-        return (room_model, True, "Room model found")
+        return (write_behind.buffer.overlay(room_model), True, "Room model found")
     except RoomModel.DoesNotExist:
         return (None, False, "Room model not found with the given ID")
 
 
+def _check_placement(room: Room, room_model: RoomModel) -> tuple[bool, str]:
+    """
+    Validates a placement against its room before it is written, when
+    ROOM_VALIDATE_ON_WRITE is enabled.
+    """
+    if not room_validation.ROOM_VALIDATE_ON_WRITE:
+        return True, "Validation disabled"
+
+    lowers, uppers = placement_bounds(
+        [room_model.model.bounds],
+        [room_model.size],
+        [room_model.axis],
+        [room_model.rotations],
+    )
+    return room_validation.check_placement(
+        room,
+        room_model.id,
+        lowers[0],
+        uppers[0],
+        spatial_index.get_room_index(room),
+    )
+
+
+def _update_index_on_commit(
+    using: str, room_id: str, revision: int, room_model_id: str, room_model=None
+):
+    """
+    Applies a placement change to the cached spatial index once the
+    transaction writing it commits, which may be a group commit of the
+    write queue rather than the handler's own.
+    """
+    transaction.on_commit(
+        lambda: spatial_index.apply_room_model_change(
+            room_id, revision, room_model_id, room_model
+        ),
+        using=using,
+    )
+
+
 def handle_update_room_model(
     user_id: str, room_model_id: str, room_model_data: dict
 ) -> tuple[bool, str]:
     """
     Updates an existing room model in the database.
+    With WRITE_BEHIND_ENABLED the new transform is validated and buffered,
+    and saved shortly after by write_behind instead of in the request.
 
     Args:
         user_id: ID of the user who owns the room model
@@ -75,19 +171,77 @@ def handle_update_room_model(
     Returns:
         Tuple of (success_bool, message)
     """
-
-    room_model, success, message = handle_get_room_model_by_id(user_id, room_model_id)
+    room_model, success, message = _prepare_room_model_update(
+        user_id, room_model_id, room_model_data
+    )
 
     if not success:
         return False, message
 
-    allowed_fields = {"size", "axis", "rotations"}
+    if not write_behind.WRITE_BEHIND_ENABLED:
+        return _save_room_model_update(room_model, room_model._state.db)
+
+    # Checked now rather than failing when the buffer is saved.
+    try:
+        room_model.clean_fields(
+            exclude=[
+                field.name
+                for field in RoomModel._meta.fields
+                if field.name not in write_behind.TRANSFORM_FIELDS
+            ]
+        )
+    except ValidationError as e:
+        return False, f"Invalid room model data: {e.messages[0]}"
+
+    write_behind.buffer.put(room_model)
+
+    return True, f"Room model '{room_model.id}' has been updated successfully"
+
+
+def _prepare_room_model_update(
+    user_id: str, room_model_id: str, room_model_data: dict
+) -> tuple[RoomModel | None, bool, str]:
+    """
+    Loads a room model and applies and validates the updated fields,
+    without saving it.
+    """
+    room_model, success, message = handle_get_room_model_by_id(user_id, room_model_id)
+
+    if not success:
+        return (None, False, message)
 
     for attr, value in room_model_data.items():
-        if attr in allowed_fields:
+        if attr in write_behind.TRANSFORM_FIELDS:
             setattr(room_model, attr, value)
 
-    room_model.save()
+    valid, message = _check_placement(room_model.room, room_model)
+
+    if not valid:
+        return (None, False, message)
+
+    return (room_model, True, message)
+
+
+@serialized_write
+def _save_room_model_update(room_model: RoomModel, using: str) -> tuple[bool, str]:
+    with transaction.atomic(using=using):
+        # Only the transform, as the rest was loaded before the write queued.
+        saved = (
+            RoomModel.objects.using(using)
+            .filter(id=room_model.id)
+            .update(
+                **{
+                    field: getattr(room_model, field)
+                    for field in write_behind.TRANSFORM_FIELDS
+                }
+            )
+        )
+        if not saved:
+            return False, "Room model not found with the given ID"
+        revision = room_utils.bump_room_revision(room_model.room_id, using=using)
+        _update_index_on_commit(
+            using, room_model.room_id, revision, room_model.id, room_model
+        )
 
     return True, f"Room model '{room_model.id}' has been updated successfully"
 
@@ -97,6 +251,13 @@ def handle_add_model_to_room(
 ) -> tuple[bool, str]:
     """
     Adds a model to a room.
+    With ROOM_AUTO_PLACE the model is moved from its catalog axis to the
+    nearest spot where it does not overlap the room's other models.
+
+    The placement is worked out and validated before the write is queued,
+    one add per room at a time in this process, against the room's current
+    revision. If the room changed by the time the write runs (from another
+    process or route), the writer works it out again itself.
 
     Args:
         user_id: ID of the user who owns the room
@@ -106,7 +267,14 @@ def handle_add_model_to_room(
     Returns:
         Tuple of (success_bool, message)
     """
-    room, success_room, message_room = handle_get_room_by_id(user_id, room_id)
+    with _ADD_LOCKS[hash(str(room_id)) % len(_ADD_LOCKS)]:
+        return _add_model_to_room(user_id, room_id, model_id)
+
+
+def _add_model_to_room(user_id: str, room_id: str, model_id: str) -> tuple[bool, str]:
+    room, success_room, message_room = room_utils.handle_get_room_by_id(
+        user_id, room_id
+    )
     model, success_model, message_model = handle_get_model_by_id(model_id)
 
     if not success_room:
@@ -116,13 +284,16 @@ def handle_add_model_to_room(
         return False, message_model
 
     try:
-        RoomModel.objects.create(
-            room=room,
-            model=model,
-            size=model.size,
-            rotations=model.rotations,
-            axis=model.axis,
-        )
+        room_model, valid, message = _place_room_model(room, model)
+
+        if not valid:
+            return False, message
+
+        # Without the write queue nothing orders concurrent adds anyway.
+        revision = room.revision if write_queue.WRITE_QUEUE_ENABLED else None
+
+        if not _insert_room_model(room_model, revision, room._state.db):
+            return _place_and_insert_room_model(user_id, room_id, model, room._state.db)
 
         return True, f"Model '{model.name}' has been added to room '{room.name}'"
 
@@ -130,6 +301,82 @@ def handle_add_model_to_room(
         return False, f"Error adding model to room: {str(e)}"
 
 
+def _place_room_model(room: Room, model: Model) -> tuple[RoomModel | None, bool, str]:
+    """
+    Works out and validates a new placement of a model in a room, without
+    saving it.
+    """
+    axis = model.axis
+
+    if placement.ROOM_AUTO_PLACE:
+        _, lowers, uppers = spatial_index.get_room_index(room).boxes()
+        free_axis = placement.find_free_axis(
+            room, model, model.size, model.axis, model.rotations, lowers, uppers
+        )
+        if free_axis is not None:
+            axis = free_axis
+
+    room_model = RoomModel(
+        room=room,
+        model=model,
+        size=model.size,
+        rotations=model.rotations,
+        axis=axis,
+    )
+
+    valid, message = _check_placement(room, room_model)
+
+    if not valid:
+        return (None, False, message)
+
+    return (room_model, True, message)
+
+
+@serialized_write
+def _insert_room_model(room_model: RoomModel, revision: int | None, using: str) -> bool:
+    """
+    Saves a new placement and bumps its room's revision, unless the room
+    is no longer at the ``revision`` the placement was worked out for
+    (None saves it regardless).
+
+    Returns:
+        True when the placement was saved
+    """
+    room_id = room_model.room_id
+    with transaction.atomic(using=using):
+        if revision is None:
+            revision = room_utils.bump_room_revision(room_id, using=using) - 1
+        elif not (
+            Room.objects.using(using)
+            .filter(id=room_id, revision=revision)
+            .update(revision=F("revision") + 1)
+        ):
+            return False
+        room_model.save(force_insert=True, using=using)
+        _update_index_on_commit(using, room_id, revision + 1, room_model.id, room_model)
+
+    return True
+
+
+@serialized_write
+def _place_and_insert_room_model(
+    user_id: str, room_id: str, model: Model, using: str
+) -> tuple[bool, str]:
+    room, success, message = room_utils.handle_get_room_by_id(user_id, room_id)
+
+    if not success:
+        return False, message
+
+    room_model, valid, message = _place_room_model(room, model)
+
+    if not valid:
+        return False, message
+
+    _insert_room_model(room_model, None, using)
+
+    return True, f"Model '{model.name}' has been added to room '{room.name}'"
+
+
 def remove_room_model(user_id: str, room_model_id: str) -> tuple[bool, str]:
     """
     Removes a room model from a room.
@@ -142,15 +389,14 @@ def remove_room_model(user_id: str, room_model_id: str) -> tuple[bool, str]:
         Tuple of (success_bool, message)
     """
     try:
-        room_model = RoomModel.objects.get(id=room_model_id)
-
         is_admin, message = handle_admin(user_id)
 
-        if str(room_model.room.owner.id) != str(user_id) and not is_admin:
+        room_model = _find_room_model(user_id, room_model_id, is_admin)
+
+        if str(room_model.room.owner_id) != str(user_id) and not is_admin:
             return False, "You do not have permission to delete this model."
 
-        room_model.delete()
-        return True, "Room model removed successfully."
+        return _delete_room_model(room_model, room_model._state.db)
 
     except RoomModel.DoesNotExist:
         return False, "Room model not found."
@@ -158,3 +404,76 @@ def remove_room_model(user_id: str, room_model_id: str) -> tuple[bool, str]:
     except Exception as e:
 
         return False, f"Error removing room model: {str(e)}"
+
+
+@serialized_write
+def _delete_room_model(room_model: RoomModel, using: str) -> tuple[bool, str]:
+    room_id, room_model_id = room_model.room_id, room_model.id
+    with transaction.atomic(using=using):
+        room_model.delete()
+        revision = room_utils.bump_room_revision(room_id, using=using)
+        _update_index_on_commit(using, room_id, revision, room_model_id)
+    write_behind.buffer.discard(room_model_id)
+    return True, "Room model removed successfully."
+
+
+def handle_spatial_query(
+    user_id: str, room_id: str, query: dict
+) -> tuple[list[str] | None, bool, str]:
+    """
+    Runs a geometric query against a room's spatial index.
+
+    Args:
+        user_id: ID of the user who owns the room
+        room_id: ID of the room to query
+        query: A dictionary with one of the following keys:
+
+            - point: [x, y, z] (placements containing the point)
+            - box: ([x, y, z], [x, y, z]) (placements intersecting the box)
+            - inside: ([x, y, z], [x, y, z]) (placements within the box)
+            - overlaps: ID of a RoomModel (placements overlapping it)
+
+    Returns:
+        Tuple of (list of RoomModel IDs, success_bool, message)
+    """
+    room, success, message = room_utils.handle_get_room_by_id(user_id, room_id)
+
+    if not success:
+        return (None, False, message)
+
+    index = spatial_index.get_room_index(room)
+
+    if query.get("point") is not None:
+        ids = index.query_point(query["point"])
+    elif query.get("box") is not None:
+        ids = index.query_box(*query["box"])
+    elif query.get("inside") is not None:
+        ids = index.query_inside(*query["inside"])
+    elif query.get("overlaps") is not None:
+        if index.bounds(query["overlaps"]) is None:
+            return (None, False, "Room model not found in this room")
+        ids = index.query_overlapping(query["overlaps"])
+    else:
+        return (None, False, "A point, box, inside or overlaps query is required")
+
+    return (ids, True, f"Found {len(ids)} room models")
+
+
+def handle_validate_room(user_id: str, room_id: str) -> tuple[dict | None, bool, str]:
+    """
+    Validates every placement in a room against Room.sizes and each other.
+
+    Args:
+        user_id: ID of the user who owns the room
+        room_id: ID of the room to validate
+
+    Returns:
+        Tuple of (validation report, success_bool, message)
+    """
+    room, success, message = room_utils.handle_get_room_by_id(user_id, room_id)
+
+    if not success:
+        return (None, False, message)
+
+    report = room_validation.validate_room(room)
+    return (report, True, f"Checked {report['checked']} room models")
@@ -0,0 +1,201 @@
+import numpy as np
+from django.conf import settings
+
+from Backend.RoomDesignApp.models import Model, Room, RoomModel
+from Backend.RoomDesignApp.util.geometry import placement_bounds
+
+ROOM_VALIDATE_ON_WRITE = getattr(settings, "ROOM_VALIDATE_ON_WRITE", False)
+
+# Placements may touch each other or the walls within this distance.
+ROOM_VALIDATION_TOLERANCE = getattr(settings, "ROOM_VALIDATION_TOLERANCE", 1e-3)
+
+# Rows compared per broadcast block; bounds peak memory at 10k+ placements.
+_OVERLAP_BLOCK_SIZE = 1024
+
+
+def room_extent(room: Room) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    Returns the room's interior as (lower, upper) corners, or None when the
+    room has no known size.
+
+    Uses the bounds parsed from the room file when available; otherwise
+    Room.sizes is taken as [width, height, depth] measured from the origin.
+    """
+    if room.bounds:
+        return (
+            np.asarray(room.bounds["min"], dtype=np.float64),
+            np.asarray(room.bounds["max"], dtype=np.float64),
+        )
+    if not room.sizes or len(room.sizes) < 3:
+        return None
+    return np.zeros(3), np.asarray(room.sizes[:3], dtype=np.float64)
+
+
+def find_out_of_bounds(
+    lowers: np.ndarray,
+    uppers: np.ndarray,
+    extent: tuple[np.ndarray, np.ndarray],
+    tolerance: float = ROOM_VALIDATION_TOLERANCE,
+) -> np.ndarray:
+    """
+    Returns the indices of boxes that leave the room extent.
+    """
+    room_lower, room_upper = extent
+    outside = np.any(lowers < room_lower - tolerance, axis=1) | np.any(
+        uppers > room_upper + tolerance, axis=1
+    )
+    return np.flatnonzero(outside)
+
+
+def find_overlaps(
+    lowers: np.ndarray,
+    uppers: np.ndarray,
+    tolerance: float = ROOM_VALIDATION_TOLERANCE,
+) -> np.ndarray:
+    """
+    Returns every pair (i, j), i < j, of boxes whose interiors intersect.
+
+    Boxes are sorted by their lower X so each block of rows is only
+    broadcast against the slice of boxes that can still reach it along X
+    (sort-and-sweep), instead of against all N.
+
+    Returns:
+        Array of shape (K, 2) of indices into the input arrays
+    """
+    count = len(lowers)
+    if count < 2:
+        return np.empty((0, 2), dtype=np.intp)
+
+    lowers = lowers + tolerance / 2
+    uppers = uppers - tolerance / 2
+
+    order = np.argsort(lowers[:, 0], kind="stable")
+    # One contiguous row per axis keeps the broadcasts 2D and cache friendly.
+    sorted_lowers = np.ascontiguousarray(lowers[order].T)
+    sorted_uppers = np.ascontiguousarray(uppers[order].T)
+
+    pairs = []
+    for start in range(0, count, _OVERLAP_BLOCK_SIZE):
+        stop = min(start + _OVERLAP_BLOCK_SIZE, count)
+        reach = np.searchsorted(
+            sorted_lowers[0], sorted_uppers[0, start:stop].max(), side="left"
+        )
+        if reach <= start + 1:
+            continue
+
+        intersects = np.ones((stop - start, reach - start), dtype=bool)
+        for axis in range(3):
+            block_lowers = sorted_lowers[axis, start:stop, None]
+            block_uppers = sorted_uppers[axis, start:stop, None]
+            intersects &= block_lowers < sorted_uppers[axis, None, start:reach]
+            intersects &= sorted_lowers[axis, None, start:reach] < block_uppers
+
+        rows, columns = np.nonzero(intersects)
+        rows += start
+        columns += start
+        keep = rows < columns
+        pairs.append(np.stack([rows[keep], columns[keep]], axis=1))
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.intp)
+
+    pairs = order[np.concatenate(pairs)]
+    return np.sort(pairs, axis=1)
+
+
+def load_room_placements(room: Room) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """
+    Loads the ids and room-space bounds of every placement in a room.
+
+    Returns:
+        Tuple of (ids, lowers (N, 3), uppers (N, 3))
+    """
+    rows = list(
+        RoomModel.objects.using(room._state.db)
+        .filter(room_id=room.id)
+        .values_list("id", "size", "axis", "rotations", "model_id")
+    )
+    # Looked up separately: catalog models may live in another database
+    # than the room (see ROOM_SHARDS).
+    bounds = dict(
+        Model.objects.filter(id__in={row[4] for row in rows}).values_list(
+            "id", "bounds"
+        )
+    )
+    ids = [str(row[0]) for row in rows]
+    lowers, uppers = placement_bounds(
+        [bounds.get(row[4]) for row in rows],
+        [row[1] for row in rows],
+        [row[2] for row in rows],
+        [row[3] for row in rows],
+    )
+    return ids, lowers, uppers
+
+
+def validate_room(room: Room) -> dict:
+    """
+    Checks every placement in the room for leaving the room extent and for
+    overlapping other placements, as a single vectorized pass.
+
+    Returns:
+        Dictionary with keys:
+
+            - valid: True when no problem was found
+            - checked: number of placements checked
+            - out_of_bounds: IDs of placements outside the room
+            - overlaps: [id, id] pairs of overlapping placements
+    """
+    ids, lowers, uppers = load_room_placements(room)
+
+    extent = room_extent(room)
+    outside = (
+        find_out_of_bounds(lowers, uppers, extent)
+        if extent is not None
+        else np.empty(0, dtype=np.intp)
+    )
+    overlaps = find_overlaps(lowers, uppers)
+
+    return {
+        "valid": not len(outside) and not len(overlaps),
+        "checked": len(ids),
+        "out_of_bounds": [ids[i] for i in outside],
+        "overlaps": [[ids[i], ids[j]] for i, j in overlaps],
+    }
+
+
+def check_placement(
+    room: Room, room_model_id: str, lower: np.ndarray, upper: np.ndarray, index
+) -> tuple[bool, str]:
+    """
+    Checks one placement against the room extent and the room's other
+    placements before it is written.
+
+    Args:
+        room: Room the placement belongs to
+        room_model_id: ID of the placement (None for a new one)
+        lower, upper: Room-space bounds of the placement
+        index: The room's RoomSpatialIndex
+
+    Returns:
+        Tuple of (valid_bool, message)
+    """
+    extent = room_extent(room)
+    if extent is not None and len(
+        find_out_of_bounds(lower[None, :], upper[None, :], extent)
+    ):
+        return (False, "Placement is outside the room")
+
+    shrunk_lower = lower + ROOM_VALIDATION_TOLERANCE
+    shrunk_upper = upper - ROOM_VALIDATION_TOLERANCE
+    if np.any(shrunk_lower >= shrunk_upper):
+        return (True, "Placement is valid")
+
+    others = [
+        other
+        for other in index.query_box(shrunk_lower, shrunk_upper, strict=True)
+        if other != str(room_model_id)
+    ]
+    if others:
+        return (False, f"Placement overlaps room model {others[0]}")
+
+    return (True, "Placement is valid")
@@ -0,0 +1,334 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router
+
+from Backend.RoomDesignApp.models import CatalogVersion, Model
+from Backend.RoomDesignApp.routers import read_from_replicas
+from Backend.RoomDesignApp.util import metrics
+from Backend.RoomDesignApp.util.model import get_catalog_identity
+
+logger = logging.getLogger(__name__)
+
+# File the TF-IDF matrix is kept in between restarts and shared by workers
+SIMILAR_MODELS_PATH = getattr(
+    settings,
+    "SIMILAR_MODELS_PATH",
+    f"{settings.DATABASES['default']['NAME']}.similar-models.npz",
+)
+
+# Neighbours returned when the request does not ask for a number, and at most
+SIMILAR_MODELS_DEFAULT_LIMIT = getattr(settings, "SIMILAR_MODELS_DEFAULT_LIMIT", 10)
+SIMILAR_MODELS_MAX_LIMIT = getattr(settings, "SIMILAR_MODELS_MAX_LIMIT", 50)
+
+# Share of the catalog that may change before every row is reweighted
+SIMILAR_MODELS_REBUILD_RATIO = getattr(settings, "SIMILAR_MODELS_REBUILD_RATIO", 0.2)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this "
+    "to was with".split()
+)
+
+
+def tokenize(model_name: str, description: str, tags: list) -> Counter:
+    """
+    Returns the term counts of a model's name, description and tags.
+    """
+    text = " ".join(
+        [model_name or "", description or ""]
+        + [tag for tag in tags or () if isinstance(tag, str)]
+    )
+    return Counter(
+        token
+        for token in _TOKEN.findall(text.lower())
+        if len(token) > 1 and token not in _STOP_WORDS
+    )
+
+
+def _signature(model_name: str, description: str, tags: list) -> str:
+    terms = tokenize(model_name, description, tags)
+    return hashlib.blake2b(
+        repr(sorted(terms.items())).encode(), digest_size=8
+    ).hexdigest()
+
+
+def _listed_models(using: str | None) -> dict[str, tuple]:
+    return {
+        str(model_id): (model_name, description, tags)
+        for model_id, model_name, description, tags in Model.objects.using(using)
+        .filter(listed=True)
+        .values_list("id", "name", "description", "tags")
+    }
+
+
+class SimilarModelsIndex:
+    """
+    TF-IDF vectors of the listed models' name, description and tags.
+
+    Rows of ``matrix`` are L2 normalised, so the cosine similarity of one
+    model to every other is a single matrix-vector product. The index follows
+    the catalog version: only the rows of models whose text or listing
+    changed are recomputed, against the current document frequencies. Other
+    rows keep the weights they were computed with until more than
+    SIMILAR_MODELS_REBUILD_RATIO of the catalog changed, at which point every
+    row is reweighted.
+
+    The version and the listed models are read from the same database, and
+    the index only ever moves forward, so replicas lagging behind the
+    primary never make it flip between versions. After each refresh the
+    index is written to SIMILAR_MODELS_PATH in the background, along with
+    the identity of the catalog it was built from, and other worker
+    processes pick it up from there.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._clear()
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Arrays waiting for the saver thread, which runs while there are any
+        self._pending = None
+        self._saver = None
+
+    def _clear(self):
+        self.identity = None
+        self.version = None
+        self.ids: list[str] = []
+        self.signatures: list[str] = []
+        self.terms: list[str] = []
+        self.df = np.zeros(0, dtype=np.float32)
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.stale = 0
+        self._rows: dict[str, int] = {}
+        self._columns: dict[str, int] = {}
+
+    def _outdated(self, identity: str | None, version: int) -> bool:
+        return (
+            identity != self.identity or self.version is None or version > self.version
+        )
+
+    def neighbours(self, model: Model, limit: int) -> list[tuple[str, float]]:
+        """
+        Returns up to ``limit`` (model id, cosine similarity) pairs of the
+        listed models most similar to ``model``, most similar first.
+        """
+        using = router.db_for_read(CatalogVersion)
+        identity, version = get_catalog_identity(using)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            outdated = self._outdated(identity, version)
+
+        if outdated:
+            current = _listed_models(using)
+            with self._lock:
+                if self._outdated(identity, version):
+                    if identity != self.identity:
+                        self._clear()
+                    self._refresh(current)
+                    self.identity, self.version = identity, version
+                    self._schedule_save()
+
+        with self._lock:
+            model_id = str(model.id)
+            row = self._rows.get(model_id)
+            if row is not None:
+                vector = self.matrix[row]
+            else:
+                # Unlisted models are not indexed but can still be compared.
+                vector = self._vector(
+                    tokenize(model.name, model.description, model.tags)
+                )
+
+            scores = self.matrix @ vector
+            if row is not None:
+                scores[row] = -1.0
+
+            count = min(limit, int(np.count_nonzero(scores > 0)))
+            if not count:
+                return []
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self.ids[index], float(scores[index])) for index in top]
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1 + len(self.ids)) / (1 + self.df)) + 1
+
+    def _vector(self, terms: Counter, idf: np.ndarray | None = None) -> np.ndarray:
+        vector = np.zeros(len(self.terms), dtype=np.float32)
+        for term, count in terms.items():
+            column = self._columns.get(term)
+            if column is not None:
+                vector[column] = 1 + math.log(count)
+        vector *= self._idf() if idf is None else idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _refresh(self, current: dict[str, tuple]):
+        signatures = {model_id: _signature(*text) for model_id, text in current.items()}
+
+        removed = [
+            row
+            for model_id, row in self._rows.items()
+            if signatures.get(model_id) != self.signatures[row]
+        ]
+        changed = [
+            model_id
+            for model_id, signature in signatures.items()
+            if model_id not in self._rows
+            or self.signatures[self._rows[model_id]] != signature
+        ]
+        if not removed and not changed:
+            return
+
+        self.stale += len({self.ids[row] for row in removed}.union(changed))
+
+        # Forget the terms of removed and changed rows before dropping them.
+        if removed:
+            self.df -= (self.matrix[removed] > 0).sum(axis=0)
+            keep = np.ones(len(self.ids), dtype=bool)
+            keep[removed] = False
+            self.matrix = self.matrix[keep]
+            self.ids = [id for id, kept in zip(self.ids, keep) if kept]
+            self.signatures = [sig for sig, kept in zip(self.signatures, keep) if kept]
+
+        counts = {model_id: tokenize(*current[model_id]) for model_id in changed}
+        for terms in counts.values():
+            for term in terms:
+                if term not in self._columns:
+                    self._columns[term] = len(self.terms)
+                    self.terms.append(term)
+        grow = len(self.terms) - self.matrix.shape[1]
+        if grow:
+            self.matrix = np.pad(self.matrix, ((0, 0), (0, grow)))
+            self.df = np.pad(self.df, (0, grow))
+        for terms in counts.values():
+            for term in terms:
+                self.df[self._columns[term]] += 1
+
+        self.ids.extend(changed)
+        self.signatures.extend(signatures[model_id] for model_id in changed)
+        self._rows = {model_id: row for row, model_id in enumerate(self.ids)}
+
+        if self.stale > SIMILAR_MODELS_REBUILD_RATIO * len(self.ids):
+            counts = {model_id: tokenize(*current[model_id]) for model_id in self.ids}
+            self.matrix = np.zeros((0, len(self.terms)), dtype=np.float32)
+            self.stale = 0
+            metrics.inc("roomdesign_similar_models_rebuilds_total")
+
+        idf = self._idf()
+        rows = [self._vector(terms, idf) for terms in counts.values()]
+        if rows:
+            self.matrix = np.vstack(
+                [self.matrix[: len(self.ids) - len(rows)], np.array(rows)]
+            )
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with np.load(self.path) as stored:
+                self.identity = str(stored["identity"]) or None
+                self.version = int(stored["version"])
+                self.stale = int(stored["stale"])
+                self.ids = stored["ids"].tolist()
+                self.signatures = stored["signatures"].tolist()
+                self.terms = stored["terms"].tolist()
+                self.df = stored["df"]
+                self.matrix = stored["matrix"]
+        except (OSError, KeyError, ValueError):
+            return
+        self._rows = {model_id: row for row, model_id in enumerate(self.ids)}
+        self._columns = {term: column for column, term in enumerate(self.terms)}
+
+    def _schedule_save(self):
+        """
+        Queues a copy of the index for the saver thread, starting it when it
+        is not running. Called with the lock held; only the latest copy is
+        written when refreshes outpace the disk.
+        """
+        self._pending = {
+            "identity": self.identity or "",
+            "version": self.version,
+            "stale": self.stale,
+            "ids": np.array(self.ids, dtype=str),
+            "signatures": np.array(self.signatures, dtype=str),
+            "terms": np.array(self.terms, dtype=str),
+            # Updated in place by _refresh, unlike the matrix
+            "df": self.df.copy(),
+            "matrix": self.matrix,
+        }
+        if self._saver is None:
+            self._saver = threading.Thread(
+                target=self._save_pending, name="similar-models-saver", daemon=True
+            )
+            self._saver.start()
+
+    def _save_pending(self):
+        while True:
+            with self._lock:
+                arrays, self._pending = self._pending, None
+                if arrays is None:
+                    self._saver = None
+                    return
+            try:
+                self._save(arrays)
+            except OSError:
+                logger.exception("Could not save the similar models index")
+
+    def _save(self, arrays: dict):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Written aside and moved into place, so other workers never read a
+        # partial file.
+        with tempfile.NamedTemporaryFile(
+            dir=directory, suffix=".npz", delete=False
+        ) as f:
+            np.savez(f, **arrays)
+        os.replace(f.name, self.path)
+
+
+_index = SimilarModelsIndex(SIMILAR_MODELS_PATH)
+
+
+@read_from_replicas()
+def handle_get_similar_models(
+    model_id: uuid.UUID, limit: int | None = None, fields: list[str] | None = None
+) -> tuple[list[Model] | None, bool, str]:
+    """
+    Returns the listed models whose name, description and tags are most
+    similar to those of the given model.
+
+    Args:
+        model_id: ID of the model to find neighbours of
+        limit: Most models to return (default SIMILAR_MODELS_DEFAULT_LIMIT)
+        fields: Only load these columns of the neighbours (see MODEL_FIELDS)
+
+    Returns:
+        Tuple of (list of Model instances, most similar first, success_bool, message)
+    """
+    try:
+        model = Model.objects.only("id", "name", "description", "tags").get(id=model_id)
+    except (Model.DoesNotExist, ValidationError):
+        return (None, False, "Model not found with the given ID")
+
+    limit = min(limit or SIMILAR_MODELS_DEFAULT_LIMIT, SIMILAR_MODELS_MAX_LIMIT)
+    neighbours = _index.neighbours(model, limit)
+
+    models = Model.objects.filter(id__in=[id for id, _ in neighbours])
+    if fields:
+        models = models.only(*fields)
+    order = {id: index for index, (id, _) in enumerate(neighbours)}
+    models = sorted(models, key=lambda model: order[str(model.id)])
+
+    return (models, True, f"Found {len(models)} similar models")
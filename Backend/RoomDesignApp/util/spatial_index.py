@@ -0,0 +1,262 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Prefetch
+
+from Backend.RoomDesignApp.models import Model, RoomModel
+from Backend.RoomDesignApp.util import metrics
+from Backend.RoomDesignApp.util.geometry import placement_bounds
+
+SPATIAL_INDEX_CELL_SIZE = getattr(settings, "SPATIAL_INDEX_CELL_SIZE", 1.0)
+SPATIAL_INDEX_MAX_ROOMS = getattr(settings, "SPATIAL_INDEX_MAX_ROOMS", 256)
+
+# Items covering more cells than this are kept in a side list instead of
+# being stamped into every cell (e.g. rugs or a wall-to-wall shelf).
+_MAX_CELLS_PER_ITEM = 1024
+
+
+class RoomSpatialIndex:
+    """
+    Uniform grid over the XZ floor plane holding the room-space bounding box
+    of every placement in a room.
+
+    Queries only visit the cells touched by the query box, so their cost
+    depends on local density rather than on the number of placements.
+    """
+
+    def __init__(self, cell_size: float = SPATIAL_INDEX_CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self._boxes: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._item_cells: dict[str, list[tuple[int, int]]] = {}
+        self._cells: dict[tuple[int, int], set[str]] = {}
+        self._large: set[str] = set()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def _cell_range(self, lower, upper) -> tuple[range, range]:
+        return (
+            range(
+                math.floor(lower[0] / self.cell_size),
+                math.floor(upper[0] / self.cell_size) + 1,
+            ),
+            range(
+                math.floor(lower[2] / self.cell_size),
+                math.floor(upper[2] / self.cell_size) + 1,
+            ),
+        )
+
+    def insert(self, item_id: str, lower: np.ndarray, upper: np.ndarray):
+        item_id = str(item_id)
+        with self._lock:
+            self.remove(item_id)
+            self._boxes[item_id] = (np.asarray(lower), np.asarray(upper))
+
+            xs, zs = self._cell_range(lower, upper)
+            if len(xs) * len(zs) > _MAX_CELLS_PER_ITEM:
+                self._large.add(item_id)
+                return
+
+            cells = [(x, z) for x in xs for z in zs]
+            for cell in cells:
+                self._cells.setdefault(cell, set()).add(item_id)
+            self._item_cells[item_id] = cells
+
+    def remove(self, item_id: str):
+        item_id = str(item_id)
+        with self._lock:
+            if self._boxes.pop(item_id, None) is None:
+                return
+            self._large.discard(item_id)
+            for cell in self._item_cells.pop(item_id, []):
+                members = self._cells.get(cell)
+                if members is not None:
+                    members.discard(item_id)
+                    if not members:
+                        del self._cells[cell]
+
+    def boxes(self) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """
+        Returns (ids, lowers (N, 3), uppers (N, 3)) for every indexed item.
+        """
+        with self._lock:
+            ids = list(self._boxes)
+            if not ids:
+                return ids, np.empty((0, 3)), np.empty((0, 3))
+            lowers = np.array([self._boxes[item_id][0] for item_id in ids])
+            uppers = np.array([self._boxes[item_id][1] for item_id in ids])
+        return ids, lowers, uppers
+
+    def bounds(self, item_id: str) -> tuple[np.ndarray, np.ndarray] | None:
+        return self._boxes.get(str(item_id))
+
+    def _candidates(self, lower, upper) -> set[str]:
+        xs, zs = self._cell_range(lower, upper)
+        candidates = set(self._large)
+        if len(xs) * len(zs) > len(self._cells):
+            for cell, members in self._cells.items():
+                if cell[0] in xs and cell[1] in zs:
+                    candidates |= members
+            return candidates
+        for x in xs:
+            for z in zs:
+                members = self._cells.get((x, z))
+                if members:
+                    candidates |= members
+        return candidates
+
+    def query_box(self, lower, upper, strict: bool = False) -> list[str]:
+        """
+        Returns ids whose bounds intersect [lower, upper].
+
+        With ``strict`` boxes that only touch faces are not reported.
+        """
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        result = []
+        with self._lock:
+            for item_id in self._candidates(lower, upper):
+                item_lower, item_upper = self._boxes[item_id]
+                if strict:
+                    hit = np.all(item_lower < upper) and np.all(lower < item_upper)
+                else:
+                    hit = np.all(item_lower <= upper) and np.all(lower <= item_upper)
+                if hit:
+                    result.append(item_id)
+        return result
+
+    def query_point(self, point) -> list[str]:
+        """
+        Returns ids whose bounds contain the point [x, y, z].
+        """
+        return self.query_box(point, point)
+
+    def query_inside(self, lower, upper) -> list[str]:
+        """
+        Returns ids whose bounds lie entirely within [lower, upper].
+        """
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        with self._lock:
+            return [
+                item_id
+                for item_id in self.query_box(lower, upper)
+                if np.all(self._boxes[item_id][0] >= lower)
+                and np.all(self._boxes[item_id][1] <= upper)
+            ]
+
+    def query_overlapping(self, item_id: str) -> list[str]:
+        """
+        Returns ids of the other placements whose bounds overlap the given one.
+        """
+        bounds = self.bounds(item_id)
+        if bounds is None:
+            return []
+        return [
+            other
+            for other in self.query_box(*bounds, strict=True)
+            if other != str(item_id)
+        ]
+
+
+_indexes: OrderedDict[str, tuple[int, RoomSpatialIndex]] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _room_model_bounds(room_models: list[RoomModel]) -> tuple[np.ndarray, np.ndarray]:
+    return placement_bounds(
+        [room_model.model.bounds for room_model in room_models],
+        [room_model.size for room_model in room_models],
+        [room_model.axis for room_model in room_models],
+        [room_model.rotations for room_model in room_models],
+    )
+
+
+def build_room_index(room_id: str, using: str | None = None) -> RoomSpatialIndex:
+    """
+    Builds the spatial index of a room from its RoomModel rows.
+    """
+    # Prefetched rather than joined: catalog models may live in another
+    # database than the room (see ROOM_SHARDS).
+    room_models = list(
+        RoomModel.objects.using(using)
+        .filter(room_id=room_id)
+        .only("id", "size", "axis", "rotations", "model_id")
+        .prefetch_related(
+            Prefetch("model", queryset=Model.objects.only("id", "bounds"))
+        )
+    )
+    lowers, uppers = _room_model_bounds(room_models)
+
+    index = RoomSpatialIndex()
+    for room_model, lower, upper in zip(room_models, lowers, uppers):
+        index.insert(room_model.id, lower, upper)
+    return index
+
+
+def get_room_index(room) -> RoomSpatialIndex:
+    """
+    Returns the spatial index for the room's current revision, building it
+    if this process has no index for that revision yet.
+    """
+    key = str(room.id)
+
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        hit = cached is not None and cached[0] == room.revision
+        if hit:
+            _indexes.move_to_end(key)
+    metrics.record_cache("spatial_index", hit)
+    if hit:
+        return cached[1]
+
+    index = build_room_index(room.id, using=room._state.db)
+
+    with _indexes_lock:
+        _indexes[key] = (room.revision, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > SPATIAL_INDEX_MAX_ROOMS:
+            _indexes.popitem(last=False)
+
+    return index
+
+
+def apply_room_model_change(
+    room_id: str,
+    revision: int,
+    room_model_id: str,
+    room_model: RoomModel | None = None,
+):
+    """
+    Applies one placement change to a cached index.
+
+    The change is applied in place only when the cached index is exactly one
+    revision behind; otherwise the entry is dropped and rebuilt on next use.
+
+    Args:
+        room_id: ID of the room that changed
+        revision: Room revision after the change
+        room_model_id: ID of the RoomModel that was added, updated or removed
+        room_model: The saved RoomModel, or None when it was removed
+    """
+    key = str(room_id)
+
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is None:
+            return
+        if cached[0] != revision - 1:
+            del _indexes[key]
+            return
+
+        index = cached[1]
+        if room_model is None:
+            index.remove(room_model_id)
+        else:
+            lowers, uppers = _room_model_bounds([room_model])
+            index.insert(room_model_id, lowers[0], uppers[0])
+        _indexes[key] = (revision, index)
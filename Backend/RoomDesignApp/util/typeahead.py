@@ -0,0 +1,130 @@
+import bisect
+import heapq
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+from Backend.RoomDesignApp.models import Model
+from Backend.RoomDesignApp.routers import read_from_replicas
+from Backend.RoomDesignApp.util.model import get_catalog_version
+
+# Completions returned when the request does not ask for a number
+TYPEAHEAD_DEFAULT_LIMIT = getattr(settings, "TYPEAHEAD_DEFAULT_LIMIT", 10)
+
+# Most completions a single request may ask for
+TYPEAHEAD_MAX_LIMIT = getattr(settings, "TYPEAHEAD_MAX_LIMIT", 50)
+
+
+class TypeaheadIndex:
+    """
+    Prefix index over the names and tags of listed models.
+
+    Completions are kept in one sorted list of (key, kind, text) entries, so
+    the entries matching a prefix are the contiguous slice found with two
+    bisections. A name is indexed under every word it contains, so "sof"
+    completes "Oak Sofa". Completions are ranked by how many listed models
+    share them.
+
+    The index follows the catalog version: when it changed, the listed
+    models are read again and only those whose name, tags or listing
+    changed are removed from and re-inserted into the sorted list.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._entries: list[tuple[str, str, str]] = []
+        self._counts: Counter = Counter()
+        self._models: dict = {}
+        self._lock = threading.Lock()
+
+    def complete(self, prefix: str, limit: int) -> list[dict]:
+        version = get_catalog_version()
+        with self._lock:
+            if version != self.version:
+                self._refresh()
+                self.version = version
+
+            lo = bisect.bisect_left(self._entries, (prefix,))
+            hi = bisect.bisect_left(self._entries, (prefix + "\uffff",))
+            matches = {(kind, text) for _, kind, text in self._entries[lo:hi]}
+            ranked = heapq.nsmallest(
+                limit,
+                matches,
+                key=lambda match: (-self._counts[match], len(match[1]), match[1]),
+            )
+            return [
+                {"text": text, "kind": kind, "count": self._counts[(kind, text)]}
+                for kind, text in ranked
+            ]
+
+    def _refresh(self):
+        current = {
+            model_id: (name, tuple(tags or ()))
+            for model_id, name, tags in Model.objects.filter(listed=True).values_list(
+                "id", "name", "tags"
+            )
+        }
+
+        for model_id, terms in self._models.items():
+            if current.get(model_id) != terms:
+                self._apply(terms, -1)
+        for model_id, terms in current.items():
+            if self._models.get(model_id) != terms:
+                self._apply(terms, 1)
+        self._models = current
+
+    def _apply(self, terms: tuple[str, tuple], delta: int):
+        name, tags = terms
+        completions = [("model", name)]
+        completions.extend(("tag", tag) for tag in set(tags) if isinstance(tag, str))
+
+        for completion in completions:
+            self._counts[completion] += delta
+            if self._counts[completion] == 1 and delta > 0:
+                for key in _keys(*completion):
+                    bisect.insort(self._entries, (key, *completion))
+            elif self._counts[completion] == 0:
+                del self._counts[completion]
+                for key in _keys(*completion):
+                    entry = (key, *completion)
+                    index = bisect.bisect_left(self._entries, entry)
+                    if index < len(self._entries) and self._entries[index] == entry:
+                        del self._entries[index]
+
+
+def _keys(kind: str, text: str) -> set[str]:
+    words = normalize(text).split(" ")
+    if kind == "tag":
+        return {" ".join(words)}
+    return {" ".join(words[start:]) for start in range(len(words))}
+
+
+def normalize(text: str) -> str:
+    """
+    Lower-cases text and collapses its whitespace, as keys are indexed.
+    """
+    return " ".join(text.lower().split())
+
+
+_index = TypeaheadIndex()
+
+
+@read_from_replicas()
+def handle_typeahead(prefix: str, limit: int | None = None) -> list[dict]:
+    """
+    Returns the top completions of a partially typed search term.
+
+    Args:
+        prefix: What the user typed so far
+        limit: Most completions to return (default TYPEAHEAD_DEFAULT_LIMIT)
+
+    Returns:
+        List of {"text", "kind" ("model" or "tag"), "count"} dictionaries,
+        most common first.
+    """
+    prefix = normalize(prefix or "")
+    if not prefix:
+        return []
+    limit = min(limit or TYPEAHEAD_DEFAULT_LIMIT, TYPEAHEAD_MAX_LIMIT)
+    return _index.complete(prefix, limit)
@@ -0,0 +1,222 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from Backend.RoomDesignApp.models import RoomModel
+from Backend.RoomDesignApp.util import metrics, spatial_index
+from Backend.RoomDesignApp.util import room as room_utils
+from Backend.RoomDesignApp.util.write_queue import serialized_write
+
+logger = logging.getLogger(__name__)
+
+# Keep transform updates of room models in memory and save them later
+WRITE_BEHIND_ENABLED = getattr(settings, "WRITE_BEHIND_ENABLED", False)
+
+# Seconds a buffered transform waits at most before it is saved
+WRITE_BEHIND_FLUSH_INTERVAL = getattr(settings, "WRITE_BEHIND_FLUSH_INTERVAL", 1.0)
+
+# Seconds without updates after which a placement is saved early
+WRITE_BEHIND_IDLE = getattr(settings, "WRITE_BEHIND_IDLE", 0.25)
+
+# RoomModel fields a transform update may change
+TRANSFORM_FIELDS = ("size", "axis", "rotations")
+
+
+class _Entry:
+    __slots__ = ("room_model", "dirty_since", "updated")
+
+    def __init__(self, room_model: RoomModel, dirty_since: float, updated: float):
+        self.room_model = room_model
+        self.dirty_since = dirty_since
+        self.updated = updated
+
+
+@serialized_write
+def _save(room_models: list[RoomModel], using: str):
+    """
+    Writes the transforms of buffered room models held by one database,
+    bumping the revision of their rooms as a direct save would. Placements
+    deleted in the meantime are skipped.
+    """
+    with transaction.atomic(using=using):
+        live = set(
+            RoomModel.objects.using(using)
+            .filter(id__in=[room_model.id for room_model in room_models])
+            .values_list("id", flat=True)
+        )
+        room_models = [
+            room_model for room_model in room_models if room_model.id in live
+        ]
+        RoomModel.objects.using(using).bulk_update(room_models, TRANSFORM_FIELDS)
+
+        for room_model in room_models:
+            revision = room_utils.bump_room_revision(room_model.room_id, using)
+            transaction.on_commit(
+                lambda room_model=room_model, revision=revision: (
+                    spatial_index.apply_room_model_change(
+                        room_model.room_id, revision, room_model.id, room_model
+                    )
+                ),
+                using=using,
+            )
+
+
+class WriteBehindBuffer:
+    """
+    Holds the latest transform of room models whose save was deferred.
+
+    A placement is saved once no update arrived for ``idle`` seconds, or at
+    the latest ``flush_interval`` seconds after it was first buffered, so a
+    model dragged at any rate costs one UPDATE per interval instead of one
+    per update. A background thread does the saving, all due placements in
+    one transaction per database (through the write queue when that is
+    enabled); a failed save leaves them buffered for the next attempt.
+
+    Entries stay in the buffer until their save commits, and readers overlay
+    them on what they load, so this process never serves a transform older
+    than the last one it accepted. Other processes, and readers working on
+    whole rooms (spatial index, validation, baked rooms), see it once saved.
+    Everything still buffered is saved when the process exits normally.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        idle: float = WRITE_BEHIND_IDLE,
+    ):
+        self.flush_interval = flush_interval
+        self.idle = idle
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._listeners = []
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def put(self, room_model: RoomModel):
+        """
+        Buffers a room model's transform in place of saving it.
+        """
+        key = str(room_model.id)
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.get(key)
+            dirty_since = previous.dirty_since if previous else now
+            self._entries[key] = _Entry(room_model, dirty_since, now)
+            self._dirty.set()
+        metrics.inc("roomdesign_write_behind_updates_total")
+        self._ensure_started()
+        for listener in self._listeners:
+            listener(room_model)
+
+    def subscribe(self, listener):
+        """
+        Calls ``listener(room_model)``, on the buffering thread, for every
+        transform buffered from now on: the room's revision only moves once
+        it is saved.
+        """
+        self._listeners.append(listener)
+
+    def overlay(self, room_model: RoomModel) -> RoomModel:
+        """
+        Replaces a loaded room model's transform with its buffered one, if
+        any, and returns it.
+        """
+        if not self._entries:
+            return room_model
+        with self._lock:
+            entry = self._entries.get(str(room_model.id))
+        if entry is not None:
+            for field in TRANSFORM_FIELDS:
+                setattr(room_model, field, getattr(entry.room_model, field))
+        return room_model
+
+    def discard(self, room_model_id):
+        """
+        Forgets the buffered transform of a removed room model.
+        """
+        with self._lock:
+            self._entries.pop(str(room_model_id), None)
+
+    def flush(self, room_id=None, due_only: bool = False) -> int:
+        """
+        Saves buffered transforms: every one, only those of ``room_id``, or
+        with ``due_only`` only those idle or buffered for too long. Returns
+        the number of placements written.
+
+        Saves go through the write queue while holding the flush lock, so
+        this must not be called from a serialized write: the writer could
+        wait for a flush that is waiting for the writer.
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                entries = {
+                    key: entry
+                    for key, entry in self._entries.items()
+                    if (
+                        room_id is None or str(entry.room_model.room_id) == str(room_id)
+                    )
+                    and (
+                        not due_only
+                        or now - entry.updated >= self.idle
+                        or now - entry.dirty_since >= self.flush_interval
+                    )
+                }
+            if not entries:
+                return 0
+
+            by_database = {}
+            for entry in entries.values():
+                room_model = entry.room_model
+                by_database.setdefault(room_model._state.db, []).append(room_model)
+            for using, room_models in by_database.items():
+                _save(room_models, using)
+
+            with self._lock:
+                for key, entry in entries.items():
+                    # Updated again while saving: keep the newer transform.
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                if not self._entries:
+                    self._dirty.clear()
+        metrics.inc("roomdesign_write_behind_flushed_total", len(entries))
+        return len(entries)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(
+                    target=self._run, name="room-design-write-behind", daemon=True
+                )
+                thread.start()
+                self._thread = thread
+
+    def _run(self):
+        tick = min(self.idle, self.flush_interval) / 2
+        while True:
+            self._dirty.wait()
+            time.sleep(tick)
+            close_old_connections()
+            try:
+                self.flush(due_only=True)
+            except Exception:
+                logger.exception("Saving buffered room model transforms failed")
+
+
+buffer = WriteBehindBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception("Buffered room model transforms were lost on exit")
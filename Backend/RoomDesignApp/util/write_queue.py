@@ -0,0 +1,204 @@
+import functools
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, transaction
+
+# Funnel decorated mutations through one writer thread per database and process.
+WRITE_QUEUE_ENABLED = getattr(settings, "WRITE_QUEUE_ENABLED", False)
+
+# Most mutations committed together in one transaction
+WRITE_QUEUE_MAX_BATCH = getattr(settings, "WRITE_QUEUE_MAX_BATCH", 64)
+
+# Seconds the writer waits for more mutations before committing a batch
+WRITE_QUEUE_MAX_WAIT = getattr(settings, "WRITE_QUEUE_MAX_WAIT", 0.002)
+
+
+class WriteQueue:
+    """
+    Runs mutations of one database one at a time on a dedicated writer
+    thread and commits them in group transactions.
+
+    Every mutation runs in its own savepoint inside the group transaction,
+    so one that raises is rolled back alone and only its caller sees the
+    error. If the group commit itself fails, the batch is replayed with one
+    transaction per mutation so each caller still gets its own result.
+    Work deferred with ``transaction.on_commit`` runs once the group commits.
+    Only ``using`` is in the group: each room shard has its own queue, so a
+    busy shard never holds up writes to the others.
+    """
+
+    def __init__(
+        self,
+        using: str = "default",
+        max_batch: int = WRITE_QUEUE_MAX_BATCH,
+        max_wait: float = WRITE_QUEUE_MAX_WAIT,
+    ):
+        self.using = using
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"mutations": 0, "batches": 0, "replayed_batches": 0}
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Runs ``func(*args, **kwargs)`` on the writer thread and returns its
+        result, or raises its exception, once the batch it joined is
+        committed.
+        """
+        self._ensure_started()
+        future = Future()
+        self._jobs.put((future, func, args, kwargs))
+        return future.result()
+
+    def is_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def stats(self) -> dict:
+        """
+        Returns counters of committed mutations and batches.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = (
+            stats["mutations"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f"room-design-writer-{self.using}",
+                    daemon=True,
+                )
+                thread.start()
+                self._thread = thread
+
+    def _next_batch(self) -> list:
+        batch = [self._jobs.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(self._jobs.get(timeout=timeout))
+                else:
+                    batch.append(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            try:
+                outcomes = self._commit_group(batch)
+                replayed = False
+            except DatabaseError:
+                outcomes = [self._call(job) for job in batch]
+                replayed = True
+
+            with self._stats_lock:
+                self._stats["mutations"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["replayed_batches"] += replayed
+
+            for (future, *_), (ok, value) in zip(batch, outcomes):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _call(self, job) -> tuple[bool, object]:
+        _, func, args, kwargs = job
+        try:
+            with transaction.atomic(using=self.using):
+                return (True, func(*args, **kwargs))
+        except Exception as e:
+            return (False, e)
+
+    def _commit_group(self, batch: list) -> list:
+        with transaction.atomic(using=self.using):
+            return [self._call(job) for job in batch]
+
+
+_queues: dict[str, WriteQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def write_queue(using: str | None = None) -> WriteQueue:
+    """
+    Returns the write queue of a database alias, creating it on first use.
+    """
+    using = using or "default"
+    with _queues_lock:
+        if using not in _queues:
+            _queues[using] = WriteQueue(using)
+        return _queues[using]
+
+
+def is_writer_thread() -> bool:
+    """
+    Returns True on the writer thread of any database.
+    """
+    with _queues_lock:
+        queues = list(_queues.values())
+    return any(writer.is_writer_thread() for writer in queues)
+
+
+def stats() -> dict:
+    """
+    Returns the counters of every write queue added up.
+    """
+    with _queues_lock:
+        queues = list(_queues.values())
+    totals = {"mutations": 0, "batches": 0, "replayed_batches": 0}
+    for writer in queues:
+        writer_stats = writer.stats()
+        for key in totals:
+            totals[key] += writer_stats[key]
+    totals["mean_batch_size"] = (
+        totals["mutations"] / totals["batches"] if totals["batches"] else 0.0
+    )
+    return totals
+
+
+def serialized_write(func):
+    """
+    Decorator for util handlers that mutate the database named by their
+    ``using`` argument ("default" when they have none, or it is None).
+    With WRITE_QUEUE_ENABLED the call is handed to that database's writer
+    thread and batched with concurrent mutations of it; otherwise, when
+    already on a writer thread, or inside a caller's transaction on that
+    database (which the writer could not see), it runs inline.
+
+    Writes to other databases are not part of the group transaction. They
+    commit on their own and are repeated if the group is replayed, so keep
+    them to ones that are safe to repeat.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        using = signature.bind(*args, **kwargs).arguments.get("using") or "default"
+        if (
+            not WRITE_QUEUE_ENABLED
+            or is_writer_thread()
+            or connections[using].in_atomic_block
+        ):
+            return func(*args, **kwargs)
+        return write_queue(using).submit(func, *args, **kwargs)
+
+    return wrapper
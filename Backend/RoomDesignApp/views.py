@@ -1,12 +1,24 @@
+import json
 import uuid
-from django.http import JsonResponse
+from Backend.RoomDesignApp.util.instrumentation import JsonResponse
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
 import Backend.RoomDesignApp.util.auth as auth_utils
+import Backend.RoomDesignApp.util.media as media_utils
+import Backend.RoomDesignApp.util.metrics as metrics_utils
 import RoomDesignApp.util.model as model_utils
 import Backend.RoomDesignApp.util.room as room_utils
 import Backend.RoomDesignApp.util.room_models as room_model_utils
-from Backend.RoomDesignApp.util.general_util import errorResponse
+import Backend.RoomDesignApp.util.similar_models as similar_model_utils
+import Backend.RoomDesignApp.util.typeahead as typeahead_utils
+from Backend.RoomDesignApp.util.general_util import (
+    errorResponse,
+    parse_fields,
+    parse_vector,
+)
+from Backend.RoomDesignApp.routers import read_from_replicas
+from Backend.RoomDesignApp.util.coalescing import coalesce_view
 
 
 # Create your views here.
@@ -67,10 +79,15 @@ def update_room_model_view(request):
     try:
         user_id = request.POST.get("userid")
         room_model_id = request.POST.get("id")
-        room_model_data = request.POST.get("room_model_data", "{}")
+        room_model_data = json.loads(request.POST.get("room_model_data", "{}"))
+    except json.JSONDecodeError:
+        return errorResponse("Invalid room model data", status=400)
     except Exception as e:
         return errorResponse(f"Server error: {str(e)}", status=500)
 
+    if not isinstance(room_model_data, dict):
+        return errorResponse("Invalid room model data", status=400)
+
     if not user_id or not room_model_id:
         return errorResponse("Missing required fields", status=400)
 
@@ -115,6 +132,7 @@ def delete_room_model_view(request):
     return errorResponse(message, status=400)
 
 
+@read_from_replicas()
 def get_room_model_by_id_view(request):
     """
     Retrieves a specific room model by its ID.
@@ -148,6 +166,53 @@ def get_room_model_by_id_view(request):
     return JsonResponse({"room_model": serialized_room_model}, status=200)
 
 
+def room_spatial_query_view(request):
+    """
+    Answers geometric queries about the placements in a room.
+    This view uses the room's server-side spatial index, so clients do not
+    need to download the whole room to hit-test or detect overlaps.
+    Expects GET parameters:
+        - userid: <str> (required, ID of the user who owns the room)
+        - id: <str> (required, ID of the room)
+        and exactly one query:
+        - point: <x,y,z> (room models containing the point)
+        - min, max: <x,y,z> (room models intersecting the box)
+        - min, max, inside=true (room models entirely inside the box)
+        - overlaps: <str> (ID of a room model; room models overlapping it)
+    Returns:
+        JsonResponse: A JSON response containing the matching room model IDs or an error message.
+    """
+    if request.method != "GET":
+        return errorResponse("Only GET method allowed", status=405)
+
+    try:
+        user_id = request.GET.get("userid")
+        room_id = request.GET.get("id")
+        point = parse_vector(request.GET.get("point"))
+        lower = parse_vector(request.GET.get("min"))
+        upper = parse_vector(request.GET.get("max"))
+        inside = request.GET.get("inside", "false").lower() == "true"
+        overlaps = request.GET.get("overlaps")
+    except Exception as e:
+        return errorResponse(f"Server error: {str(e)}", status=500)
+
+    if not user_id or not room_id:
+        return errorResponse("Missing required fields", status=400)
+
+    query = {"point": point, "overlaps": overlaps}
+    if lower is not None and upper is not None:
+        query["inside" if inside else "box"] = (lower, upper)
+
+    room_model_ids, success, message = room_model_utils.handle_spatial_query(
+        user_id, room_id, query
+    )
+
+    if not success:
+        return errorResponse(message, status=400)
+
+    return JsonResponse({"room_models": room_model_ids}, status=200)
+
+
 # RoomViews
 @csrf_exempt
 def get_rooms_view(request):
@@ -156,6 +221,7 @@ def get_rooms_view(request):
     This view handles the retrieval of all rooms owned by a user via a GET request.
     Expects GET parameters:
         - userid: <str> (required, ID of the user whose rooms are to be retrieved)
+        - fields: <str> (optional, comma-separated subset of ROOM_FIELDS to return)
     Returns:
         JsonResponse: A JSON response containing the list of rooms or an error message.
     """
@@ -164,19 +230,26 @@ def get_rooms_view(request):
 
     try:
         user_id = request.GET.get("userid")
+        fields = parse_fields(request.GET.get("fields"), room_utils.ROOM_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
     except Exception as e:
         return errorResponse(f"Server error: {str(e)}", status=500)
 
     if not user_id:
         return errorResponse("Missing required field: userid", status=400)
 
-    rooms = room_utils.handle_get_rooms_list(user_id)
-    serialized_rooms = [room_utils.room_to_json_serializer(room) for room in rooms]
+    rooms = room_utils.handle_get_rooms_list(user_id, fields)
+    serialized_rooms = [
+        room_utils.room_to_json_serializer(room, fields) for room in rooms
+    ]
 
     return JsonResponse({"rooms": serialized_rooms}, status=200)
 
 
 @csrf_exempt
+@read_from_replicas()
+@coalesce_view
 def get_room_view(request):
     """
     Retrieves a specific room by its ID.
@@ -184,6 +257,7 @@ def get_room_view(request):
     Expects GET parameters:
         - userid: <str> (required, ID of the user who owns the room)
         - id: <str> (required, ID of the room to retrieve)
+        - fields: <str> (optional, comma-separated subset of ROOM_FIELDS to return)
     Returns:
         JsonResponse: A JSON response containing the room data or an error message.
     """
@@ -193,21 +267,88 @@ def get_room_view(request):
     try:
         user_id = request.GET.get("userid")
         room_id = request.GET.get("id")
+        fields = parse_fields(request.GET.get("fields"), room_utils.ROOM_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
     except Exception as e:
         return errorResponse(f"Server error: {str(e)}", status=500)
 
     if not user_id or not room_id:
         return errorResponse("Missing required fields", status=400)
 
-    room, success, message = room_utils.handle_get_room_by_id(user_id, room_id)
+    room, success, message = room_utils.handle_get_room_by_id(user_id, room_id, fields)
 
     if not success:
         return errorResponse(message, status=400)
 
-    serialized_room = room_utils.room_to_json_serializer(room)
+    serialized_room = room_utils.room_to_json_serializer(room, fields)
     return JsonResponse({"room": serialized_room}, status=200)
 
 
+def get_baked_room_view(request):
+    """
+    Retrieves a room baked into a single mesh file.
+    This view merges the room file and every model placed in the room into one
+    .glb (transforms applied, primitives batched per material), so viewers can
+    load a furnished room in a single request. The baked file is cached per
+    room revision and served with Range and ETag support.
+    Expects GET parameters:
+        - userid: <str> (required, ID of the user who owns the room)
+        - id: <str> (required, ID of the room to bake)
+    Returns:
+        FileResponse: The baked .glb file, or a JSON error message.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return errorResponse("Only GET and HEAD methods allowed", status=405)
+
+    try:
+        user_id = request.GET.get("userid")
+        room_id = request.GET.get("id")
+    except Exception as e:
+        return errorResponse(f"Server error: {str(e)}", status=500)
+
+    if not user_id or not room_id:
+        return errorResponse("Missing required fields", status=400)
+
+    full_path, success, message = room_utils.handle_get_baked_room(user_id, room_id)
+
+    if not success:
+        return errorResponse(message, status=400)
+
+    return media_utils.build_media_response(request, full_path)
+
+
+def validate_room_view(request):
+    """
+    Validates the placements of a room.
+    This view checks every room model in the room for leaving the room
+    (Room.sizes) and for overlapping other room models.
+    Expects GET parameters:
+        - userid: <str> (required, ID of the user who owns the room)
+        - id: <str> (required, ID of the room to validate)
+    Returns:
+        JsonResponse: A JSON response containing the validation report or an error message.
+    """
+    if request.method != "GET":
+        return errorResponse("Only GET method allowed", status=405)
+
+    try:
+        user_id = request.GET.get("userid")
+        room_id = request.GET.get("id")
+    except Exception as e:
+        return errorResponse(f"Server error: {str(e)}", status=500)
+
+    if not user_id or not room_id:
+        return errorResponse("Missing required fields", status=400)
+
+    report, success, message = room_model_utils.handle_validate_room(user_id, room_id)
+
+    if not success:
+        return errorResponse(message, status=400)
+
+    return JsonResponse({"validation": report}, status=200)
+
+
 @csrf_exempt
 def delete_room_view(request):
     """
@@ -257,10 +398,15 @@ def update_room_view(request):
     try:
         room_id = request.POST.get("id")
         user_id = request.POST.get("userid")
-        room_data = request.POST.get("room_data", "{}")
+        room_data = json.loads(request.POST.get("room_data", "{}"))
+    except json.JSONDecodeError:
+        return errorResponse("Invalid room data", status=400)
     except Exception as e:
         return errorResponse(f"Server error: {str(e)}", status=500)
 
+    if not isinstance(room_data, dict):
+        return errorResponse("Invalid room data", status=400)
+
     if not room_id or not user_id:
         return errorResponse("Missing required fields", status=400)
 
@@ -316,29 +462,96 @@ def add_room_view(request):
     return errorResponse(message, status=400)
 
 
+@csrf_exempt
+def clone_room_view(request):
+    """
+    Copies a room with all its placed models into a new room for the user,
+    sharing the original room file instead of uploading it again.
+    Expects POST form data:
+        - id: <str> (required, ID of the user's room or of a template room)
+        - userid: <str> (required, ID of the user the copy is for)
+        - name: <str> (optional, name of the copy, default: the original's)
+    Returns:
+        JsonResponse: A JSON response with the ID of the new room.
+    """
+    if request.method != "POST":
+        return errorResponse("Only POST method allowed", status=405)
+
+    room_id = request.POST.get("id")
+    user_id = request.POST.get("userid")
+    name = request.POST.get("name")
+
+    if not room_id or not user_id:
+        return errorResponse("Missing required fields", status=400)
+
+    room, success, message = room_utils.handle_clone_room(user_id, room_id, name)
+
+    if not success:
+        return errorResponse(message, status=404)
+
+    return JsonResponse({"message": message, "id": str(room.id)}, status=201)
+
+
+def get_template_rooms_view(request):
+    """
+    Retrieves the rooms published as templates, which every user may clone
+    with rooms/clone/.
+
+    Expects GET parameters:
+        - fields: <str> (optional, comma-separated subset of ROOM_FIELDS to return)
+
+    Returns:
+        JsonResponse: A JSON response containing the serialized template rooms.
+    """
+    try:
+        fields = parse_fields(request.GET.get("fields"), room_utils.ROOM_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
+
+    rooms = room_utils.handle_get_template_rooms(fields)
+
+    return JsonResponse(
+        [room_utils.room_to_json_serializer(room, fields) for room in rooms],
+        safe=False,
+        status=200,
+    )
+
+
 # ModelsViews
+@coalesce_view
 def get_models_view(request):
     """
     Retrieves a list of all models in JSON serializable format.
     This function fetches all models from the database and serializes them into a JSON response.
 
     Args:
-        - No parameters are required in the request.
+        - listed: <bool> (optional, "true" to only return listed models)
+        - fields: <str> (optional, comma-separated subset of MODEL_FIELDS to
+            return, e.g. "id,name,img" for the catalog grid)
 
     Returns:
         - JsonResponse: A JSON response containing a list of serialized model objects.
 
     """
 
-    models = model_utils.handle_get_models_list()
+    listed_only = request.GET.get("listed", "false").lower() == "true"
+
+    try:
+        fields = parse_fields(request.GET.get("fields"), model_utils.MODEL_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
+
+    models = model_utils.handle_get_models_list(listed_only, fields)
 
     serialized_models = [
-        model_utils.model_to_json_serializer(model) for model in models
+        model_utils.model_to_json_serializer(model, fields) for model in models
     ]
 
     return JsonResponse(serialized_models, safe=False, status=200)
 
 
+@read_from_replicas()
+@coalesce_view
 def get_model_view(request):
 
     try:
@@ -346,16 +559,21 @@ def get_model_view(request):
     except (TypeError, ValueError):
         return errorResponse("Invalid model ID", status=400)
 
+    try:
+        fields = parse_fields(request.GET.get("fields"), model_utils.MODEL_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
+
     if not model_id:
         return errorResponse("Model ID is required", status=400)
 
-    model, success, message = model_utils.handle_get_model_by_id(model_id)
+    model, success, message = model_utils.handle_get_model_by_id(model_id, fields)
 
     if not success:
         return errorResponse(message, status=404)
 
     return JsonResponse(
-        model_utils.model_to_json_serializer(model), safe=False, status=200
+        model_utils.model_to_json_serializer(model, fields), safe=False, status=200
     )
 
 
@@ -477,11 +695,14 @@ def update_model_view(request):
     try:
         model_id = uuid.UUID(request.POST.get("id"))
         user_id = request.POST.get("userid")
-        model_data = request.POST.get("model_data", "{}")
+        model_data = json.loads(request.POST.get("model_data", "{}"))
 
     except (TypeError, ValueError):
         return errorResponse("Invalid model ID or data", status=400)
 
+    if not isinstance(model_data, dict):
+        return errorResponse("Invalid model ID or data", status=400)
+
     is_admin, message = auth_utils.handle_admin(user_id)
 
     if not is_admin:
@@ -503,6 +724,7 @@ def search_model_view(request):
     Expects a GET request with the following query parameter:
         - search_token: <str> (required, the token to search for in model names
             or descriptions)
+        - fields: <str> (optional, comma-separated subset of MODEL_FIELDS to return)
 
     Returns:
         JsonResponse: A JSON response containing a list of models that match the search token.
@@ -514,18 +736,104 @@ def search_model_view(request):
     except (TypeError, ValueError):
         return errorResponse("Invalid search token", status=400)
 
-    models, success, message = model_utils.handle_search_product_by_token(search_token)
+    try:
+        fields = parse_fields(request.GET.get("fields"), model_utils.MODEL_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
+
+    models, success, message = model_utils.handle_search_product_by_token(
+        search_token, fields=fields
+    )
 
     if not success:
         return errorResponse(message, status=404)
 
     return JsonResponse(
-        [model_utils.model_to_json_serializer(model) for model in models],
+        [model_utils.model_to_json_serializer(model, fields) for model in models],
         safe=False,
         status=200,
     )
 
 
+def similar_models_view(request):
+    """
+    Suggests listed models related to a given model, by the TF-IDF cosine
+    similarity of their names, descriptions and tags.
+
+    Expects a GET request with the following query parameters:
+        - id: <str> (required, ID of the model to find related models for)
+        - limit: <int> (optional, number of models, default 10, at most 50)
+        - fields: <str> (optional, comma-separated subset of MODEL_FIELDS to return)
+
+    Returns:
+        JsonResponse: A JSON response containing the related models, most
+        similar first.
+    """
+    if request.method != "GET":
+        return errorResponse("Only GET method allowed", status=405)
+
+    model_id = request.GET.get("id")
+    if not model_id:
+        return errorResponse("Model ID is required", status=400)
+
+    try:
+        limit = int(request.GET.get("limit", 0)) or None
+    except (TypeError, ValueError):
+        return errorResponse("Invalid limit", status=400)
+
+    if limit is not None and limit < 0:
+        return errorResponse("Invalid limit", status=400)
+
+    try:
+        fields = parse_fields(request.GET.get("fields"), model_utils.MODEL_FIELDS)
+    except ValueError as e:
+        return errorResponse(str(e), status=400)
+
+    models, success, message = similar_model_utils.handle_get_similar_models(
+        model_id, limit, fields
+    )
+
+    if not success:
+        return errorResponse(message, status=404)
+
+    return JsonResponse(
+        [model_utils.model_to_json_serializer(model, fields) for model in models],
+        safe=False,
+        status=200,
+    )
+
+
+def typeahead_view(request):
+    """
+    Completes a partially typed search term from the names and tags of
+    listed models. Cheap enough to call on every keystroke, unlike
+    models/search/.
+
+    Expects a GET request with the following query parameters:
+        - q: <str> (required, what the user typed so far; one character is enough)
+        - limit: <int> (optional, number of completions, default 10, at most 50)
+
+    Returns:
+        JsonResponse: A JSON response containing the completions, most common
+        first, each with its text, kind ("model" or "tag") and model count.
+    """
+    if request.method != "GET":
+        return errorResponse("Only GET method allowed", status=405)
+
+    try:
+        prefix = request.GET.get("q", "")
+        limit = int(request.GET.get("limit", 0)) or None
+    except (TypeError, ValueError):
+        return errorResponse("Invalid limit", status=400)
+
+    if limit is not None and limit < 0:
+        return errorResponse("Invalid limit", status=400)
+
+    completions = typeahead_utils.handle_typeahead(prefix, limit)
+
+    return JsonResponse({"completions": completions}, status=200)
+
+
 @csrf_exempt
 def unlist_model_view(request):
     """
@@ -645,3 +953,47 @@ def is_admin(request):
         return errorResponse(message, status=403)
 
     return JsonResponse({"message": message}, status=200)
+
+
+# MediaViews
+def serve_media_view(request, path):
+    """
+    Serves an uploaded model file, model image or room file.
+    This view streams files stored by Model.model_file, Model.img and
+    Room.room_file with strong ETags and long-lived Cache-Control headers.
+    Supports conditional requests (If-None-Match / If-Modified-Since) and
+    single HTTP Range requests, so large GLB files can be loaded progressively.
+
+    Args:
+        - path: <str> (required, path of the file relative to MEDIA_ROOT)
+
+    Returns:
+        FileResponse: The full file (200) or the requested byte range (206),
+        or an empty 304 / 416 response.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return errorResponse("Only GET and HEAD methods allowed", status=405)
+
+    full_path, success, message = media_utils.resolve_media_path(path)
+
+    if not success:
+        return errorResponse(message, status=404)
+
+    return media_utils.build_media_response(request, full_path)
+
+
+# MetricsViews
+def metrics_view(request):
+    """
+    Exposes request, cache and database metrics for Prometheus to scrape.
+    Counters are summed over every worker process writing to METRICS_DIR.
+
+    Returns:
+        HttpResponse: All metrics in the Prometheus text exposition format.
+    """
+    if request.method != "GET":
+        return errorResponse("Only GET method allowed", status=405)
+
+    return HttpResponse(
+        metrics_utils.render(), content_type="text/plain; version=0.0.4"
+    )